@@ -0,0 +1,181 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = '''
+---
+name: api_metrics
+type: aggregate
+short_description: Add up what the phpIPAM and PowerDNS Admin tasks of each play cost
+version_added: "2.11"
+description:
+    - "Reads the C(metrics) the kenmoini.phpipam and kenmoini.powerdns_admin modules return with C(collect_metrics: true) or at -vvv"
+    - "At the end of the playbook prints, for every play, the tasks that reported metrics, slowest first, with their wall time, requests, retries, bytes and the time spent in HTTP and JSON decode"
+    - "Tasks looping over items are added up over all their items"
+requirements:
+  - Enable it with C(callbacks_enabled = kenmoini.kemo.api_metrics) in ansible.cfg
+options:
+  top:
+    description:
+      - How many tasks to list per play, 0 lists all of them
+    default: 20
+    type: int
+    env:
+      - name: ANSIBLE_API_METRICS_TOP
+    ini:
+      - section: callback_api_metrics
+        key: top
+  sort_by:
+    description:
+      - What the tasks are ordered by
+    default: wall_seconds
+    choices: ['wall_seconds', 'http_seconds', 'requests', 'bytes_in']
+    type: str
+    env:
+      - name: ANSIBLE_API_METRICS_SORT_BY
+    ini:
+      - section: callback_api_metrics
+        key: sort_by
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+# The counters of the module metrics that are summed per task
+COUNTERS = ('requests', 'retries', 'failures', 'cache_hits', 'bytes_in', 'bytes_out', 'http_seconds', 'json_decode_seconds')
+
+
+def _format_bytes(count):
+    for unit in ('B', 'KiB', 'MiB'):
+        if count < 1024:
+            return '{:.0f} {}'.format(count, unit)
+        count /= 1024.0
+    return '{:.1f} GiB'.format(count)
+
+
+class TaskMetrics(object):
+    """The metrics of one task added up over its hosts and loop items"""
+
+    def __init__(self, name, started):
+        self.name = name
+        self.started = started
+        self.finished = started
+        self.hosts = set()
+        self.latency_max = 0.0
+        self.latency_p95 = 0.0
+        self.totals = dict((counter, 0) for counter in COUNTERS)
+
+    @property
+    def wall_seconds(self):
+        return self.finished - self.started
+
+    def add(self, host, metrics):
+        self.hosts.add(host)
+        for counter in COUNTERS:
+            self.totals[counter] += metrics.get(counter, 0)
+        latency = metrics.get('latency') or {}
+        self.latency_max = max(self.latency_max, latency.get('max', 0))
+        self.latency_p95 = max(self.latency_p95, latency.get('p95', 0))
+
+    def sort_key(self, sort_by):
+        if sort_by == 'wall_seconds':
+            return self.wall_seconds
+        return self.totals[sort_by]
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'kenmoini.kemo.api_metrics'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self.play_name = None
+        self.play_started = None
+        self.tasks = {}
+        self.task_order = []
+        self.plays = []
+
+    def v2_playbook_on_play_start(self, play):
+        self._finish_play()
+        self.play_name = play.get_name().strip()
+        self.play_started = time.time()
+        self.tasks = {}
+        self.task_order = []
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._start_task(task)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._start_task(task)
+
+    def v2_runner_on_ok(self, result):
+        self._add_result(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._add_result(result)
+
+    def v2_playbook_on_stats(self, stats):
+        # Ansible has no event for the end of a play, so the report waits for
+        # the end of the playbook rather than landing inside the next play
+        self._finish_play()
+        for play in self.plays:
+            self._report_play(*play)
+
+    def _start_task(self, task):
+        uuid = task._uuid
+        if uuid not in self.tasks:
+            self.tasks[uuid] = TaskMetrics(task.get_name().strip(), time.time())
+            self.task_order.append(uuid)
+
+    def _add_result(self, result):
+        task = self.tasks.get(result._task._uuid)
+        if task is None:
+            return
+        task.finished = max(task.finished, time.time())
+        host = result._host.get_name()
+        results = result._result.get('results')
+        if isinstance(results, list):
+            for item in results:
+                if isinstance(item, dict) and isinstance(item.get('metrics'), dict):
+                    task.add(host, item['metrics'])
+        elif isinstance(result._result.get('metrics'), dict):
+            task.add(host, result._result['metrics'])
+
+    def _finish_play(self):
+        measured = [self.tasks[uuid] for uuid in self.task_order if self.tasks[uuid].hosts]
+        if measured:
+            self.plays.append((self.play_name, time.time() - self.play_started, measured))
+        self.tasks = {}
+        self.task_order = []
+
+    def _report_play(self, play_name, play_seconds, measured):
+        sort_by = self.get_option('sort_by')
+        top = self.get_option('top')
+        measured.sort(key=lambda task: task.sort_key(sort_by), reverse=True)
+
+        totals = dict((counter, sum(task.totals[counter] for task in measured)) for counter in COUNTERS)
+        wall = sum(task.wall_seconds for task in measured)
+        self._display.banner('API METRICS [{}]'.format(play_name))
+        self._display.display('{} tasks, {:.2f}s of {:.2f}s play time, {} requests, {} retries, {} in, {} out'.format(
+            len(measured), wall, play_seconds, totals['requests'], totals['retries'],
+            _format_bytes(totals['bytes_in']), _format_bytes(totals['bytes_out'])))
+        self._display.display('{:>8} {:>6} {:>8} {:>7} {:>10} {:>8} {:>8} {:>8}  {}'.format(
+            'wall', 'share', 'requests', 'retries', 'bytes in', 'http', 'json', 'p95', 'task'))
+        for task in measured[:top or None]:
+            self._display.display('{:>7.2f}s {:>5.0f}% {:>8} {:>7} {:>10} {:>7.2f}s {:>7.3f}s {:>7.3f}s  {} ({} hosts)'.format(
+                task.wall_seconds,
+                100.0 * task.wall_seconds / play_seconds if play_seconds else 0,
+                task.totals['requests'],
+                task.totals['retries'],
+                _format_bytes(task.totals['bytes_in']),
+                task.totals['http_seconds'],
+                task.totals['json_decode_seconds'],
+                task.latency_p95,
+                task.name,
+                len(task.hosts),
+            ))
@@ -0,0 +1,180 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers shared by the modules that create and change phpIPAM addresses.
+#
+# phpIPAM picks and creates the first free address of a subnet in one
+# ``POST /addresses/first_free/<subnet>/``.  Two of those racing for the same
+# address end with one of them refused as a duplicate, that one is retried
+# after a jittered backoff so parallel hosts spread out instead of colliding
+# again on the next address.
+#
+# Reservations of a given IP are read first and only the fields that differ
+# are written, so re-running a play against addresses that are already right
+# sends no writes at all.
+
+import random
+import time
+
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError
+
+# phpIPAM tag ids by name
+ADDRESS_TAGS = dict(offline=1, used=2, reserved=3, dhcp=4)
+
+# The optional address options of the modules and the phpIPAM field they set
+ADDRESS_FIELDS = dict(
+    hostname='hostname',
+    description='description',
+    is_gateway='is_gateway',
+    ping_exclude='excludePing',
+    ptr_exclude='PTRignore',
+    owner='owner',
+    note='note',
+)
+
+# phpIPAM keeps these as 0 or 1, and returns them as strings or null
+BOOL_FIELDS = ('is_gateway', 'excludePing', 'PTRignore')
+
+# The fields shown in the diff of a reservation
+DIFF_FIELDS = ('ip', 'subnetId', 'tag') + tuple(ADDRESS_FIELDS.values())
+
+# How phpIPAM words a lost race for an address, it does not always answer 409
+CONFLICT_MESSAGES = ('already exists', 'duplicate')
+
+# How phpIPAM words a request for an address it does not have
+MISSING_MESSAGES = ('does not exist', 'not found', 'no addresses found', 'invalid address id')
+
+
+class AddressConflict(PhpIpamError):
+    pass
+
+
+def address_payload(params):
+    """The address fields set in the module parameters, as phpIPAM names them"""
+    payload = {}
+    for option, field in ADDRESS_FIELDS.items():
+        value = params.get(option)
+        if value is None or value == '':
+            continue
+        payload[field] = int(value) if field in BOOL_FIELDS else value
+    if params.get('tag'):
+        payload['tag'] = ADDRESS_TAGS[params['tag']]
+    return payload
+
+
+def response_message(response):
+    """The message of a phpIPAM error response, or its body"""
+    try:
+        return response.json().get('message') or response.text
+    except ValueError:
+        return response.text
+
+
+def is_conflict(response):
+    if response.status_code == 409:
+        return True
+    return response.status_code >= 400 and any(text in response_message(response).lower() for text in CONFLICT_MESSAGES)
+
+
+def is_missing(response):
+    if response.status_code == 404:
+        return True
+    return response.status_code >= 400 and any(text in response_message(response).lower() for text in MISSING_MESSAGES)
+
+
+def _comparable(field, value):
+    if value is None:
+        return '0' if field in BOOL_FIELDS else ''
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+
+def address_changes(current, payload):
+    """The fields of ``payload`` that differ from the phpIPAM address ``current``"""
+    return dict((field, value) for field, value in payload.items()
+                if field not in ('ip', 'subnetId') and _comparable(field, current.get(field)) != _comparable(field, value))
+
+
+def address_view(address):
+    """The fields of an address shown in a diff, an empty dict for none"""
+    if not address:
+        return {}
+    return dict((field, address.get(field)) for field in DIFF_FIELDS if field in address)
+
+
+def find_address(client, ip, subnet_id):
+    """The phpIPAM address ``ip`` of a subnet, or None when the subnet does not have it.
+
+    Raises PhpIpamError when the lookup fails.
+    """
+    response = client.get('/addresses/' + ip + '/' + str(subnet_id) + '/')
+    if response.status_code == 200 and response.json().get('data'):
+        data = response.json()['data']
+        # Some phpIPAM versions answer with a list of one
+        return data[0] if isinstance(data, list) else data
+    if response.status_code == 200 or is_missing(response):
+        return None
+    raise PhpIpamError('Failed to look up address {} in subnet {}: {}'.format(ip, subnet_id, response_message(response)))
+
+
+def subnet_addresses(client, subnet_id):
+    """Index the phpIPAM addresses of a subnet by IP, or raise PhpIpamError"""
+    response = client.get('/subnets/' + str(subnet_id) + '/addresses/')
+    if response.status_code == 200:
+        return dict((address['ip'], address) for address in response.json().get('data') or [])
+    if is_missing(response):
+        return {}
+    raise PhpIpamError('Failed to list the addresses of subnet {}: {}'.format(subnet_id, response_message(response)))
+
+
+def plan_reservation(current, payload):
+    """The action and fields that make the address ``current`` match ``payload``.
+
+    Returns ('create', payload) when there is no address yet, ('update',
+    changes) when some fields differ and ('none', {}) otherwise.
+    """
+    if current is None:
+        return 'create', payload
+    changes = address_changes(current, payload)
+    return ('update', changes) if changes else ('none', {})
+
+
+def apply_reservation(client, action, current, fields):
+    """Send the write of a planned reservation and return the address ID.
+
+    Raises PhpIpamError when phpIPAM refuses it.
+    """
+    if action == 'create':
+        response = client.post('/addresses/', json=fields)
+        if response.status_code not in (200, 201):
+            raise PhpIpamError('Failed to reserve address {}: {}'.format(fields['ip'], response_message(response)))
+        return response.json().get('id')
+    if action == 'update':
+        response = client.patch('/addresses/' + str(current['id']) + '/', json=fields)
+        if response.status_code != 200:
+            raise PhpIpamError('Failed to update address {}: {}'.format(current['ip'], response_message(response)))
+    return current['id']
+
+
+def allocate_first_free(client, subnet_id, payload, conflict_retries=5, conflict_backoff=0.2):
+    """Create the first free address of a subnet and return its phpIPAM response data.
+
+    The returned dict has the address ``id`` and ``ip``.  A request that lost
+    the race for an address is retried up to ``conflict_retries`` times,
+    waiting ``conflict_backoff`` seconds doubled on each attempt, scaled by a
+    random factor between 0.5 and 1.5.  Raises AddressConflict when it never
+    wins, PhpIpamError for any other failure, such as a full subnet.
+    """
+    targetPath = '/addresses/first_free/' + str(subnet_id) + '/'
+    for attempt in range(conflict_retries + 1):
+        response = client.post(targetPath, json=payload)
+        if response.status_code in (200, 201):
+            responseJSON = response.json()
+            return dict(id=responseJSON.get('id'), ip=responseJSON.get('data'))
+        if not is_conflict(response):
+            raise PhpIpamError('Failed to allocate an address in subnet {}: {}'.format(subnet_id, response_message(response)))
+        if attempt < conflict_retries:
+            time.sleep(conflict_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+    raise AddressConflict('Failed to allocate an address in subnet {} after {} conflicts: {}'.format(
+        subnet_id, conflict_retries + 1, response_message(response)))
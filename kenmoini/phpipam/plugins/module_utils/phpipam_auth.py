@@ -0,0 +1,157 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# phpIPAM user tokens shared by every task and fork on the controller.
+#
+# With a username and password the modules log in with ``POST /user/`` and
+# send the token phpIPAM returns instead of the app code.  Every module run is
+# a fresh process, so the token is kept on disk, one JSON file per phpIPAM
+# URL, app and user.  A lock file makes forks that find no valid token wait
+# for the one logging in rather than each logging in themselves.
+#
+# phpIPAM reports the expiry in the server's local time without a zone, so
+# the token is kept for phpipam_token_ttl seconds instead.  A token phpIPAM
+# refuses before then is dropped and the request sent again with a new one.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+DEFAULT_TOKEN_DIR = '~/.ansible/tmp/phpipam_tokens'
+
+# Tokens this close to their expiry are renewed rather than used
+TOKEN_MARGIN = 60
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class TokenCache(object):
+
+    def __init__(self, directory):
+        self.directory = os.path.expanduser(directory)
+        self.thread_lock = threading.Lock()
+
+    def key(self, api_url, username, password):
+        """The cache key of a user of an app, ``api_url`` ends with the app ID"""
+        return _hash(api_url, username, _hash(password))
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def load(self, key):
+        """The cached token and its expiry time, or (None, 0)"""
+        try:
+            with open(self._path(key, '.json')) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None, 0
+        return entry.get('token'), entry.get('expires', 0)
+
+    def store(self, key, token, expires):
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(dict(token=token, expires=expires), f)
+                os.rename(tmp_path, self._path(key, '.json'))
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        except (IOError, OSError):
+            # The cache is an optimisation, the token works without it
+            pass
+
+    def discard(self, key, token):
+        """Forget ``token``, unless another process already replaced it"""
+        if self.load(key)[0] == token:
+            try:
+                os.unlink(self._path(key, '.json'))
+            except OSError:
+                pass
+
+    @contextmanager
+    def lock(self, key):
+        """Hold the token of ``key`` against other threads and, where fcntl exists, other processes"""
+        with self.thread_lock:
+            lockFile = None
+            if HAS_FCNTL:
+                try:
+                    if not os.path.isdir(self.directory):
+                        os.makedirs(self.directory, 0o700)
+                    lockFile = open(self._path(key, '.lock'), 'a')
+                    fcntl.flock(lockFile, fcntl.LOCK_EX)
+                except (IOError, OSError):
+                    lockFile = None
+            try:
+                yield
+            finally:
+                if lockFile is not None:
+                    fcntl.flock(lockFile, fcntl.LOCK_UN)
+                    lockFile.close()
+
+
+class TokenAuth(object):
+    """Logs in as a phpIPAM user and hands out the token, renewing it when needed"""
+
+    def __init__(self, username, password, cache, ttl=3600):
+        self.username = username
+        self.password = password
+        self.cache = cache
+        self.ttl = ttl
+        self.key = None
+        self.current = None
+        self.expires = 0
+
+    def token(self, client, stale=None):
+        """A valid token for ``client``, logging in when there is none.
+
+        ``stale`` is a token phpIPAM refused, it is never handed out again.
+        Raises PhpIpamError when the login fails.
+        """
+        margin = min(TOKEN_MARGIN, self.ttl / 2.0)
+        if self.current is not None and self.current != stale and time.time() < self.expires - margin:
+            return self.current
+
+        if self.key is None:
+            self.key = self.cache.key(client.base_url, self.username, self.password)
+        with self.cache.lock(self.key):
+            if stale is not None:
+                self.cache.discard(self.key, stale)
+            token, expires = self.cache.load(self.key)
+            if token is None or token == stale or time.time() >= expires - margin:
+                token = client.login(self.username, self.password)
+                expires = time.time() + self.ttl
+                self.cache.store(self.key, token, expires)
+            self.current, self.expires = token, expires
+        return token
+
+
+def token_auth_from_params(params):
+    """Build the user token auth from the phpipam_* module parameters, or None for app code auth"""
+    if not params.get('phpipam_username'):
+        return None
+    return TokenAuth(
+        params['phpipam_username'],
+        params['phpipam_password'],
+        TokenCache(params.get('phpipam_token_dir') or DEFAULT_TOKEN_DIR),
+        ttl=params.get('phpipam_token_ttl') or 3600,
+    )
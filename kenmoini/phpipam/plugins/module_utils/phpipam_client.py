@@ -0,0 +1,163 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Shared HTTP client for the phpIPAM modules.
+#
+# Keeps one pooled keep-alive Session per module run, retries 429/5xx
+# responses with backoff and applies a timeout to every request.  Requests are
+# authenticated with the app code as a static token, or with a user token
+# from phpipam_auth when a username is given.
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import token_auth_from_params
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_metrics import metrics_from_module
+
+# Status codes that are safe to retry - rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# POST is left out on purpose, creating an address twice is not harmless
+RETRY_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+# The answers phpIPAM gives to a missing, invalid or expired user token, its
+# message names the token, unlike the 403 of a permission it does not have
+TOKEN_REFUSED_CODES = (401, 403)
+
+
+class PhpIpamError(Exception):
+    pass
+
+
+def _build_retry(retries, backoff_factor):
+    retry_args = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(allowed_methods=RETRY_METHODS, **retry_args)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=RETRY_METHODS, **retry_args)
+
+
+class PhpIpamClient(object):
+    """Pooled, retrying HTTP client for the phpIPAM API.
+
+    Paths passed to the request helpers are relative to ``<url>/api/<app_id>``.
+    When a module is given, transport errors end the run with fail_json,
+    otherwise a PhpIpamError is raised.  With a RequestMetrics attached every
+    request is counted.  With a TokenAuth the user token is sent instead of
+    the app code, a request it is refused for is sent once more with a new one.
+    """
+
+    def __init__(self, url, app_id, app_code=None, verify=True, timeout=30, retries=3,
+                 backoff_factor=0.5, pool_size=10, module=None, metrics=None, auth=None):
+        self.base_url = url.rstrip('/') + '/api/' + app_id
+        self.timeout = timeout
+        self.module = module
+        self.metrics = metrics
+        self.auth = auth
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=_build_retry(retries, backoff_factor),
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.verify = verify
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+        })
+        if auth is None:
+            self.session.headers['token'] = app_code
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _fail(self, msg):
+        if self.module is not None:
+            self.module.fail_json(msg=msg)
+        raise PhpIpamError(msg)
+
+    def _send(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.exceptions.RequestException as e:
+            if self.metrics is not None:
+                self.metrics.record(method, path, None, time.monotonic() - started)
+            self._fail('Request to {} failed: {}'.format(self.url(path), e))
+        if self.metrics is not None:
+            self.metrics.record_response(method, path, response, time.monotonic() - started, stream=kwargs.get('stream', False))
+        return response
+
+    def request(self, method, path, **kwargs):
+        if self.auth is None:
+            return self._send(method, path, **kwargs)
+
+        # The token goes on each request, worker threads share the session
+        token = self.auth.token(self)
+        headers = dict(kwargs.pop('headers', None) or {})
+        response = self._send(method, path, headers=dict(headers, token=token), **kwargs)
+        if response.status_code in TOKEN_REFUSED_CODES and 'token' in response.text.lower():
+            response.close()
+            token = self.auth.token(self, stale=token)
+            response = self._send(method, path, headers=dict(headers, token=token), **kwargs)
+        return response
+
+    def login(self, username, password):
+        """Log in as a phpIPAM user with ``POST /user/`` and return the token"""
+        response = self._send('POST', '/user/', auth=(username, password))
+        try:
+            token = (response.json().get('data') or {}).get('token')
+        except ValueError:
+            token = None
+        if response.status_code != 200 or not token:
+            self._fail('Failed to log in to phpIPAM as {}: {}'.format(username, response.text))
+        return token
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def client_from_module(module, pool_size=10, fail_on_error=True):
+    """Build a client from the common phpipam_* module parameters.
+
+    Clients shared by worker threads should be built with fail_on_error=False,
+    fail_json must only ever be called from the main thread.
+    """
+    params = module.params
+    return PhpIpamClient(
+        params['phpipam_url'],
+        params['phpipam_app_id'],
+        params.get('phpipam_app_code'),
+        verify=not params['phpipam_skip_tls_verify'],
+        pool_size=pool_size,
+        module=module if fail_on_error else None,
+        metrics=metrics_from_module(module),
+        auth=token_auth_from_params(params),
+    )
@@ -0,0 +1,219 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Which hosts of a subnet are taken, built from one listing of its addresses.
+#
+# Subnets of up to BITMAP_MAX_HOSTS addresses keep one bit per address in a
+# bytearray, a /16 costs 8 KiB and a /8 2 MiB.  The free ranges are found by
+# scanning the bitmap for runs of whole free and whole used bytes, only the
+# bytes that are partly used are looked at bit by bit.  Larger subnets, IPv6
+# ones in practice, keep the sorted offsets of the used addresses instead, so
+# they cost as much as the addresses phpIPAM has and not as the subnet size.
+
+import ipaddress
+import re
+import socket
+
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_addresses import is_missing, response_message
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError
+
+# The largest subnet kept as a bitmap, 2 MiB of memory
+BITMAP_MAX_HOSTS = 2 ** 24
+
+# Runs of free bytes, runs of used bytes, and runs of partly used bytes
+BYTE_RUNS = re.compile(b'\\x00+|\\xff+|[\\x01-\\xfe]+')
+
+
+def _byte_runs(byte):
+    runs = []
+    for bit in range(8):
+        if byte >> bit & 1:
+            continue
+        if runs and runs[-1][1] == bit - 1:
+            runs[-1] = (runs[-1][0], bit)
+        else:
+            runs.append((bit, bit))
+    return tuple(runs)
+
+
+# The runs of free bits within each byte value
+FREE_BITS = tuple(_byte_runs(byte) for byte in range(256))
+
+
+class Occupancy(object):
+    """The used and free hosts of a network.
+
+    Offsets count from the network address.  Only the usable hosts are
+    offered as free: the network and broadcast addresses of IPv4 subnets
+    larger than a /31 and the subnet-router anycast address of IPv6 subnets
+    larger than a /127 are left out, as phpIPAM does.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.base = int(network.network_address)
+        self.family = socket.AF_INET if network.version == 4 else socket.AF_INET6
+        self.size = network.num_addresses
+        self.first = 0
+        self.last = self.size - 1
+        if network.version == 4 and network.prefixlen < 31:
+            self.first, self.last = 1, self.size - 2
+        elif network.version == 6 and network.prefixlen < 127:
+            self.first = 1
+        self.used = 0
+
+    @property
+    def usable(self):
+        return self.last - self.first + 1
+
+    @property
+    def free(self):
+        return self.usable - self.used
+
+    def offset(self, ip):
+        """The offset of an address in the network, or None when it is outside it"""
+        # inet_pton parses an address many times faster than ipaddress
+        try:
+            packed = socket.inet_pton(self.family, ip)
+        except (OSError, ValueError, TypeError):
+            return None
+        offset = int.from_bytes(packed, 'big') - self.base
+        return offset if 0 <= offset < self.size else None
+
+    def address(self, offset):
+        return str(self.network.network_address + offset)
+
+    def add(self, ip):
+        """Mark an address used, addresses outside the usable range are ignored"""
+        offset = self.offset(ip)
+        if offset is not None and self.first <= offset <= self.last and self._mark(offset):
+            self.used += 1
+
+    def free_ranges(self):
+        """Yield the (first, last) offsets of every run of free hosts, in order"""
+        start = end = None
+        for first, last in self._free_runs():
+            first, last = max(first, self.first), min(last, self.last)
+            if first > last:
+                continue
+            if end is not None and first == end + 1:
+                end = last
+                continue
+            if start is not None:
+                yield start, end
+            start, end = first, last
+        if start is not None:
+            yield start, end
+
+    def next_free(self, count):
+        """The offsets of the first ``count`` free hosts, fewer when the network runs out"""
+        offsets = []
+        for first, last in self.free_ranges():
+            offsets.extend(range(first, min(last, first + count - len(offsets) - 1) + 1))
+            if len(offsets) >= count:
+                break
+        return offsets
+
+    def first_block(self, count):
+        """The first run of at least ``count`` free hosts, or None"""
+        for first, last in self.free_ranges():
+            if last - first + 1 >= count:
+                return first, first + count - 1
+        return None
+
+    def largest_block(self):
+        """The first of the longest runs of free hosts, or None when the network is full"""
+        largest = None
+        for first, last in self.free_ranges():
+            if largest is None or last - first > largest[1] - largest[0]:
+                largest = (first, last)
+        return largest
+
+    def describe(self, block):
+        """A run of offsets as the dict returned by the modules"""
+        first, last = block
+        return dict(start=self.address(first), end=self.address(last), size=last - first + 1)
+
+
+class BitmapOccupancy(Occupancy):
+    """One bit per address, set when it is used"""
+
+    def __init__(self, network):
+        super(BitmapOccupancy, self).__init__(network)
+        self.bits = bytearray((self.size + 7) // 8)
+        # The padding bits past the end of the network are never free
+        for offset in range(self.size, len(self.bits) * 8):
+            self.bits[offset >> 3] |= 1 << (offset & 7)
+
+    def _mark(self, offset):
+        mask = 1 << (offset & 7)
+        if self.bits[offset >> 3] & mask:
+            return False
+        self.bits[offset >> 3] |= mask
+        return True
+
+    def _free_runs(self):
+        for match in BYTE_RUNS.finditer(self.bits):
+            start = match.start() * 8
+            byte = self.bits[match.start()]
+            if byte == 0x00:
+                yield start, start + (match.end() - match.start()) * 8 - 1
+            elif byte != 0xff:
+                for index in range(match.start(), match.end()):
+                    offset = index * 8
+                    for first, last in FREE_BITS[self.bits[index]]:
+                        yield offset + first, offset + last
+
+
+class SparseOccupancy(Occupancy):
+    """The offsets of the used addresses, for networks too large for a bitmap"""
+
+    def __init__(self, network):
+        super(SparseOccupancy, self).__init__(network)
+        self.offsets = set()
+
+    def _mark(self, offset):
+        if offset in self.offsets:
+            return False
+        self.offsets.add(offset)
+        return True
+
+    def _free_runs(self):
+        previous = -1
+        for offset in sorted(self.offsets):
+            if offset > previous + 1:
+                yield previous + 1, offset - 1
+            previous = offset
+        if previous < self.size - 1:
+            yield previous + 1, self.size - 1
+
+
+def occupancy_for(network, addresses=()):
+    """The Occupancy of a network with ``addresses`` marked used"""
+    network = ipaddress.ip_network(network, strict=False)
+    occupancy = BitmapOccupancy(network) if network.num_addresses <= BITMAP_MAX_HOSTS else SparseOccupancy(network)
+    for ip in addresses:
+        occupancy.add(ip)
+    return occupancy
+
+
+def subnet_occupancy(client, subnet_id):
+    """Read a phpIPAM subnet and its addresses into an Occupancy, two requests.
+
+    Returns the subnet and its Occupancy, raises PhpIpamError when a read fails.
+    """
+    response = client.get('/subnets/' + str(subnet_id) + '/')
+    if response.status_code != 200 or not response.json().get('data'):
+        raise PhpIpamError('Failed to read subnet {}: {}'.format(subnet_id, response_message(response)))
+    subnet = response.json()['data']
+
+    response = client.get('/subnets/' + str(subnet_id) + '/addresses/')
+    if response.status_code == 200:
+        addresses = response.json().get('data') or []
+    elif is_missing(response):
+        addresses = []
+    else:
+        raise PhpIpamError('Failed to list the addresses of subnet {}: {}'.format(subnet_id, response_message(response)))
+
+    occupancy = occupancy_for(subnet['subnet'] + '/' + str(subnet['mask']), (address['ip'] for address in addresses))
+    return subnet, occupancy
@@ -0,0 +1,291 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: allocate_address
+short_description: Allocate the first free IP Addresses of a subnet in phpIPAM
+version_added: "2.11"
+description:
+    - "Allocate the first free IP Addresses of a subnet in phpIPAM"
+    - "phpIPAM picks and reserves each address in a single request, so hosts allocating from the same subnet at the same time never get the same address"
+    - "A request that loses the race for an address is retried with a jittered backoff"
+    - "Every run allocates new addresses, use M(kenmoini.phpipam.address_info) first to reuse an address a host already has"
+
+options:
+  phpipam_url:
+    description:
+      - This is the URL of your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_id:
+    description:
+      - This is the app ID for your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_code:
+    description:
+      - This is the app code for your phpIPAM instance
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
+    type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
+    type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
+  phpipam_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    type: bool
+    aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  subnet_id:
+    description:
+      - This is the ID of the subnet you want to allocate the IP Addresses from
+    required: true
+    type: int
+    aliases: ['subnet']
+  count:
+    description:
+      - The number of IP Addresses to allocate
+      - Defaults to the number of I(hostnames), or 1
+    required: false
+    type: int
+  hostname:
+    description:
+      - This is the hostname you want to assign to every allocated IP Address
+    required: false
+    type: str
+  hostnames:
+    description:
+      - The hostnames to assign to the allocated IP Addresses, one IP Address each
+    required: false
+    type: list
+    elements: str
+  description:
+    description:
+      - This is the description you want to assign to the IP Addresses
+    required: false
+    type: str
+  tag:
+    description:
+      - This is the tag you want to assign to the IP Addresses
+    required: false
+    choices: ['offline', 'used', 'reserved', 'dhcp']
+    default: 'reserved'
+    type: str
+  is_gateway:
+    description:
+      - Whether or not the IP Addresses are gateways
+    required: false
+    type: bool
+  ping_exclude:
+    description:
+      - Whether or not to exclude the IP Addresses from pings
+    required: false
+    type: bool
+  ptr_exclude:
+    description:
+      - Whether or not to exclude the IP Addresses from PTR records
+    required: false
+    type: bool
+  owner:
+    description:
+      - The owner of the IP Addresses
+    required: false
+    type: str
+  note:
+    description:
+      - A note about the IP Addresses
+    required: false
+    type: str
+  conflict_retries:
+    description:
+      - How many times to retry an allocation that another client won the address of
+    required: false
+    default: 5
+    type: int
+  conflict_backoff:
+    description:
+      - Seconds to wait before the first retry of a conflicting allocation, doubled on each retry and scaled by a random factor between 0.5 and 1.5
+    required: false
+    default: 0.2
+    type: float
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Allocate an IP Address for a host
+- name: Allocate an IP Address
+  kenmoini.phpipam.allocate_address:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    hostname: "{{ inventory_hostname }}"
+    description: "Provisioned by Ansible"
+  register: r_address
+
+# Allocate the IP Addresses of a whole cluster in one task
+- name: Allocate the cluster IP Addresses
+  kenmoini.phpipam.allocate_address:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    hostnames:
+      - "node-1.example.com"
+      - "node-2.example.com"
+      - "node-3.example.com"
+  register: r_addresses
+'''
+
+RETURN = '''
+ip_address:
+    description: The first allocated IP Address
+    type: str
+    returned: success
+    sample: "10.0.0.5"
+addresses:
+    description: The allocated IP Addresses with their phpIPAM ID and hostname, also the ones allocated before a failure
+    type: list
+    returned: always
+    sample: [{"id": "42", "ip": "10.0.0.5", "hostname": "node-1.example.com"}]
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+'''
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_addresses import address_payload, allocate_first_free
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError, client_from_module
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        phpipam_url=dict(type='str', required=True),
+        phpipam_app_id=dict(type='str', required=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
+        phpipam_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+
+        subnet_id=dict(type='int', required=True, aliases=['subnet']),
+        count=dict(type='int', required=False),
+
+        hostname=dict(type='str', required=False),
+        hostnames=dict(type='list', elements='str', required=False),
+        description=dict(type='str', required=False),
+
+        tag=dict(type='str', required=False, choices=['offline', 'used', 'reserved', 'dhcp'], default='reserved'),
+        is_gateway=dict(type='bool', required=False),
+        ping_exclude=dict(type='bool', required=False),
+        ptr_exclude=dict(type='bool', required=False),
+
+        owner=dict(type='str', required=False),
+        note=dict(type='str', required=False),
+
+        conflict_retries=dict(type='int', required=False, default=5),
+        conflict_backoff=dict(type='float', required=False, default=0.2),
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        addresses=[]
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
+        mutually_exclusive=[['hostname', 'hostnames']],
+        supports_check_mode=False
+    )
+
+    hostnames = module.params['hostnames']
+    count = module.params['count']
+    if count is None:
+        count = len(hostnames) if hostnames else 1
+    if count < 1:
+        module.fail_json(msg='count must be at least 1', **result)
+    if hostnames and len(hostnames) != count:
+        module.fail_json(msg='count is {} but {} hostnames were given'.format(count, len(hostnames)), **result)
+
+    # Create the pooled API client, every allocation reuses its connection
+    client = client_from_module(module)
+
+    payload = address_payload(module.params)
+
+    # Each address is its own atomic allocation, the ones made before a
+    # failure are returned so they can be released or used
+    for index in range(count):
+        if hostnames:
+            payload['hostname'] = hostnames[index]
+        try:
+            address = allocate_first_free(
+                client,
+                module.params['subnet_id'],
+                payload,
+                conflict_retries=module.params['conflict_retries'],
+                conflict_backoff=module.params['conflict_backoff'],
+            )
+        except PhpIpamError as e:
+            module.fail_json(msg=str(e), **result)
+        address['hostname'] = payload.get('hostname')
+        result['addresses'].append(address)
+        result['changed'] = True
+
+    result['ip_address'] = result['addresses'][0]['ip']
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
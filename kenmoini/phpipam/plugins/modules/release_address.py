@@ -43,8 +43,34 @@ options:
   phpipam_app_code:
     description:
       - This is the app code for your phpIPAM instance
-    required: true
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
     type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
+    type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
   phpipam_skip_tls_verify:
     description:
       - Whether or not to skip TLS verification
@@ -52,6 +78,13 @@ options:
     default: false
     type: bool
     aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
 
 author:
     - Ken Moini (@kenmoini)
@@ -74,19 +107,28 @@ ip_address:
     description: Details of the IP Address release request
     type: object
     returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import client_from_module
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         phpipam_url=dict(type='str', required=True),
         phpipam_app_id=dict(type='str', required=True),
-        phpipam_app_code=dict(type='str', required=True, no_log=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
         phpipam_skip_tls_verify=dict(type='bool', required=False, default=False),
+        collect_metrics=dict(type='bool', required=False, default=False),
 
         subnet_id=dict(type='int', required=True, aliases=['subnet']),
         ip_id=dict(type='int', required=True, aliases=['address', 'ip_address']),
@@ -108,18 +150,18 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
         supports_check_mode=False
     )
 
-    headers = {
-        'Content-Type': 'application/json',
-        'token': module.params['phpipam_app_code']
-    }
+    # Create the pooled API client
+    client = client_from_module(module)
 
     # make the API call
-    targetURL = module.params['phpipam_url'] + '/api/' + module.params['phpipam_app_id'] + '/addresses/' + str(module.params['ip_id']) + '/' + str(module.params['subnet_id']) + '/'
+    targetPath = '/addresses/' + str(module.params['ip_id']) + '/' + str(module.params['subnet_id']) + '/'
 
-    response = requests.delete(targetURL, headers=headers, verify=not module.params['phpipam_skip_tls_verify'])
+    response = client.delete(targetPath)
     responseJSON = response.json()
 
     # manipulate or modify the state as needed (this is going to be the
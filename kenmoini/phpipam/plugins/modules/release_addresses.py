@@ -0,0 +1,242 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: release_addresses
+short_description: Release many IP addresses in phpIPAM in one task
+version_added: "2.11"
+description:
+    - "Release a list of IP addresses in phpIPAM in one task, by address ID or by IP Address and subnet"
+    - "The releases are sent over one pooled session, up to I(workers) at a time"
+    - "An IP Address that is already gone is reported as unchanged"
+
+options:
+  phpipam_url:
+    description:
+      - This is the URL of your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_id:
+    description:
+      - This is the app ID for your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_code:
+    description:
+      - This is the app code for your phpIPAM instance
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
+    type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
+    type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
+  phpipam_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    type: bool
+    aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  ids:
+    description:
+      - The phpIPAM IDs of the IP Addresses to release
+    required: false
+    type: list
+    elements: int
+  ips:
+    description:
+      - The IP Addresses to release from I(subnet_id)
+    required: false
+    type: list
+    elements: str
+  subnet_id:
+    description:
+      - The ID of the subnet holding I(ips)
+    required: false
+    type: int
+    aliases: ['subnet']
+  workers:
+    description:
+      - The maximum number of releases to send at the same time
+    required: false
+    default: 10
+    type: int
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Release the IP Addresses of a cluster by their IDs
+- name: Release the cluster IP Addresses
+  kenmoini.phpipam.release_addresses:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    ids: "{{ r_addresses.addresses | map(attribute='id') | list }}"
+    workers: 20
+
+# Release IP Addresses from a subnet
+- name: Release IP Addresses
+  kenmoini.phpipam.release_addresses:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    ips:
+      - 10.0.0.10
+      - 10.0.0.11
+'''
+
+RETURN = '''
+addresses:
+    description: The result for each IP Address, IDs first then IPs, in the order given
+    type: list
+    returned: always
+    sample: [{"id": 42, "changed": true}, {"ip": "10.0.0.11", "subnet_id": 123, "changed": false, "absent": true}]
+released:
+    description: The IDs and IP Addresses that were released
+    type: list
+    returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_addresses import is_missing, response_message
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError, client_from_module
+
+def release(client, target):
+    """Send the release of one address, runs in a worker thread"""
+    if 'id' in target:
+        outcome = dict(id=target['id'], changed=False)
+        targetPath = '/addresses/' + str(target['id']) + '/'
+    else:
+        outcome = dict(ip=target['ip'], subnet_id=target['subnet_id'], changed=False)
+        targetPath = '/addresses/' + target['ip'] + '/' + str(target['subnet_id']) + '/'
+    try:
+        response = client.delete(targetPath)
+    except PhpIpamError as e:
+        outcome['failed'] = True
+        outcome['msg'] = str(e)
+        return outcome
+
+    if response.status_code == 200:
+        outcome['changed'] = True
+    elif is_missing(response):
+        outcome['absent'] = True
+    else:
+        outcome['failed'] = True
+        outcome['msg'] = 'Failed to release address: ' + response_message(response)
+    return outcome
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        phpipam_url=dict(type='str', required=True),
+        phpipam_app_id=dict(type='str', required=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
+        phpipam_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+
+        ids=dict(type='list', elements='int', required=False),
+        ips=dict(type='list', elements='str', required=False),
+        subnet_id=dict(type='int', required=False, aliases=['subnet']),
+        workers=dict(type='int', required=False, default=10),
+    )
+
+    result = dict(
+        changed=False,
+        addresses=[],
+        released=[],
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[['ids', 'ips'], ['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
+        required_by={'ips': 'subnet_id'},
+        supports_check_mode=False
+    )
+
+    if module.params['workers'] < 1:
+        module.fail_json(msg='workers must be at least 1', **result)
+
+    targets = [dict(id=addressId) for addressId in module.params['ids'] or []]
+    targets.extend(dict(ip=ip, subnet_id=module.params['subnet_id']) for ip in module.params['ips'] or [])
+
+    # Create the pooled API client, sized so every worker gets a connection.
+    # Worker threads must not call fail_json, so errors are raised instead.
+    client = client_from_module(module, pool_size=module.params['workers'], fail_on_error=False)
+
+    with ThreadPoolExecutor(max_workers=module.params['workers']) as executor:
+        outcomes = list(executor.map(lambda target: release(client, target), targets))
+
+    failed = []
+    for outcome in outcomes:
+        result['addresses'].append(outcome)
+        name = outcome.get('ip', outcome.get('id'))
+        if outcome.get('failed'):
+            failed.append(str(name))
+        elif outcome['changed']:
+            result['released'].append(name)
+
+    result['changed'] = bool(result['released'])
+
+    if failed:
+        module.fail_json(msg='Failed to release addresses: ' + ', '.join(failed), **result)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
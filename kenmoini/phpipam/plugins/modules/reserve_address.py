@@ -16,6 +16,8 @@ short_description: Update an IP address in phpIPAM
 version_added: "2.11"
 description:
     - "Update an IP address in phpIPAM"
+    - "The IP Address is looked up in the subnet first, it is created when missing and otherwise only the fields that differ are updated"
+    - "Supports check mode and diff mode"
 
 options:
   phpipam_url:
@@ -31,8 +33,34 @@ options:
   phpipam_app_code:
     description:
       - This is the app code for your phpIPAM instance
-    required: true
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
+    type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
     type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
   phpipam_skip_tls_verify:
     description:
       - Whether or not to skip TLS verification
@@ -40,6 +68,13 @@ options:
     default: false
     type: bool
     aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
   subnet_id:
     description:
       - This is the ID of the subnet you want to get the first free IP Address from
@@ -116,22 +151,42 @@ EXAMPLES = '''
 
 RETURN = '''
 ip_address:
-    description: Details of the IP Address reservation request
-    type: object
+    description: The IP Address as it is after the task, with the fields that were set
+    type: dict
+    returned: success
+ip_address_id:
+    description: The phpIPAM ID of the IP Address, empty when it would be created in check mode
+    type: str
     returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_addresses import (
+    address_payload,
+    address_view,
+    apply_reservation,
+    find_address,
+    plan_reservation,
+)
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError, client_from_module
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         phpipam_url=dict(type='str', required=True),
         phpipam_app_id=dict(type='str', required=True),
-        phpipam_app_code=dict(type='str', required=True, no_log=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
         phpipam_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        collect_metrics=dict(type='bool', required=False, default=False),
 
         subnet_id=dict(type='int', required=True, aliases=['subnet']),
         ip=dict(type='str', required=True, aliases=['address', 'ip_address']),
@@ -164,55 +219,39 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
-        supports_check_mode=False
+        required_one_of=[['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
+        supports_check_mode=True
     )
 
-    headers = {
-        'Content-Type': 'application/json',
-        'token': module.params['phpipam_app_code']
-    }
-
-    # make the API call
-    targetURL = module.params['phpipam_url'] + '/api/' + module.params['phpipam_app_id'] + '/addresses/'
-
-    # Set the required parameters
-    payload = {
-        'ip': module.params['ip'],
-        'subnetId': int(module.params['subnet_id']),
-    }
-
-    # Append any set optional parameters
-    if module.params['hostname']:
-        payload['hostname'] = module.params['hostname']
-    if module.params['description']:
-        payload['description'] = module.params['description']
-    if module.params['tag']:
-        if module.params['tag'] == 'offline':
-            payload['tag'] = 1
-        elif module.params['tag'] == 'used':
-            payload['tag'] = 2
-        elif module.params['tag'] == 'reserved':
-            payload['tag'] = 3
-        elif module.params['tag'] == 'dhcp':
-            payload['tag'] = 4
-    if module.params['is_gateway']:
-        payload['is_gateway'] = module.params['is_gateway']
-    if module.params['ping_exclude']:
-        payload['ping_exclude'] = module.params['ping_exclude']
-    if module.params['ptr_exclude']:
-        payload['ptr_exclude'] = module.params['ptr_exclude']
-
-    response = requests.post(targetURL, headers=headers, json=payload, verify=not module.params['phpipam_skip_tls_verify'])
-    responseJSON = response.json()
-
-    # manipulate or modify the state as needed (this is going to be the
-    # part where your module will do what it needs to do)
-    #result['ip_address_id'] = response.json().get('id')
-    result['ip_address_id'] = responseJSON
-    result['changed'] = False
-
-    #if response.json().get('success') == True and response.json().code == 201:
-    #    result['changed'] = True
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    # Set the required parameters and any set optional ones
+    payload = dict(address_payload(module.params), ip=module.params['ip'], subnetId=int(module.params['subnet_id']))
+
+    # Read the address first, only what differs gets written
+    try:
+        current = find_address(client, module.params['ip'], module.params['subnet_id'])
+    except PhpIpamError as e:
+        module.fail_json(msg=str(e), **result)
+    action, fields = plan_reservation(current, payload)
+
+    result['changed'] = action != 'none'
+    result['ip_address'] = dict(current or {}, **fields)
+    if current is not None:
+        result['ip_address_id'] = current['id']
+
+    if module._diff:
+        result['diff'] = dict(before=address_view(current), after=address_view(result['ip_address']))
+
+    if result['changed'] and not module.check_mode:
+        try:
+            result['ip_address_id'] = apply_reservation(client, action, current, fields)
+        except PhpIpamError as e:
+            result['changed'] = False
+            module.fail_json(msg=str(e), **result)
+        result['ip_address']['id'] = result['ip_address_id']
 
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
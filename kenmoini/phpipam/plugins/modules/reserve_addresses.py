@@ -0,0 +1,373 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: reserve_addresses
+short_description: Reserve many IP addresses in phpIPAM in one task
+version_added: "2.11"
+description:
+    - "Reserve a list of IP addresses in phpIPAM in one task"
+    - "The reservations are sent over one pooled session, up to I(workers) at a time"
+    - "The addresses of each subnet are listed once, missing IP Addresses are created and existing ones only get the fields that differ updated"
+    - "Supports check mode and diff mode"
+
+options:
+  phpipam_url:
+    description:
+      - This is the URL of your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_id:
+    description:
+      - This is the app ID for your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_code:
+    description:
+      - This is the app code for your phpIPAM instance
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
+    type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
+    type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
+  phpipam_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    type: bool
+    aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  subnet_id:
+    description:
+      - The ID of the subnet of every entry of I(addresses) that does not set its own
+    required: false
+    type: int
+    aliases: ['subnet']
+  tag:
+    description:
+      - The tag of every entry of I(addresses) that does not set its own
+    required: false
+    choices: ['offline', 'used', 'reserved', 'dhcp']
+    default: 'reserved'
+    type: str
+  addresses:
+    description:
+      - The IP Addresses to reserve
+      - Each address may only be listed once per subnet
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      ip:
+        description:
+          - This is the IP Address you want to reserve
+        required: true
+        type: str
+        aliases: ['address', 'ip_address']
+      subnet_id:
+        description:
+          - The ID of the subnet of the IP Address
+        required: false
+        type: int
+        aliases: ['subnet']
+      hostname:
+        description:
+          - This is the hostname you want to assign to the IP Address
+        required: false
+        type: str
+      description:
+        description:
+          - This is the description you want to assign to the IP Address
+        required: false
+        type: str
+      tag:
+        description:
+          - This is the tag you want to assign to the IP Address
+        required: false
+        choices: ['offline', 'used', 'reserved', 'dhcp']
+        type: str
+      is_gateway:
+        description:
+          - Whether or not the IP Address is a gateway
+        required: false
+        type: bool
+      ping_exclude:
+        description:
+          - Whether or not to exclude the IP Address from pings
+        required: false
+        type: bool
+      ptr_exclude:
+        description:
+          - Whether or not to exclude the IP Address from PTR records
+        required: false
+        type: bool
+      owner:
+        description:
+          - The owner of the IP Address
+        required: false
+        type: str
+      note:
+        description:
+          - A note about the IP Address
+        required: false
+        type: str
+  workers:
+    description:
+      - The maximum number of reservations to send at the same time
+    required: false
+    default: 10
+    type: int
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Reserve the IP Addresses of a cluster
+- name: Reserve the cluster IP Addresses
+  kenmoini.phpipam.reserve_addresses:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    addresses:
+      - ip: 10.0.0.10
+        hostname: "node-1.example.com"
+      - ip: 10.0.0.11
+        hostname: "node-2.example.com"
+        description: "Second node"
+      - ip: 10.0.0.1
+        hostname: "gateway.example.com"
+        is_gateway: true
+        tag: used
+    workers: 20
+  register: r_addresses
+
+# Log in as a phpIPAM user, the token is reused by every task and host
+- name: Reserve IP Addresses with a user token
+  kenmoini.phpipam.reserve_addresses:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: ansible
+    phpipam_username: ansible
+    phpipam_password: "{{ vault_phpipam_password }}"
+    subnet_id: 123
+    addresses:
+      - ip: 10.0.0.20
+        hostname: "{{ inventory_hostname }}"
+'''
+
+RETURN = '''
+addresses:
+    description: The result for each IP Address, in the order given
+    type: list
+    returned: always
+    sample: [{"ip": "10.0.0.10", "subnet_id": 123, "id": "42", "action": "create", "changed": true}]
+reserved:
+    description: The IP Addresses that were created or updated
+    type: list
+    returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_addresses import (
+    address_payload,
+    address_view,
+    apply_reservation,
+    plan_reservation,
+    subnet_addresses,
+)
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError, client_from_module
+
+def reserve(client, operation):
+    """Send the write for one planned reservation, runs in a worker thread"""
+    outcome = dict(ip=operation['ip'], subnet_id=operation['subnet_id'], action=operation['action'], changed=False)
+    if operation['current'] is not None:
+        outcome['id'] = operation['current']['id']
+    if operation['action'] == 'none':
+        return outcome
+    try:
+        outcome['id'] = apply_reservation(client, operation['action'], operation['current'], operation['fields'])
+    except PhpIpamError as e:
+        outcome['failed'] = True
+        outcome['msg'] = str(e)
+        return outcome
+    outcome['changed'] = True
+    return outcome
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        phpipam_url=dict(type='str', required=True),
+        phpipam_app_id=dict(type='str', required=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
+        phpipam_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+
+        subnet_id=dict(type='int', required=False, aliases=['subnet']),
+        tag=dict(type='str', required=False, choices=['offline', 'used', 'reserved', 'dhcp'], default='reserved'),
+
+        addresses=dict(
+            type='list',
+            elements='dict',
+            required=True,
+            options=dict(
+                ip=dict(type='str', required=True, aliases=['address', 'ip_address']),
+                subnet_id=dict(type='int', required=False, aliases=['subnet']),
+                hostname=dict(type='str', required=False),
+                description=dict(type='str', required=False),
+                tag=dict(type='str', required=False, choices=['offline', 'used', 'reserved', 'dhcp']),
+                is_gateway=dict(type='bool', required=False),
+                ping_exclude=dict(type='bool', required=False),
+                ptr_exclude=dict(type='bool', required=False),
+                owner=dict(type='str', required=False),
+                note=dict(type='str', required=False),
+            ),
+        ),
+        workers=dict(type='int', required=False, default=10),
+    )
+
+    result = dict(
+        changed=False,
+        addresses=[],
+        reserved=[],
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
+        supports_check_mode=True
+    )
+
+    if module.params['workers'] < 1:
+        module.fail_json(msg='workers must be at least 1', **result)
+
+    entries = []
+    for entry in module.params['addresses']:
+        entry = dict(entry)
+        if entry['subnet_id'] is None:
+            entry['subnet_id'] = module.params['subnet_id']
+        if entry['subnet_id'] is None:
+            module.fail_json(msg='No subnet_id for address ' + entry['ip'], **result)
+        if entry['tag'] is None:
+            entry['tag'] = module.params['tag']
+        entries.append(entry)
+
+    # Two entries for one address would race each other's writes
+    seen = set()
+    duplicates = []
+    for entry in entries:
+        if (entry['subnet_id'], entry['ip']) in seen and entry['ip'] not in duplicates:
+            duplicates.append(entry['ip'])
+        seen.add((entry['subnet_id'], entry['ip']))
+    if duplicates:
+        module.fail_json(msg='Each address may only be listed once per subnet, listed more than once: ' + ', '.join(duplicates), **result)
+
+    # Create the pooled API client, sized so every worker gets a connection.
+    # Worker threads must not call fail_json, so errors are raised instead.
+    client = client_from_module(module, pool_size=module.params['workers'], fail_on_error=False)
+
+    # List each subnet once and plan every entry against that listing
+    indexes = {}
+    try:
+        for subnetId in sorted(set(entry['subnet_id'] for entry in entries)):
+            indexes[subnetId] = subnet_addresses(client, subnetId)
+    except PhpIpamError as e:
+        module.fail_json(msg=str(e), **result)
+
+    operations = []
+    for entry in entries:
+        current = indexes[entry['subnet_id']].get(entry['ip'])
+        payload = dict(address_payload(entry), ip=entry['ip'], subnetId=entry['subnet_id'])
+        action, fields = plan_reservation(current, payload)
+        operations.append(dict(ip=entry['ip'], subnet_id=entry['subnet_id'], current=current, action=action, fields=fields))
+
+    if module._diff:
+        result['diff'] = dict(before={}, after={})
+        for operation in operations:
+            if operation['action'] != 'none':
+                result['diff']['before'][operation['ip']] = address_view(operation['current'])
+                result['diff']['after'][operation['ip']] = address_view(dict(operation['current'] or {}, **operation['fields']))
+
+    if module.check_mode:
+        # Report the plan as if it had been applied, without writing anything
+        outcomes = []
+        for operation in operations:
+            outcome = dict(ip=operation['ip'], subnet_id=operation['subnet_id'], action=operation['action'], changed=operation['action'] != 'none')
+            if operation['current'] is not None:
+                outcome['id'] = operation['current']['id']
+            outcomes.append(outcome)
+    else:
+        with ThreadPoolExecutor(max_workers=module.params['workers']) as executor:
+            outcomes = list(executor.map(lambda operation: reserve(client, operation), operations))
+
+    failed = []
+    for outcome in outcomes:
+        result['addresses'].append(outcome)
+        if outcome.get('failed'):
+            failed.append(outcome['ip'])
+        elif outcome['changed']:
+            result['reserved'].append(outcome['ip'])
+
+    result['changed'] = bool(result['reserved'])
+
+    if failed:
+        module.fail_json(msg='Failed to reserve addresses: ' + ', '.join(failed), **result)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
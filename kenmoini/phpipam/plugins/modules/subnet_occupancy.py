@@ -0,0 +1,254 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: subnet_occupancy
+short_description: Find the free IP Addresses and free ranges of a subnet in phpIPAM
+version_added: "2.11"
+description:
+    - "Read a subnet and its IP Addresses from phpIPAM once and work out locally which addresses are free"
+    - "Returns the next free IP Addresses, the largest block of free addresses and the free ranges of the subnet"
+    - "Nothing is reserved, use M(kenmoini.phpipam.reserve_addresses) or M(kenmoini.phpipam.allocate_address) for that"
+
+options:
+  phpipam_url:
+    description:
+      - This is the URL of your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_id:
+    description:
+      - This is the app ID for your phpIPAM instance
+    required: true
+    type: str
+  phpipam_app_code:
+    description:
+      - This is the app code for your phpIPAM instance
+      - Not needed when logging in with I(phpipam_username) to an app using user tokens
+    required: false
+    type: str
+  phpipam_username:
+    description:
+      - The phpIPAM user to log in as, the token phpIPAM returns is sent instead of the app code
+      - The token is kept in I(phpipam_token_dir) and shared by every task and fork on the controller
+    required: false
+    type: str
+  phpipam_password:
+    description:
+      - The password of I(phpipam_username)
+    required: false
+    type: str
+  phpipam_token_dir:
+    description:
+      - Directory to keep the phpIPAM user tokens in
+      - Can also be set with the C(PHPIPAM_TOKEN_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/phpipam_tokens
+    type: path
+  phpipam_token_ttl:
+    description:
+      - Seconds to keep using a user token before logging in again, keep it below the token expiry of the phpIPAM app
+      - A token phpIPAM refuses earlier is renewed straight away
+    required: false
+    default: 3600
+    type: int
+  phpipam_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    type: bool
+    aliases: ['skip_tls_verify']
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as C(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  subnet_id:
+    description:
+      - This is the ID of the subnet you want to find free IP Addresses in
+    required: true
+    type: int
+    aliases: ['subnet']
+  count:
+    description:
+      - The number of free IP Addresses to return in C(free_addresses)
+    required: false
+    default: 1
+    type: int
+  contiguous:
+    description:
+      - Return the first I(count) free IP Addresses that are next to each other rather than the first free ones
+    required: false
+    default: false
+    type: bool
+  max_ranges:
+    description:
+      - The most free ranges to return in C(free_ranges), 0 returns them all
+    required: false
+    default: 100
+    type: int
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Plan the IP Addresses of a cluster with one read of the subnet
+- name: Find 3 free IP Addresses in the target subnet
+  kenmoini.phpipam.subnet_occupancy:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    count: 3
+  register: r_occupancy
+
+# Find a block of 16 consecutive free IP Addresses
+- name: Find a free block for a load balancer pool
+  kenmoini.phpipam.subnet_occupancy:
+    phpipam_url: https://phpipam.example.com
+    phpipam_app_id: 1234567890
+    phpipam_app_code: 1234567890
+    subnet_id: 123
+    count: 16
+    contiguous: true
+    max_ranges: 0
+  register: r_occupancy
+'''
+
+RETURN = '''
+subnet:
+    description: The subnet in CIDR notation
+    type: str
+    returned: success
+    sample: "10.0.0.0/24"
+usable:
+    description: The number of usable host addresses in the subnet
+    type: int
+    returned: success
+    sample: 254
+used:
+    description: The number of usable host addresses phpIPAM has an address for
+    type: int
+    returned: success
+    sample: 12
+free:
+    description: The number of free host addresses
+    type: int
+    returned: success
+    sample: 242
+free_addresses:
+    description: The first free IP Addresses, fewer than I(count) when the subnet does not have enough
+    type: list
+    returned: success
+    sample: ["10.0.0.13", "10.0.0.14", "10.0.0.15"]
+largest_free_block:
+    description: The first of the largest runs of free IP Addresses, null when the subnet is full
+    type: dict
+    returned: success
+    sample: {"start": "10.0.0.13", "end": "10.0.0.254", "size": 242}
+free_ranges:
+    description: The runs of free IP Addresses in order, at most I(max_ranges) of them
+    type: list
+    returned: success
+    sample: [{"start": "10.0.0.5", "end": "10.0.0.5", "size": 1}, {"start": "10.0.0.13", "end": "10.0.0.254", "size": 242}]
+free_ranges_truncated:
+    description: Whether the subnet has more free ranges than I(max_ranges)
+    type: bool
+    returned: success
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+'''
+
+import itertools
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_auth import DEFAULT_TOKEN_DIR
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_client import PhpIpamError, client_from_module
+from ansible_collections.kenmoini.phpipam.plugins.module_utils.phpipam_occupancy import subnet_occupancy
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        phpipam_url=dict(type='str', required=True),
+        phpipam_app_id=dict(type='str', required=True),
+        phpipam_app_code=dict(type='str', required=False, no_log=True),
+        phpipam_username=dict(type='str', required=False),
+        phpipam_password=dict(type='str', required=False, no_log=True),
+        phpipam_token_dir=dict(type='path', required=False, default=DEFAULT_TOKEN_DIR, fallback=(env_fallback, ['PHPIPAM_TOKEN_DIR'])),
+        phpipam_token_ttl=dict(type='int', required=False, default=3600),
+        phpipam_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+
+        subnet_id=dict(type='int', required=True, aliases=['subnet']),
+        count=dict(type='int', required=False, default=1),
+        contiguous=dict(type='bool', required=False, default=False),
+        max_ranges=dict(type='int', required=False, default=100),
+    )
+
+    result = dict(
+        changed=False
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[['phpipam_app_code', 'phpipam_username']],
+        required_together=[['phpipam_username', 'phpipam_password']],
+        supports_check_mode=True
+    )
+
+    if module.params['count'] < 1:
+        module.fail_json(msg='count must be at least 1', **result)
+    if module.params['max_ranges'] < 0:
+        module.fail_json(msg='max_ranges must not be negative', **result)
+
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    # One read of the subnet and one of its addresses, everything else is local
+    try:
+        _, occupancy = subnet_occupancy(client, module.params['subnet_id'])
+    except PhpIpamError as e:
+        module.fail_json(msg=str(e), **result)
+
+    count = module.params['count']
+    if module.params['contiguous']:
+        block = occupancy.first_block(count)
+        offsets = range(block[0], block[1] + 1) if block else []
+    else:
+        offsets = occupancy.next_free(count)
+
+    largest = occupancy.largest_block()
+    maxRanges = module.params['max_ranges'] or None
+    ranges = list(itertools.islice(occupancy.free_ranges(), maxRanges + 1 if maxRanges else None))
+
+    result['subnet'] = str(occupancy.network)
+    result['usable'] = occupancy.usable
+    result['used'] = occupancy.used
+    result['free'] = occupancy.free
+    result['free_addresses'] = [occupancy.address(offset) for offset in offsets]
+    result['largest_free_block'] = occupancy.describe(largest) if largest else None
+    result['free_ranges'] = [occupancy.describe(block) for block in ranges[:maxRanges]]
+    result['free_ranges_truncated'] = maxRanges is not None and len(ranges) > maxRanges
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = '''
+---
+name: pdns
+short_description: Build an inventory from the Records in PowerDNS Admin
+version_added: "2.11"
+description:
+    - "Builds hosts from the A, AAAA and CNAME Records of the Zones in PowerDNS Admin"
+    - "Zones are fetched concurrently and hosts are grouped by Zone, Account and Record type"
+    - "The inventory file name must end with C(pdns.yml) or C(pdns.yaml)"
+    - "Supports the Ansible inventory cache so repeated runs do not download every Zone again"
+extends_documentation_fragment:
+  - constructed
+  - inventory_cache
+options:
+  plugin:
+    description:
+      - The name of this plugin, it should always be set to C(kenmoini.powerdns_admin.pdns)
+    required: true
+    choices: ['kenmoini.powerdns_admin.pdns']
+  pdns_admin_url:
+    description:
+      - This is the URL of your PowerDNS Admin instance
+    required: true
+    type: str
+    aliases: ['url']
+    env:
+      - name: PDNS_ADMIN_URL
+  pdns_admin_api_key:
+    description:
+      - This is the API Key for your PowerDNS Admin instance
+    required: true
+    type: str
+    aliases: ['api_key']
+    env:
+      - name: PDNS_ADMIN_API_KEY
+  pdns_admin_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    default: false
+    type: bool
+    aliases: ['skip_tls_verify']
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    default: 30
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    default: 3
+    type: int
+  pdns_server_id:
+    description:
+      - The PowerDNS Server ID to use
+    default: localhost
+    type: str
+    aliases: ['server_id']
+  zones:
+    description:
+      - Only build hosts from these Zones, all Zones are used when not set
+    type: list
+    elements: str
+    default: []
+  accounts:
+    description:
+      - Only build hosts from the Zones of these Accounts
+    type: list
+    elements: str
+    default: []
+  record_types:
+    description:
+      - The Record types that become hosts
+    type: list
+    elements: str
+    default: ['A', 'AAAA', 'CNAME']
+  include_disabled:
+    description:
+      - Whether Records that are disabled in PowerDNS still become hosts
+    default: false
+    type: bool
+  workers:
+    description:
+      - The maximum number of Zones to fetch at the same time
+    default: 10
+    type: int
+'''
+
+EXAMPLES = '''
+# pdns.yml - every A, AAAA and CNAME Record of two Zones
+plugin: kenmoini.powerdns_admin.pdns
+pdns_admin_url: https://pdns.example.com
+pdns_admin_api_key: 1234567890
+zones:
+  - example.com.
+  - lab.example.com.
+
+# pdns.yml - the Zones of an Account, cached for an hour, with extra groups
+# The URL and API Key are read from PDNS_ADMIN_URL and PDNS_ADMIN_API_KEY
+plugin: kenmoini.powerdns_admin.pdns
+accounts:
+  - someaccount
+record_types:
+  - A
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.ansible/tmp/pdns_inventory
+cache_timeout: 3600
+keyed_groups:
+  - key: pdns_ttl | string
+    prefix: ttl
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.errors import AnsibleError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminClient, PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import lookup_rrsets
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zones import ZoneIndex
+
+# Host vars come from the first record type a host has, in this order
+ADDRESS_TYPES = ('A', 'AAAA', 'CNAME')
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'kenmoini.powerdns_admin.pdns'
+
+    def verify_file(self, path):
+        if super(InventoryModule, self).verify_file(path):
+            return path.endswith(('pdns.yml', 'pdns.yaml'))
+        return False
+
+    def _client(self):
+        return PowerDNSAdminClient(
+            self.get_option('pdns_admin_url'),
+            headers={'X-API-Key': self.get_option('pdns_admin_api_key')},
+            verify=not self.get_option('pdns_admin_skip_tls_verify'),
+            timeout=self.get_option('pdns_admin_timeout'),
+            retries=self.get_option('pdns_admin_retries'),
+            pool_size=self.get_option('workers'),
+        )
+
+    def _fetch_zone(self, client, zone):
+        zonePath = '/servers/' + self.get_option('pdns_server_id') + '/zones/' + zone['name']
+        response, rrsets = lookup_rrsets(client, zonePath)
+        if rrsets is None:
+            raise PowerDNSAdminError('Failed to read zone {}: {}'.format(zone['name'], response.text))
+        record_types = set(rtype.upper() for rtype in self.get_option('record_types'))
+        return [rrset for rrset in rrsets if rrset['type'] in record_types]
+
+    def _fetch(self):
+        """Download the zone listing and the wanted rrsets of every zone"""
+        client = self._client()
+        try:
+            listResponse = client.get('/servers/' + self.get_option('pdns_server_id') + '/zones')
+            if listResponse.status_code != 200:
+                raise AnsibleError('Failed to list zones: ' + listResponse.text)
+            zones = ZoneIndex(listResponse.json()).find(
+                names=self.get_option('zones'),
+                accounts=self.get_option('accounts'),
+            )
+
+            results = dict(zones=[], rrsets={})
+            with ThreadPoolExecutor(max_workers=max(self.get_option('workers'), 1)) as executor:
+                futures = [(zone, executor.submit(self._fetch_zone, client, zone)) for zone in zones]
+                for zone, future in futures:
+                    try:
+                        results['rrsets'][zone['name']] = future.result()
+                    except PowerDNSAdminError as e:
+                        self.display.warning(str(e))
+                        continue
+                    results['zones'].append(dict((key, zone.get(key)) for key in ('id', 'name', 'account', 'kind', 'serial')))
+            return results
+        except PowerDNSAdminError as e:
+            raise AnsibleError(str(e))
+        finally:
+            client.close()
+
+    def _add_group(self, name, host):
+        group = self.inventory.add_group(self._sanitize_group_name(name))
+        self.inventory.add_child(group, host)
+
+    def _populate(self, results):
+        include_disabled = self.get_option('include_disabled')
+        strict = self.get_option('strict')
+
+        hosts = {}
+        for zone in results['zones']:
+            for rrset in results['rrsets'].get(zone['name'], []):
+                contents = [record['content'] for record in rrset.get('records', []) if include_disabled or not record.get('disabled')]
+                if not contents:
+                    continue
+
+                hostname = rrset['name'].rstrip('.')
+                host = hosts.setdefault(hostname, dict(
+                    pdns_zone=zone['name'],
+                    pdns_account=zone.get('account') or '',
+                    pdns_records={},
+                ))
+                host['pdns_records'][rrset['type']] = contents
+                host.setdefault('pdns_ttl', rrset.get('ttl'))
+
+        for hostname, hostvars in hosts.items():
+            self.inventory.add_host(hostname)
+            for rtype in ADDRESS_TYPES:
+                if rtype in hostvars['pdns_records']:
+                    hostvars['ansible_host'] = hostvars['pdns_records'][rtype][0].rstrip('.')
+                    break
+            for key, value in hostvars.items():
+                self.inventory.set_variable(hostname, key, value)
+
+            self._add_group('zone_' + hostvars['pdns_zone'].rstrip('.'), hostname)
+            if hostvars['pdns_account']:
+                self._add_group('account_' + hostvars['pdns_account'], hostname)
+            for rtype in hostvars['pdns_records']:
+                self._add_group('type_' + rtype, hostname)
+
+            self._set_composite_vars(self.get_option('compose'), hostvars, hostname, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, hostname, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, hostname, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        results = None
+        if attempt_to_read_cache:
+            try:
+                results = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+
+        if results is None:
+            results = self._fetch()
+
+        if cache_needs_update:
+            self._cache[cache_key] = results
+
+        self._populate(results)
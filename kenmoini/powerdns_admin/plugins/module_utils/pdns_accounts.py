@@ -0,0 +1,95 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers to find and compare PowerDNS Admin Accounts
+
+from ansible.module_utils.six.moves.urllib.parse import quote
+
+ACCOUNTS_PATH = '/pdnsadmin/accounts'
+
+# The account fields that can be set through the API besides the name
+ACCOUNT_FIELDS = ('description', 'contact', 'mail')
+
+
+class AccountIndex(object):
+    """name -> account and id -> account maps built once from an account listing"""
+
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.by_name = dict((account['name'], account) for account in accounts)
+        self.by_id = dict((account['id'], account) for account in accounts)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def id_of(self, name):
+        account = self.by_name.get(name)
+        return account['id'] if account else None
+
+
+def list_accounts(client, **kwargs):
+    """Return the response and an AccountIndex of every account, or None if the request failed"""
+    response = client.get(ACCOUNTS_PATH, **kwargs)
+    if response.status_code != 200:
+        return response, None
+    return response, AccountIndex(response.json())
+
+
+def find_account(client, name):
+    """Look up a single account by name without listing every account.
+
+    Uses GET /pdnsadmin/accounts/<name>, which answers 404 when there is no such
+    account.  Falls back to the full listing if the server does not allow the
+    by-name lookup or the name cannot be put in the path.  Returns the
+    response and the account, None when it does not exist or False when the
+    request failed.
+    """
+    # The name is quoted so ?, # and spaces stay part of it.  The server
+    # decodes the path before routing it, so a quoted / still splits it, and
+    # the URL parser resolves the dot segments away.  Those names are looked
+    # up in the listing instead
+    if '/' in name or name in ('.', '..'):
+        response = None
+    else:
+        response = client.get(ACCOUNTS_PATH + '/' + quote(name, safe=''))
+        if response.status_code == 404:
+            return response, None
+    if response is None or response.status_code == 405:
+        response, index = list_accounts(client)
+        if index is None:
+            return response, False
+        return response, index.get(name)
+    if response.status_code != 200:
+        return response, False
+
+    # Depending on the version the lookup returns the account or a list of them
+    data = response.json()
+    for account in data if isinstance(data, list) else [data]:
+        if account.get('name') == name:
+            return response, account
+    return response, None
+
+
+def account_payload(params, current=None):
+    """Build the fields to send for an account.
+
+    Without ``current`` every set field is returned.  With ``current`` only the
+    fields that differ from it are, so an empty dict means nothing to update.
+    """
+    payload = {}
+    for field in ACCOUNT_FIELDS:
+        if not params.get(field):
+            continue
+        if current is None or current.get(field) != params[field]:
+            payload[field] = params[field]
+    return payload
+
+
+def account_view(account):
+    """The fields of an account as shown in diff output, empty if it does not exist"""
+    if not account:
+        return {}
+    view = dict(name=account.get('name'))
+    for field in ACCOUNT_FIELDS:
+        view[field] = account.get(field) or ''
+    return view
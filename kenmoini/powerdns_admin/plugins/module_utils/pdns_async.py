@@ -0,0 +1,223 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Asyncio client for very wide read-only fan-out against PowerDNS Admin.
+#
+# A thread per request in flight stops scaling long before thousands of zones,
+# so this client runs every GET as a coroutine on one event loop.  aiohttp is
+# used when it is installed.  Without it each request runs through the pooled
+# synchronous client in a small thread pool, which keeps the same interface
+# and limits but only as much concurrency as there are connections.
+#
+# Three limits apply to every request: a semaphore on the requests in flight,
+# a cap on the connections to the host, and an optional token bucket on the
+# request rate that all coroutines share.
+
+import asyncio
+import functools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import cache_from_params
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import (
+    RETRY_STATUS_CODES,
+    PowerDNSAdminClient,
+    PowerDNSAdminError,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_metrics import metrics_from_module
+
+
+class RateLimiter(object):
+    """Token bucket allowing ``rate`` requests per second with bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = burst or max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = None
+
+    async def acquire(self):
+        if self.lock is None:
+            # Created here so it belongs to the running loop
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncResponse(object):
+    """The parts of a response the modules use, read in full before the connection is released"""
+
+    from_cache = False
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        pass
+
+
+class AsyncPowerDNSAdminClient(object):
+    """Read-only asyncio counterpart of PowerDNSAdminClient.
+
+    Use it as an async context manager inside the event loop.  Transport
+    errors raise PowerDNSAdminError once the retries are used up, 429 and 5xx
+    responses are retried with the same backoff as the synchronous client.
+    """
+
+    def __init__(self, url, headers=None, verify=True, timeout=30, retries=3, backoff_factor=0.5,
+                 concurrency=100, per_host=10, rate_limit=0, cache=None, metrics=None):
+        self.base_url = url.rstrip('/') + '/api/v1'
+        self.headers = {'Content-Type': 'application/json'}
+        self.headers.update(headers or {})
+        self.verify = verify
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.cache = cache
+        self.metrics = metrics
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.requests = 0
+        self._semaphore = None
+        self._session = None
+        self._sync = None
+        self._executor = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if HAS_AIOHTTP:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host, ssl=None if self.verify else False)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        else:
+            self._sync = PowerDNSAdminClient(
+                self.base_url[:-len('/api/v1')],
+                headers=self.headers,
+                verify=self.verify,
+                timeout=self.timeout,
+                retries=self.retries,
+                backoff_factor=self.backoff_factor,
+                pool_size=self.per_host,
+                metrics=self.metrics,
+            )
+            self._executor = ThreadPoolExecutor(max_workers=self.per_host)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._session is not None:
+            await self._session.close()
+        if self._sync is not None:
+            self._executor.shutdown(wait=True)
+            self._sync.close()
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _cache_key(self, path, params):
+        credential = self.headers.get('X-API-Key') or self.headers.get('Authorization')
+        return self.cache.key(self.url(path), params, credential)
+
+    async def get(self, path, params=None, cache_tags=None):
+        use_cache = cache_tags is not None and self.cache is not None and self.cache.enabled
+        if use_cache:
+            key = self._cache_key(path, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.record_cache_hit(cached)
+                return cached
+
+        async with self._semaphore:
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            fetched = time.time()
+            response = await self._request('GET', path, params)
+
+        if use_cache and response.status_code == 200:
+            tags = [self.base_url + '|' + tag for tag in cache_tags]
+            self.cache.set(key, response.status_code, response.text, tags, fetched)
+        return response
+
+    async def _request(self, method, path, params):
+        self.requests += 1
+        if self._session is None:
+            # The synchronous client counts the request itself
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self._executor, functools.partial(self._sync.request, method, path, params=params))
+            return self._timed(AsyncResponse(response.status_code, response.text))
+
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            try:
+                async with self._session.request(method, self.url(path), params=params) as response:
+                    status = response.status
+                    body = await response.read()
+                    text = body.decode(response.get_encoding())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    if self.metrics is not None:
+                        self.metrics.record(method, path, None, time.monotonic() - started, retries=attempt)
+                    raise PowerDNSAdminError('Request to {} failed: {}'.format(self.url(path), str(e) or type(e).__name__))
+            else:
+                if status not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    if self.metrics is not None:
+                        self.metrics.record(method, path, status, time.monotonic() - started, bytes_in=len(body), retries=attempt)
+                    return self._timed(AsyncResponse(status, text))
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    def _timed(self, response):
+        if self.metrics is not None:
+            self.metrics.time_json(response)
+        return response
+
+
+def async_client_from_module(module, concurrency=100, per_host=10, rate_limit=0):
+    """Build an AsyncPowerDNSAdminClient from the common pdns_admin_* module parameters"""
+    params = module.params
+    return AsyncPowerDNSAdminClient(
+        params['pdns_admin_url'],
+        headers={'X-API-Key': params['pdns_admin_api_key']},
+        verify=not params['pdns_admin_skip_tls_verify'],
+        timeout=params.get('pdns_admin_timeout', 30),
+        retries=params.get('pdns_admin_retries', 3),
+        backoff_factor=params.get('pdns_admin_retry_backoff', 0.5),
+        concurrency=concurrency,
+        per_host=per_host,
+        rate_limit=rate_limit,
+        cache=cache_from_params(params),
+        metrics=metrics_from_module(module),
+    )
+
+
+def run(coroutine):
+    """Run a coroutine to completion on a fresh event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
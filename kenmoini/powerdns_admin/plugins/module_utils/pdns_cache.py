@@ -0,0 +1,219 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Controller side response cache for the read-only PowerDNS Admin endpoints.
+#
+# Every module run is a fresh process, so the cache lives on disk.  Each entry
+# is one JSON file named after a hash of the URL, query parameters and
+# credentials.  Entries carry tags (a zone, the zone listing, the accounts)
+# and the writing modules bump the tag markers of whatever they change, which
+# invalidates every entry fetched before the write.  Eviction is LRU by file
+# mtime, bounded by a number of entries and a total size.
+#
+# Versioned entries are kept regardless of the TTL for as long as the version
+# they were stored with, such as a zone serial, is still current.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_DIR = '~/.ansible/tmp/powerdns_admin_cache'
+
+ACCOUNTS_TAG = 'accounts'
+SERVERS_TAG = 'servers'
+
+
+def zone_tag(server_id, zone):
+    return 'zone:{}/{}'.format(server_id, zone.rstrip('.').lower())
+
+
+def zones_tag(server_id):
+    return 'zones:{}'.format(server_id)
+
+
+def zone_names_tag(server_id):
+    # Only zones being created or deleted change it, unlike zones_tag which
+    # every write does through the serials in the listing
+    return 'zone-names:{}'.format(server_id)
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CachedResponse(object):
+    """Stands in for a requests Response when the body comes from the cache"""
+
+    from_cache = True
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        pass
+
+
+class ResponseCache(object):
+
+    def __init__(self, directory, ttl=0, max_entries=1000, max_size=100 * 1024 * 1024):
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries_dir = os.path.join(self.directory, 'entries')
+        self.tags_dir = os.path.join(self.directory, 'tags')
+
+    @property
+    def enabled(self):
+        return bool(self.ttl) and self.ttl > 0
+
+    def _ttl(self, ttl):
+        return self.ttl if ttl is None else ttl
+
+    def key(self, url, params, credential):
+        return _hash(url, json.dumps(params or {}, sort_keys=True), _hash(credential or ''))
+
+    def _entry_path(self, key):
+        return os.path.join(self.entries_dir, key + '.json')
+
+    def _tag_path(self, tag):
+        return os.path.join(self.tags_dir, _hash(tag))
+
+    def _tag_time(self, tag):
+        try:
+            with open(self._tag_path(tag)) as f:
+                return float(f.read() or 0)
+        except (IOError, OSError, ValueError):
+            return 0
+
+    def _write_atomic(self, directory, path, data):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.rename(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _load(self, key, is_stale):
+        path = self._entry_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        fetched = entry.get('fetched', 0)
+        stale = is_stale(entry)
+        if not stale:
+            # Any write to a tagged object after the fetch invalidates the entry
+            stale = any(self._tag_time(tag) >= fetched for tag in entry.get('tags', []))
+        if stale:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+
+        # Touch the entry so eviction drops the least recently used ones first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return CachedResponse(entry['status'], entry['text'])
+
+    def _store(self, key, entry):
+        try:
+            self._write_atomic(self.entries_dir, self._entry_path(key), json.dumps(entry))
+            self.evict()
+        except (IOError, OSError):
+            # The cache is an optimisation, never fail a task because of it
+            pass
+
+    def get(self, key, ttl=None):
+        """The stored response, ``ttl`` overrides the TTL of the cache for this one read"""
+        ttl = self._ttl(ttl)
+        if not ttl or ttl <= 0:
+            return None
+        return self._load(key, lambda entry: time.time() - entry.get('fetched', 0) > ttl)
+
+    def set(self, key, status_code, text, tags, fetched, ttl=None):
+        """Store a response body.
+
+        ``fetched`` is the time the request was sent, so a write that lands
+        while the request is in flight still invalidates the entry.
+        """
+        ttl = self._ttl(ttl)
+        if not ttl or ttl <= 0:
+            return
+        self._store(key, dict(fetched=fetched, tags=list(tags), status=status_code, text=text))
+
+    def get_versioned(self, key, version):
+        """Return the response stored with set_versioned if it was stored at ``version``"""
+        return self._load(key, lambda entry: entry.get('version') != version)
+
+    def set_versioned(self, key, version, status_code, text, tags, fetched):
+        """Store a response body that stays valid until its version changes, whatever the TTL"""
+        self._store(key, dict(fetched=fetched, version=version, tags=list(tags), status=status_code, text=text))
+
+    def invalidate(self, tags):
+        """Mark everything tagged with any of ``tags`` as stale.
+
+        Does nothing when the cache directory has never been created, so
+        writing modules do not create a cache nobody asked for.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        now = repr(time.time())
+        for tag in tags:
+            try:
+                self._write_atomic(self.tags_dir, self._tag_path(tag), now)
+            except (IOError, OSError):
+                pass
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.entries_dir):
+            path = os.path.join(self.entries_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort()
+        while entries and (len(entries) > self.max_entries or total_size > self.max_size):
+            mtime, size, path = entries.pop(0)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_size -= size
+
+
+def cache_from_params(params):
+    """Build the cache from the cache_* module parameters, or None if the module has none"""
+    if params.get('cache_dir') is None:
+        return None
+    return ResponseCache(
+        params['cache_dir'],
+        ttl=params.get('cache_ttl') or 0,
+        max_entries=params.get('cache_max_entries') or 1000,
+        max_size=params.get('cache_max_size') or 100 * 1024 * 1024,
+    )
@@ -0,0 +1,207 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Shared HTTP client for the PowerDNS Admin modules.
+#
+# Every module used to call requests.get/patch/put/post directly, which meant a
+# fresh TCP+TLS handshake for each call.  This client keeps a single pooled
+# keep-alive Session per module run, retries 429/5xx responses with backoff and
+# applies a timeout to every request.
+
+import base64
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import cache_from_params
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_metrics import metrics_from_module
+
+# Status codes that are safe to retry - rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# POST is left out on purpose, it is not idempotent against the PowerDNS API
+RETRY_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+
+class PowerDNSAdminError(Exception):
+    pass
+
+
+def basic_auth_header(username, password):
+    userpass = username + ':' + password
+    return 'Basic ' + base64.b64encode(userpass.encode('ascii')).decode('ascii')
+
+
+def _build_retry(retries, backoff_factor):
+    retry_args = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(allowed_methods=RETRY_METHODS, **retry_args)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=RETRY_METHODS, **retry_args)
+
+
+class PowerDNSAdminClient(object):
+    """Pooled, retrying HTTP client for the PowerDNS Admin API.
+
+    Paths passed to the request helpers are relative to ``<url>/api/v1``.
+    When a module is given, transport errors end the run with fail_json,
+    otherwise a PowerDNSAdminError is raised.
+
+    With a ResponseCache attached, GETs made with ``cache_tags`` are served
+    from the cache while fresh, and invalidate() marks tagged entries stale.
+    With a RequestMetrics attached every request and cache hit is counted.
+    """
+
+    def __init__(self, url, headers=None, verify=True, timeout=30, retries=3,
+                 backoff_factor=0.5, pool_size=10, module=None, cache=None, metrics=None):
+        self.base_url = url.rstrip('/') + '/api/v1'
+        self.timeout = timeout
+        self.module = module
+        self.cache = cache
+        self.metrics = metrics
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=_build_retry(retries, backoff_factor),
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.verify = verify
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if headers:
+            self.session.headers.update(headers)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.exceptions.RequestException as e:
+            if self.metrics is not None:
+                self.metrics.record(method, path, None, time.monotonic() - started)
+            msg = 'Request to {} failed: {}'.format(self.url(path), e)
+            if self.module is not None:
+                self.module.fail_json(msg=msg)
+            raise PowerDNSAdminError(msg)
+        if self.metrics is not None:
+            self.metrics.record_response(method, path, response, time.monotonic() - started, stream=kwargs.get('stream', False))
+        return response
+
+    def _cache_tags(self, tags):
+        # Scope tags to the instance so two PowerDNS Admins never share entries
+        return [self.base_url + '|' + tag for tag in tags]
+
+    def _cache_key(self, path, params, versioned=False):
+        credential = self.session.headers.get('X-API-Key') or self.session.headers.get('Authorization')
+        return self.cache.key(('versioned:' if versioned else '') + self.url(path), params, credential)
+
+    def get(self, path, cache_tags=None, cache_ttl=None, **kwargs):
+        """GET ``path``, from the cache when ``cache_tags`` is given and the cache is on.
+
+        ``cache_ttl`` overrides the TTL of the cache for this one read, so a
+        read can be cached while the cache is otherwise off.
+        """
+        if cache_tags is None or self.cache is None or kwargs.get('stream'):
+            return self.request('GET', path, **kwargs)
+        ttl = self.cache.ttl if cache_ttl is None else cache_ttl
+        if not ttl or ttl <= 0:
+            return self.request('GET', path, **kwargs)
+
+        key = self._cache_key(path, kwargs.get('params'))
+        cached = self.cache.get(key, ttl)
+        if cached is not None:
+            if self.metrics is not None:
+                self.metrics.record_cache_hit(cached)
+            return cached
+
+        fetched = time.time()
+        response = self.request('GET', path, **kwargs)
+        if response.status_code == 200:
+            self.cache.set(key, response.status_code, response.text, self._cache_tags(cache_tags), fetched, ttl)
+        return response
+
+    def get_versioned(self, path, version, cache_tags=None, **kwargs):
+        """GET a response that is reused for as long as ``version`` stays the same.
+
+        The version is something the caller checked cheaply beforehand, such as
+        the serial of a zone.  Unlike get() this does not depend on a cache TTL.
+        """
+        if self.cache is None or version is None or kwargs.get('stream'):
+            return self.request('GET', path, **kwargs)
+
+        key = self._cache_key(path, kwargs.get('params'), versioned=True)
+        cached = self.cache.get_versioned(key, version)
+        if cached is not None:
+            if self.metrics is not None:
+                self.metrics.record_cache_hit(cached)
+            return cached
+
+        fetched = time.time()
+        response = self.request('GET', path, **kwargs)
+        if response.status_code == 200:
+            self.cache.set_versioned(key, version, response.status_code, response.text, self._cache_tags(cache_tags or []), fetched)
+        return response
+
+    def invalidate(self, *tags):
+        """Drop cached reads of whatever was just written"""
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_tags(tags))
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def client_from_module(module, auth='api_key', pool_size=10, fail_on_error=True):
+    """Build a client from the common pdns_admin_* module parameters.
+
+    ``auth`` is 'api_key' for the /servers endpoints or 'basic' for the
+    /pdnsadmin endpoints, which take the PowerDNS Admin username and password.
+    Clients shared by worker threads should be built with fail_on_error=False,
+    fail_json must only ever be called from the main thread.
+    """
+    params = module.params
+    if auth == 'basic':
+        headers = {'Authorization': basic_auth_header(params['pdns_admin_username'], params['pdns_admin_password'])}
+    else:
+        headers = {'X-API-Key': params['pdns_admin_api_key']}
+
+    return PowerDNSAdminClient(
+        params['pdns_admin_url'],
+        headers=headers,
+        verify=not params['pdns_admin_skip_tls_verify'],
+        timeout=params.get('pdns_admin_timeout', 30),
+        retries=params.get('pdns_admin_retries', 3),
+        backoff_factor=params.get('pdns_admin_retry_backoff', 0.5),
+        pool_size=pool_size,
+        module=module if fail_on_error else None,
+        cache=cache_from_params(params),
+        metrics=metrics_from_module(module),
+    )
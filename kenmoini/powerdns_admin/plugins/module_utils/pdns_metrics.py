@@ -0,0 +1,140 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# What a module run cost against the PowerDNS Admin API.
+#
+# With collect_metrics set, or at -vvv and above, the clients count every
+# request, its bytes, latency and retries plus the time spent decoding JSON,
+# and the module result gets a ``metrics`` dict.  The kenmoini.kemo.api_metrics
+# callback adds these up per task and play.  Nothing is measured otherwise.
+
+import threading
+import time
+
+# The verbosity from which metrics are returned without collect_metrics
+METRICS_VERBOSITY = 3
+
+# Only the first calls are listed one by one, the latency summary covers all
+MAX_CALLS = 100
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class RequestMetrics(object):
+    """Counters shared by every client and worker thread of one module run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.json_decode_seconds = 0.0
+        self.latencies = []
+        self.calls = []
+
+    def record(self, method, path, status, seconds, bytes_out=0, bytes_in=0, retries=0):
+        """Count one request, ``status`` is None when it never got a response"""
+        with self.lock:
+            self.requests += 1
+            self.retries += retries
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.latencies.append(seconds)
+            if status is None:
+                self.failures += 1
+            if len(self.calls) < MAX_CALLS:
+                self.calls.append(dict(method=method, path=path, status=status, seconds=round(seconds, 6), retries=retries))
+
+    def record_response(self, method, path, response, seconds, stream=False):
+        """Count a requests response, streamed bodies are counted by their Content-Length"""
+        request = getattr(response, 'request', None)
+        body = getattr(request, 'body', None) or b''
+        if stream:
+            bytes_in = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_in = len(response.content or b'')
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        self.record(method, path, response.status_code, seconds,
+                    bytes_out=len(body), bytes_in=bytes_in,
+                    retries=len(retries.history) if retries is not None else 0)
+        self.time_json(response)
+
+    def record_cache_hit(self, response):
+        with self.lock:
+            self.cache_hits += 1
+        self.time_json(response)
+
+    def time_json(self, response):
+        """Make response.json() add its decode time to the counters"""
+        decode = response.json
+
+        def json(**kwargs):
+            started = time.monotonic()
+            try:
+                return decode(**kwargs)
+            finally:
+                elapsed = time.monotonic() - started
+                with self.lock:
+                    self.json_decode_seconds += elapsed
+
+        response.json = json
+        return response
+
+    def as_dict(self):
+        with self.lock:
+            ordered = sorted(self.latencies)
+            latency = {}
+            if ordered:
+                latency = dict(
+                    min=round(ordered[0], 6),
+                    mean=round(sum(ordered) / len(ordered), 6),
+                    p50=round(_percentile(ordered, 0.5), 6),
+                    p95=round(_percentile(ordered, 0.95), 6),
+                    max=round(ordered[-1], 6),
+                )
+            return dict(
+                requests=self.requests,
+                retries=self.retries,
+                failures=self.failures,
+                cache_hits=self.cache_hits,
+                bytes_in=self.bytes_in,
+                bytes_out=self.bytes_out,
+                http_seconds=round(sum(ordered), 6),
+                json_decode_seconds=round(self.json_decode_seconds, 6),
+                elapsed_seconds=round(time.monotonic() - self.started, 6),
+                latency=latency,
+                calls=list(self.calls),
+            )
+
+
+def wants_metrics(module):
+    return bool(module.params.get('collect_metrics')) or getattr(module, '_verbosity', 0) >= METRICS_VERBOSITY
+
+
+def metrics_from_module(module):
+    """Return the RequestMetrics of this module run, or None when they were not asked for.
+
+    The first call hooks exit_json and fail_json so that every way out of the
+    module returns the metrics without each one passing them along.
+    """
+    metrics = getattr(module, '_request_metrics', None)
+    if metrics is not None or not wants_metrics(module):
+        return metrics
+
+    metrics = RequestMetrics()
+    module._request_metrics = metrics
+    for name in ('exit_json', 'fail_json'):
+        exit_method = getattr(module, name)
+
+        def with_metrics(exit_method=exit_method, **kwargs):
+            kwargs['metrics'] = metrics.as_dict()
+            exit_method(**kwargs)
+
+        setattr(module, name, with_metrics)
+    return metrics
@@ -0,0 +1,162 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers to keep the PTR records of A and AAAA records in their reverse zones.
+#
+# The reverse zones are found in one listing of the zone names, cached for its
+# own TTL under a tag that only creating or deleting a zone invalidates, so a
+# loop of record tasks lists the zones once even with the response cache off.  The PTR changes are grouped by reverse zone and
+# each reverse zone gets a single PATCH.
+
+import ipaddress
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import zone_names_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    canonical_name,
+    diff_rrset,
+    index_rrsets,
+    lookup_rrsets,
+    rrset_key,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zones import ZoneIndex, zone_key
+
+PTR_TYPES = ('A', 'AAAA')
+
+
+def reverse_name(address):
+    """The PTR name of an IPv4 or IPv6 address, or None if it is not an address"""
+    try:
+        return ipaddress.ip_address(address.strip()).reverse_pointer + '.'
+    except ValueError:
+        return None
+
+
+def list_reverse_zones(client, server_id, cache_ttl=None):
+    """Index the zones of a server to find reverse zones in, or raise PowerDNSAdminError.
+
+    The DNSSEC status is left out of the listing, it is not needed here and
+    is the slow part of listing many zones.  The listing is cached for
+    ``cache_ttl`` seconds, or the TTL of the cache when it is None.
+    """
+    response = client.get('/servers/' + server_id + '/zones', params={'dnssec': 'false'},
+                          cache_tags=[zone_names_tag(server_id)], cache_ttl=cache_ttl)
+    if response.status_code != 200:
+        raise PowerDNSAdminError('Failed to list zones: ' + response.text)
+    return ZoneIndex(response.json())
+
+
+def find_reverse_zone(zone_index, ptr_name):
+    """The most specific zone holding ``ptr_name``, or None"""
+    labels = zone_key(ptr_name).split('.')
+    for start in range(len(labels) - 2):
+        zone = zone_index.get('.'.join(labels[start:]))
+        if zone is not None:
+            return zone['name']
+    return None
+
+
+def _contents(records):
+    return dict((record['content'], bool(record.get('disabled', False))) for record in records or [])
+
+
+class PtrPlan(object):
+    """The PTR records wanted for a set of A and AAAA records.
+
+    The name claiming an address owns its PTR, which is replaced to point at
+    that name alone.  Addresses a record no longer has only lose the PTR
+    record pointing at it, PTRs left empty are deleted.
+    """
+
+    def __init__(self):
+        self.wanted = {}
+        self.stale = {}
+        self.ttls = {}
+
+    def add(self, name, rtype, current, records, ttl, state='present'):
+        if rtype.upper() not in PTR_TYPES:
+            return
+        target = canonical_name(name)
+        new = {} if state == 'absent' else _contents(records)
+        for address, disabled in new.items():
+            ptr = reverse_name(address)
+            if ptr is not None:
+                self.wanted.setdefault(ptr, {})[target] = disabled
+                self.ttls[ptr] = ttl
+        for address in set(_contents((current or {}).get('records'))) - set(new):
+            ptr = reverse_name(address)
+            if ptr is not None:
+                self.stale.setdefault(ptr, set()).add(target)
+
+    def names(self):
+        return sorted(set(self.wanted) | set(self.stale))
+
+    def change(self, ptr, current):
+        """The change converging one PTR rrset, or None if it already matches"""
+        if ptr in self.wanted:
+            records = self.wanted[ptr]
+            ttl = self.ttls[ptr]
+        else:
+            stale = set(zone_key(target) for target in self.stale[ptr])
+            records = dict((content, disabled) for content, disabled in _contents((current or {}).get('records')).items()
+                           if zone_key(content) not in stale)
+            ttl = (current or {}).get('ttl')
+        return diff_rrset(
+            current,
+            ptr,
+            'PTR',
+            ttl,
+            [dict(content=content, disabled=disabled) for content, disabled in sorted(records.items())],
+            state='present' if records else 'absent',
+        )
+
+
+def _read_ptr_rrsets(client, zone_path, names):
+    # A single name is looked up on its own, more read the reverse zone once
+    if len(names) == 1:
+        response, rrsets = lookup_rrsets(client, zone_path, names[0], 'PTR')
+    else:
+        response = client.get(zone_path)
+        rrsets = response.json().get('rrsets', []) if response.status_code == 200 else None
+    if rrsets is None:
+        raise PowerDNSAdminError('Failed to read zone: ' + response.text)
+    return index_rrsets(rrsets)
+
+
+def plan_ptr_changes(client, server_id, plan, cache_ttl=None):
+    """Work out the PTR changes of a plan, grouped by reverse zone.
+
+    Returns a dict of reverse zone to the (current rrset, change) pairs that
+    differ, and a dict of every PTR name to its reverse zone, None when no
+    zone holds it.  The zone listing is cached for ``cache_ttl`` seconds, see
+    list_reverse_zones.  Raises PowerDNSAdminError when a read fails.
+    """
+    names = plan.names()
+    if not names:
+        return {}, {}
+
+    zone_index = list_reverse_zones(client, server_id, cache_ttl)
+    zones = dict((ptr, find_reverse_zone(zone_index, ptr)) for ptr in names)
+    by_zone = {}
+    for ptr in names:
+        if zones[ptr] is not None:
+            by_zone.setdefault(zones[ptr], []).append(ptr)
+
+    changes = {}
+    for zone, ptrs in sorted(by_zone.items()):
+        current = _read_ptr_rrsets(client, '/servers/' + server_id + '/zones/' + zone, ptrs)
+        for ptr in ptrs:
+            rrset = current.get(rrset_key(ptr, 'PTR'))
+            change = plan.change(ptr, rrset)
+            if change is not None:
+                changes.setdefault(zone, []).append((rrset, change))
+    return changes, zones
+
+
+def ptr_results(zones, changes):
+    """The PTR names, their reverse zone and the change made to each, for the module result"""
+    changetypes = dict((change['name'], change['changetype']) for pairs in changes.values() for _, change in pairs)
+    return [
+        dict(name=ptr, zone=zone, changed=ptr in changetypes, changetype=changetypes.get(ptr))
+        for ptr, zone in sorted(zones.items())
+    ]
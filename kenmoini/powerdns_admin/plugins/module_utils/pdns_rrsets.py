@@ -0,0 +1,180 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers to compare and build PowerDNS rrsets
+
+import hashlib
+import json
+
+
+def canonical_name(name):
+    """Return the fully qualified form of a record name, with the trailing dot"""
+    return name if name.endswith('.') else name + '.'
+
+
+def rrset_key(name, rtype):
+    # DNS names are case insensitive and the trailing dot is optional in task input
+    return (name.rstrip('.').lower(), rtype.upper())
+
+
+def normalize_records(values):
+    """Turn the user supplied list of values into PowerDNS record dicts"""
+    records = []
+    for value in values or []:
+        if isinstance(value, dict):
+            records.append({
+                "content": value.get('content'),
+                "disabled": bool(value.get('disabled', False))
+            })
+        else:
+            records.append({"content": str(value), "disabled": False})
+    return records
+
+
+def index_rrsets(rrsets):
+    return dict((rrset_key(rrset['name'], rrset['type']), rrset) for rrset in rrsets)
+
+
+def _record_set(records):
+    return sorted((record.get('content'), bool(record.get('disabled', False))) for record in records or [])
+
+
+def rrset_matches(current, desired):
+    """True when an existing rrset already has the desired TTL and records"""
+    if current is None:
+        return False
+    return current.get('ttl') == desired.get('ttl') and _record_set(current.get('records')) == _record_set(desired.get('records'))
+
+
+def rrset_fingerprint(rrset):
+    """Short digest of the TTL and records of an rrset, for comparing without keeping the rrset"""
+    data = json.dumps([rrset.get('ttl'), _record_set(rrset.get('records'))])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def build_rrset(name, rtype, ttl, records, changetype='REPLACE'):
+    rrset = {
+        "name": canonical_name(name),
+        "type": rtype.upper(),
+        "changetype": changetype,
+    }
+    if changetype == 'REPLACE':
+        rrset['ttl'] = ttl
+        rrset['records'] = records
+    return rrset
+
+
+def diff_rrset(current, name, rtype, ttl, records, state='present'):
+    """Return the rrset change needed to converge, or None if nothing differs"""
+    if state == 'absent':
+        if current is None:
+            return None
+        return build_rrset(name, rtype, ttl, [], changetype='DELETE')
+
+    desired = build_rrset(name, rtype, ttl, records)
+    if rrset_matches(current, desired):
+        return None
+    return desired
+
+
+def rrset_state(rrset):
+    """The TTL and record contents of an rrset as shown in diff output, empty if it does not exist"""
+    if not rrset or rrset.get('changetype') == 'DELETE':
+        return {}
+    records = []
+    for record in rrset.get('records') or []:
+        records.append(record.get('content') + (' (disabled)' if record.get('disabled') else ''))
+    return dict(ttl=rrset.get('ttl'), records=sorted(records))
+
+
+def rrsets_diff(pairs):
+    """Build Ansible diff output from (current rrset, change) pairs, skipping unchanged ones"""
+    diff = dict(before={}, after={})
+    for current, change in pairs:
+        if change is None:
+            continue
+        label = '{} {}'.format(change['name'], change['type'])
+        diff['before'][label] = rrset_state(current)
+        diff['after'][label] = rrset_state(change)
+    return diff
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def filter_rrsets(rrsets, name=None, rtype=None):
+    for rrset in rrsets:
+        if name and rrset['name'].rstrip('.').lower() != name.rstrip('.').lower():
+            continue
+        if rtype and rrset['type'] != rtype.upper():
+            continue
+        yield rrset
+
+
+def rrset_filter_params(name=None, rtype=None):
+    params = {}
+    if name:
+        params['rrset_name'] = canonical_name(name)
+        # rrset_type is only accepted together with rrset_name
+        if rtype:
+            params['rrset_type'] = rtype.upper()
+    return params
+
+
+def zone_rrsets(response):
+    """The rrsets of a zone response, raises ValueError when the body is not a zone"""
+    zone = response.json()
+    if not isinstance(zone, dict):
+        raise ValueError('Expected a zone object, got {}'.format(type(zone).__name__))
+    return zone.get('rrsets', [])
+
+
+def lookup_rrsets(client, zone_path, name=None, rtype=None, **kwargs):
+    """Fetch the rrsets of a zone matching a name and/or type.
+
+    When a name is given the rrset_name/rrset_type query filters (PowerDNS 4.8+)
+    make the server return only the matching rrsets instead of the whole zone.
+    Servers without filter support ignore the parameters and send every rrset,
+    so the filter is always applied again locally.
+
+    Extra keyword arguments are passed on to client.get().
+    Returns the response and the list of rrsets, or None if the request failed.
+    Raises ValueError when a 200 response does not hold a zone.
+    """
+    response = client.get(zone_path, params=rrset_filter_params(name, rtype), **kwargs)
+    if response.status_code != 200:
+        return response, None
+    return response, list(filter_rrsets(zone_rrsets(response), name, rtype))
+
+
+def zone_version(zone):
+    """The serials of a zone, which change with every edit made through the API when soa_edit_api is not OFF"""
+    if zone.get('serial') is None:
+        return None
+    return [zone.get('serial'), zone.get('edited_serial')]
+
+
+def revalidate_rrsets(client, zone_path, name=None, rtype=None, cache_tags=None):
+    """lookup_rrsets backed by a copy of the whole zone kept in the cache by serial.
+
+    The serial is read with ?rrsets=false, which returns the zone metadata
+    without any records, and the whole zone is only downloaded again when the
+    serial differs from the one the cached copy was fetched at.  The filter is
+    applied locally so every lookup in the zone is answered from the one copy.
+    Returns the response and the list of rrsets, or None if a request failed.
+    Raises ValueError when a 200 response does not hold a zone.
+    """
+    response = client.get(zone_path, params={'rrsets': 'false'})
+    if response.status_code != 200:
+        return response, None
+    rrsets = zone_rrsets(response)
+    if rrsets:
+        # Older servers ignore rrsets=false and have already sent everything
+        return response, list(filter_rrsets(rrsets, name, rtype))
+
+    response = client.get_versioned(zone_path, zone_version(response.json()), cache_tags=cache_tags)
+    if response.status_code != 200:
+        return response, None
+    return response, list(filter_rrsets(zone_rrsets(response), name, rtype))
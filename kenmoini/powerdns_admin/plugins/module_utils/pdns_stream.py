@@ -0,0 +1,196 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Incremental parsing of zone payloads.
+#
+# A zone GET returns one JSON object with every rrset in it, and the zone
+# listing one array with every zone.  Loading those with response.json() and
+# then filtering into a second list costs a multiple of the payload in memory.
+# The helpers here walk the body as it arrives and yield one rrset or zone at a
+# time, so only the items that are kept stay in memory.
+# ijson is used when it is installed, otherwise a pure Python fallback built on
+# json.JSONDecoder.raw_decode does the same job.
+
+import codecs
+import json
+
+import requests
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    filter_rrsets,
+    rrset_filter_params,
+)
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+# Every character that can continue a JSON number
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _StreamReader(object):
+    """Text buffer over an iterator of chunks that only keeps unparsed data"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self, skip=_WHITESPACE):
+        """Skip the given characters and return the next one, or None at the end"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {!r} at offset {} of the JSON stream'.format(char, self.pos))
+        self.pos += 1
+
+    def decode(self, decoder):
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut by a chunk boundary decodes as its first part, 1.5
+            # split after the dot as 1, so refill while the rest of the buffer
+            # could still belong to it
+            if _is_number(value):
+                rest = end
+                while rest < len(self.buf) and self.buf[rest] in _NUMBER_CHARS:
+                    rest += 1
+                if rest == len(self.buf) and self.fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def _iter_array(reader, decoder, key):
+    reader.expect('[')
+    while True:
+        char = reader.peek(_WHITESPACE + ',')
+        if char == ']':
+            reader.pos += 1
+            return
+        if char is None:
+            raise ValueError('Unexpected end of JSON stream inside {!r}'.format(key or 'the top level array'))
+        yield reader.decode(decoder)
+
+
+def iter_json_array(chunks, key=None):
+    """Yield the items of the array stored under ``key`` in a top level JSON object.
+
+    ``chunks`` is an iterable of text.  Other members of the object are parsed
+    and thrown away, the array items are yielded as soon as they are complete.
+    Without a key the top level value is the array.
+    """
+    decoder = json.JSONDecoder()
+    reader = _StreamReader(chunks)
+
+    if key is None:
+        for item in _iter_array(reader, decoder, key):
+            yield item
+        return
+
+    reader.expect('{')
+    while True:
+        char = reader.peek(_WHITESPACE + ',')
+        if char == '}':
+            return
+        if char is None:
+            raise ValueError('Unexpected end of JSON stream inside the top level object')
+        member = reader.decode(decoder)
+        reader.expect(':')
+        if member != key:
+            reader.peek()
+            reader.decode(decoder)
+            continue
+
+        for item in _iter_array(reader, decoder, key):
+            yield item
+        return
+
+
+def _iter_text(response, chunk_size):
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    for chunk in response.iter_content(chunk_size):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def iter_response_items(response, key=None, chunk_size=CHUNK_SIZE):
+    """Yield the items of the array under ``key``, or of the top level array, of a streamed response.
+
+    A malformed or truncated body and a connection lost while reading it
+    raise ValueError, whichever parser is used.
+    """
+    # ijson reads response.raw, where a lost connection surfaces as a urllib3
+    # error rather than the requests one iter_content raises
+    errors = (requests.exceptions.RequestException, Urllib3Error)
+    if HAS_IJSON:
+        errors += (ijson.JSONError,)
+    try:
+        if HAS_IJSON:
+            response.raw.decode_content = True
+            for item in ijson.items(response.raw, key + '.item' if key else 'item', use_float=True):
+                yield item
+        else:
+            for item in iter_json_array(_iter_text(response, chunk_size), key):
+                yield item
+    except errors as e:
+        raise ValueError('Failed to read the response: {}'.format(e))
+
+
+def iter_response_rrsets(response, chunk_size=CHUNK_SIZE):
+    """Yield the rrsets of a streamed zone response one by one"""
+    return iter_response_items(response, 'rrsets', chunk_size)
+
+
+def stream_rrsets(client, zone_path, name=None, rtype=None):
+    """Streaming counterpart of lookup_rrsets.
+
+    Returns the response and a generator of the matching rrsets, or None if the
+    request failed.  The caller should close the response once done with it.
+    """
+    response = client.get(zone_path, params=rrset_filter_params(name, rtype), stream=True)
+    if response.status_code != 200:
+        return response, None
+    return response, filter_rrsets(iter_response_rrsets(response), name, rtype)
+
+
+def project(item, fields):
+    """Keep only the listed keys of a dict, or all of them when fields is empty"""
+    if not fields:
+        return item
+    return dict((field, item[field]) for field in fields if field in item)
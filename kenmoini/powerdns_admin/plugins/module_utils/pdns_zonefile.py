@@ -0,0 +1,242 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Reading and writing RFC 1035 master (zone) files.
+#
+# Both directions work on one rrset at a time so a zone never has to be held in
+# memory as a whole: export writes rrsets as they stream in from the API and
+# import yields rrsets as soon as the lines for them have been read.
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import canonical_name
+
+CLASSES = ('IN', 'CH', 'HS', 'CS')
+
+# Prefix of the comment lines export writes disabled records as
+DISABLED_PREFIX = '; disabled: '
+
+# Positions of the fields holding a domain name in the rdata of common types,
+# relative names in those fields are qualified with the origin on import
+NAME_FIELDS = {
+    'CNAME': (0,),
+    'DNAME': (0,),
+    'NS': (0,),
+    'PTR': (0,),
+    'MX': (1,),
+    'SRV': (3,),
+    'SOA': (0, 1),
+}
+
+
+class ZoneFileError(Exception):
+    pass
+
+
+def format_rrset(rrset):
+    """Return the zone file lines for one rrset, disabled records are commented out"""
+    lines = []
+    for record in rrset.get('records', []):
+        line = '{}\t{}\tIN\t{}\t{}\n'.format(rrset['name'], rrset.get('ttl', ''), rrset['type'], record['content'])
+        lines.append(DISABLED_PREFIX + line if record.get('disabled') else line)
+    return ''.join(lines)
+
+
+def _tokenize(line, lineno):
+    """Split a line into tokens, honouring quotes, parentheses and comments.
+
+    Returns the tokens and the change in parenthesis depth.
+    """
+    # Most lines hold no quoted strings and can simply be split
+    if '"' not in line:
+        line = line.split(';', 1)[0]
+        depth = line.count('(') - line.count(')')
+        return line.replace('(', ' ').replace(')', ' ').split(), depth
+
+    tokens = []
+    depth = 0
+    token = ''
+    in_token = False
+    quoted = False
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quoted:
+            token += char
+            if char == '\\' and i + 1 < len(line):
+                token += line[i + 1]
+                i += 1
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            token += char
+            in_token = True
+            quoted = True
+        elif char == ';':
+            break
+        elif char in ' \t\r\n()':
+            if in_token:
+                tokens.append(token)
+                token = ''
+                in_token = False
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+        else:
+            token += char
+            in_token = True
+        i += 1
+    if quoted:
+        raise ZoneFileError('Unterminated quoted string on line {}'.format(lineno))
+    if in_token:
+        tokens.append(token)
+    return tokens, depth
+
+
+def _logical_lines(lines):
+    """Join lines split with parentheses into one list of tokens each.
+
+    Yields (line number, tokens, starts with whitespace, disabled).  Records
+    commented out by export are read back as disabled.
+    """
+    pending = None
+    depth = 0
+    for lineno, line in enumerate(lines, 1):
+        disabled = False
+        if pending is None and line.startswith(DISABLED_PREFIX):
+            line = line[len(DISABLED_PREFIX):]
+            disabled = True
+        tokens, change = _tokenize(line, lineno)
+        if pending is None:
+            if not tokens:
+                continue
+            pending = (lineno, tokens, line[:1] in (' ', '\t'), disabled)
+        else:
+            pending[1].extend(tokens)
+        depth += change
+        if depth < 0:
+            raise ZoneFileError('Unbalanced ")" on line {}'.format(lineno))
+        if depth == 0:
+            yield pending
+            pending = None
+    if pending is not None:
+        raise ZoneFileError('Unbalanced "(" starting on line {}'.format(pending[0]))
+
+
+def _qualify(name, origin):
+    if name == '@':
+        return origin
+    if name.endswith('.'):
+        return name
+    return name + '.' + origin
+
+
+def _parse_ttl(value):
+    """Parse a TTL, which may use the BIND unit suffixes (1h30m)"""
+    if value.isdigit():
+        return int(value)
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    total = 0
+    number = ''
+    for char in value.lower():
+        if char.isdigit():
+            number += char
+        elif char in units and number:
+            total += int(number) * units[char]
+            number = ''
+        else:
+            return None
+    if number:
+        return None
+    return total
+
+
+def parse_records(lines, origin, default_ttl=3600):
+    """Yield (name, type, ttl, content, disabled) for every record in a zone file"""
+    origin = canonical_name(origin)
+    ttl_default = None
+    last_owner = None
+    last_ttl = None
+
+    for lineno, tokens, continued_owner, disabled in _logical_lines(lines):
+        if tokens[0].startswith('$'):
+            directive = tokens[0].upper()
+            if directive == '$ORIGIN' and len(tokens) > 1:
+                origin = _qualify(tokens[1], origin)
+            elif directive == '$TTL' and len(tokens) > 1:
+                ttl_default = _parse_ttl(tokens[1])
+                if ttl_default is None:
+                    raise ZoneFileError('Invalid $TTL on line {}'.format(lineno))
+            else:
+                raise ZoneFileError('Unsupported directive {} on line {}'.format(tokens[0], lineno))
+            continue
+
+        if continued_owner:
+            if last_owner is None:
+                raise ZoneFileError('No owner name for the record on line {}'.format(lineno))
+            owner = last_owner
+        else:
+            owner = _qualify(tokens.pop(0), origin)
+
+        # TTL and class may come in either order before the type
+        ttl = None
+        while tokens:
+            if tokens[0].upper() in CLASSES:
+                tokens.pop(0)
+            elif ttl is None and _parse_ttl(tokens[0]) is not None:
+                ttl = _parse_ttl(tokens.pop(0))
+            else:
+                break
+        if not tokens:
+            raise ZoneFileError('Missing record type on line {}'.format(lineno))
+
+        rtype = tokens.pop(0).upper()
+        rdata = tokens
+        if not rdata:
+            raise ZoneFileError('Missing record data on line {}'.format(lineno))
+        for position in NAME_FIELDS.get(rtype, ()):
+            if position < len(rdata):
+                rdata[position] = _qualify(rdata[position], origin)
+
+        # Without a TTL use $TTL, then the last TTL given (RFC 1035), then the default
+        if ttl is None:
+            ttl = ttl_default if ttl_default is not None else last_ttl if last_ttl is not None else default_ttl
+        last_owner = owner
+        last_ttl = ttl
+        yield owner, rtype, ttl, ' '.join(rdata), disabled
+
+
+def parse_rrsets(lines, origin, default_ttl=3600, warn=None):
+    """Group the records of a zone file into rrsets, yielding each one once complete.
+
+    Records of one rrset have to be next to each other, as they are in any
+    exported or hand written zone file.  A ZoneFileError is raised otherwise,
+    since sending the rrset twice would replace the first half with the second.
+
+    An rrset has a single TTL.  When its records give different ones, the
+    first is kept and ``warn`` is called with a message, as BIND does, or a
+    ZoneFileError is raised when there is no ``warn``.
+    """
+    done = set()
+    warned = set()
+    current = None
+    for name, rtype, ttl, content, disabled in parse_records(lines, origin, default_ttl):
+        key = (name.lower(), rtype)
+        record = {'content': content, 'disabled': disabled}
+        if current is not None and current['key'] == key:
+            if ttl != current['ttl']:
+                msg = 'The records of {} {} have different TTLs, {} is used rather than {}'.format(name, rtype, current['ttl'], ttl)
+                if warn is None:
+                    raise ZoneFileError(msg)
+                if current['key'] not in warned:
+                    warned.add(current['key'])
+                    warn(msg)
+            current['records'].append(record)
+            continue
+        if current is not None:
+            done.add(current['key'])
+            yield current
+        if key in done:
+            raise ZoneFileError('The records of {} {} are not next to each other'.format(name, rtype))
+        current = dict(key=key, name=name, type=rtype, ttl=ttl, records=[record])
+    if current is not None:
+        yield current
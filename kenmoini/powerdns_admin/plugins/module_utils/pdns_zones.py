@@ -0,0 +1,94 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers to look up Zones from a /servers/<id>/zones listing
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import project
+
+
+def zone_key(name):
+    # Zone names are case insensitive and the trailing dot is optional in task input
+    return name.rstrip('.').lower() if name else name
+
+
+class ZoneIndex(object):
+    """Hash index over a zone listing, keyed by id, name and account.
+
+    The listing is walked once, after which lookups by any combination of
+    criteria cost a dict access per value instead of a scan of every zone.
+    """
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.by_id = {}
+        self.by_name = {}
+        self.by_account = {}
+        for position, zone in enumerate(zones):
+            self.by_id.setdefault(zone.get('id'), set()).add(position)
+            self.by_name.setdefault(zone_key(zone.get('name')), set()).add(position)
+            self.by_account.setdefault(zone.get('account') or '', set()).add(position)
+
+    def _positions(self, index, values, key=None):
+        positions = set()
+        for value in values:
+            positions |= index.get(key(value) if key else value, set())
+        return positions
+
+    def find(self, ids=None, names=None, accounts=None):
+        """Return the zones matching every given criterion, in listing order.
+
+        Each criterion is a list of accepted values, a zone has to match one
+        value of each criterion that is set.
+        """
+        matched = None
+        for index, values, key in ((self.by_id, ids, None), (self.by_name, names, zone_key), (self.by_account, accounts, None)):
+            if not values:
+                continue
+            positions = self._positions(index, values, key)
+            matched = positions if matched is None else matched & positions
+
+        if matched is None:
+            return list(self.zones)
+        return [self.zones[position] for position in sorted(matched)]
+
+    def get(self, name):
+        positions = self.by_name.get(zone_key(name))
+        return self.zones[min(positions)] if positions else None
+
+
+def match_zones(zones, ids=None, names=None, accounts=None, name_prefix=None):
+    """Yield the zones matching every given criterion, in listing order.
+
+    The single pass counterpart of ZoneIndex.find, for listings that are
+    streamed rather than loaded whole.  ``name_prefix`` is matched against
+    the start of the zone name, case insensitively.
+    """
+    ids = set(ids) if ids else None
+    names = set(zone_key(name) for name in names) if names else None
+    accounts = set(accounts) if accounts else None
+    prefix = name_prefix.lower() if name_prefix else None
+    for zone in zones:
+        if ids is not None and zone.get('id') not in ids:
+            continue
+        if names is not None and zone_key(zone.get('name')) not in names:
+            continue
+        if accounts is not None and (zone.get('account') or '') not in accounts:
+            continue
+        if prefix is not None and not (zone.get('name') or '').lower().startswith(prefix):
+            continue
+        yield zone
+
+
+def zone_page(zones, offset=0, limit=None, fields=None):
+    """Count the zones and keep the page from ``offset`` of at most ``limit`` zones.
+
+    Only the page is held, projected to ``fields``, so a streamed listing is
+    never in memory whole.  Returns the count and the page.
+    """
+    count = 0
+    page = []
+    for zone in zones:
+        if count >= offset and (limit is None or len(page) < limit):
+            page.append(project(zone, fields))
+        count += 1
+    return count, page
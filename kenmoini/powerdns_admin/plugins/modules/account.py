@@ -16,6 +16,8 @@ short_description: Manage Accounts in PowerDNS Admin
 version_added: "2.11"
 description:
     - "This module allows you to manage accounts in PowerDNS Admin"
+    - "The account is looked up by name and an update is only sent when a field differs"
+    - "Supports check mode and diff mode, the change is worked out from the same single lookup and nothing is written in check mode"
 
 options:
   pdns_admin_url:
@@ -43,6 +45,41 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of anything this module changes are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
   state:
     description:
       - Whether the account should exist or not
@@ -103,12 +140,26 @@ account:
     description: The data returned about the Account
     type: object
     returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
+from ansible.module_utils.basic import AnsibleModule, env_fallback
 import json
-import base64
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import ACCOUNTS_TAG, DEFAULT_CACHE_DIR
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_accounts import (
+    ACCOUNTS_PATH,
+    account_payload,
+    account_view,
+    find_account,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
@@ -117,6 +168,11 @@ def run_module():
         pdns_admin_username=dict(type='str', required=True, aliases=['username']),
         pdns_admin_password=dict(type='str', required=True, aliases=['password'], no_log=True),
         pdns_admin_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', required=False, default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', required=False, default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', required=False, default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        cache_dir=dict(type='path', required=False, default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
         state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
         name=dict(type='str', required=True),
         description=dict(type='str', required=False),
@@ -140,80 +196,73 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
-        supports_check_mode=False
+        supports_check_mode=True
     )
 
-    # Encode the username and password in base64
-    userpass = module.params['pdns_admin_username'] + ':' + module.params['pdns_admin_password']
-    userpass_bytes = userpass.encode('ascii')
-    base64_bytes = base64.b64encode(userpass_bytes)
-
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': 'Basic ' + base64_bytes.decode('ascii'),
-    }
-
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/pdnsadmin/accounts'
-
-    # Get the current list of accounts
-    listResponse = requests.get(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
-
-    # Loop through the accounts
-    accountFound = False
-    for account in listResponse.json():
-        if account['name'] == module.params['name']:
-            accountFound = True
-            if module.params['state'] == 'absent':
-                # Delete the account
-                deleteResponse = requests.delete(targetURL + '/' + str(account['id']), headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
-                if deleteResponse.status_code == 204:
-                  result['account'] = account
-                  result['changed'] = True
+    # Create the pooled API client, the /pdnsadmin endpoints use Basic auth
+    client = client_from_module(module, auth='basic')
+
+    # Look the account up by name instead of listing every account
+    lookupResponse, account = find_account(client, module.params['name'])
+    if account is False:
+        module.fail_json(msg='Failed to look up account: ' + lookupResponse.text, **result)
+
+    accountPath = ACCOUNTS_PATH + '/' + str(account['id']) if account else None
+
+    if account and module.params['state'] == 'absent':
+        if module._diff:
+            result['diff'] = dict(before=account_view(account), after={})
+        if module.check_mode:
+            result['account'] = account
+            result['changed'] = True
+            module.exit_json(**result)
+
+        # Delete the account
+        deleteResponse = client.delete(accountPath)
+        if deleteResponse.status_code == 204:
+            client.invalidate(ACCOUNTS_TAG)
+            result['account'] = account
+            result['changed'] = True
+        else:
+            module.fail_json(msg='Failed to delete account: ' + deleteResponse.text, **result)
+
+    elif account:
+        # Only send an update when a field actually differs
+        payload = account_payload(module.params, current=account)
+        if payload:
+            payload['name'] = module.params['name']
+            if module._diff:
+                result['diff'] = dict(before=account_view(account), after=account_view(dict(account, **payload)))
+            if module.check_mode:
+                result['account'] = dict(account, **payload)
+                result['changed'] = True
+                module.exit_json(**result)
+
+            updateResponse = client.put(accountPath, data=json.dumps(payload))
+
+            if updateResponse.status_code == 204:
+                client.invalidate(ACCOUNTS_TAG)
+                account.update(payload)
+                result['changed'] = True
             else:
-                # Update the account
-                dataChanged = False
-                payload = {
-                    'name': module.params['name']
-                }
-                if module.params['description'] and account['description'] != module.params['description']:
-                    payload['description'] = module.params['description']
-                    dataChanged = True
-                if module.params['contact'] and account['contact'] != module.params['contact']:
-                    payload['contact'] = module.params['contact']
-                    dataChanged = True
-                if module.params['mail'] and account['mail'] != module.params['mail']:
-                    payload['mail'] = module.params['mail']
-                    dataChanged = True
-
-                updateResponse = requests.put(targetURL + '/' + str(account['id']), headers=headers, data=json.dumps(payload), verify=not module.params['pdns_admin_skip_tls_verify'])
-
-                if updateResponse.status_code == 204:
-                    newAccount = account
-                    # Update the newAccount with all the passed parameters
-                    if module.params['description']:
-                        newAccount['description'] = module.params['description']
-                    if module.params['contact']:
-                        newAccount['contact'] = module.params['contact']
-                    if module.params['mail']:
-                        newAccount['mail'] = module.params['mail']
-
-                    result['account'] = newAccount
-                    result['changed'] = dataChanged
-
-    if module.params['state'] == 'present' and accountFound == False:
+                module.fail_json(msg='Failed to update account: ' + updateResponse.text, **result)
+        result['account'] = account
+
+    elif module.params['state'] == 'present':
         # Create a new account
-        payload = {
-            'name': module.params['name']
-        }
-        if module.params['description']:
-            payload['description'] = module.params['description']
-        if module.params['contact']:
-            payload['contact'] = module.params['contact']
-        if module.params['mail']:
-            payload['mail'] = module.params['mail']
-
-        response = requests.post(targetURL, headers=headers, data=json.dumps(payload), verify=not module.params['pdns_admin_skip_tls_verify'])
+        payload = account_payload(module.params)
+        payload['name'] = module.params['name']
+        if module._diff:
+            result['diff'] = dict(before={}, after=account_view(payload))
+        if module.check_mode:
+            result['account'] = payload
+            result['changed'] = True
+            module.exit_json(**result)
+
+        response = client.post(ACCOUNTS_PATH, data=json.dumps(payload))
+        if response.status_code not in [200, 201]:
+            module.fail_json(msg='Failed to create account: ' + response.text, **result)
+        client.invalidate(ACCOUNTS_TAG)
         result['account'] = response.json()
         result['changed'] = True
 
@@ -0,0 +1,382 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: accounts
+short_description: Reconcile many Accounts in PowerDNS Admin at once
+version_added: "2.11"
+description:
+    - "This module takes the desired state of a list of accounts and converges PowerDNS Admin to it"
+    - "The accounts are listed once, the needed creates, updates and deletes are worked out from that listing and then sent concurrently"
+    - "Supports check mode and diff mode, the plan is worked out from the same single listing and nothing is written in check mode"
+
+options:
+  pdns_admin_url:
+    description:
+      - This is the URL of your PowerDNS Admin instance
+    required: true
+    aliases: ['url']
+    type: str
+  pdns_admin_username:
+    description:
+        - This is the username for your PowerDNS Admin instance
+    required: true
+    aliases: ['username']
+    type: str
+  pdns_admin_password:
+    description:
+        - This is the password for your PowerDNS Admin instance
+    required: true
+    aliases: ['password']
+    type: str
+  pdns_admin_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    aliases: ['skip_tls_verify']
+    type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of anything this module changes are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  accounts:
+    description:
+      - The desired accounts
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+          - The name of the account - alphanumeric characters only
+        required: true
+        type: str
+      description:
+        description:
+          - The description of the account
+        required: false
+        type: str
+      contact:
+        description:
+          - The contact name of the account
+        required: false
+        type: str
+      mail:
+        description:
+          - The email address of the account
+        required: false
+        aliases: ['email']
+        type: str
+      state:
+        description:
+          - Whether the account should exist or not
+        required: false
+        default: present
+        choices: ['present', 'absent']
+        type: str
+  purge:
+    description:
+      - Delete every account that is not in I(accounts)
+    required: false
+    default: false
+    type: bool
+  workers:
+    description:
+      - The maximum number of API writes to run at the same time
+    required: false
+    default: 10
+    type: int
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Converge a list of Accounts
+- name: Reconcile the tenant Accounts in PowerDNS Admin
+  kenmoini.powerdns_admin.accounts:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_username: ansible
+    pdns_admin_password: password
+    accounts:
+      - name: tenanta
+        description: Tenant A
+        contact: Tenant A Admins
+        mail: dns@tenanta.example.com
+      - name: tenantb
+        description: Tenant B
+      - name: oldtenant
+        state: absent
+  register: r_accounts
+
+# Make PowerDNS Admin hold exactly these Accounts
+- name: Reconcile and purge the tenant Accounts in PowerDNS Admin
+  kenmoini.powerdns_admin.accounts:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_username: ansible
+    pdns_admin_password: password
+    accounts: "{{ tenant_accounts }}"
+    purge: true
+    workers: 20
+'''
+
+RETURN = '''
+accounts:
+    description: The result for each account, in the order given followed by any purged accounts
+    type: list
+    returned: always
+    sample: [{"name": "tenanta", "action": "update", "changed": true}]
+created:
+    description: Names of the accounts that were created
+    type: list
+    returned: always
+updated:
+    description: Names of the accounts that were updated
+    type: list
+    returned: always
+deleted:
+    description: Names of the accounts that were deleted
+    type: list
+    returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
+'''
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_accounts import (
+    ACCOUNTS_PATH,
+    account_payload,
+    account_view,
+    list_accounts,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import ACCOUNTS_TAG, DEFAULT_CACHE_DIR
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module, PowerDNSAdminError
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+
+def plan_changes(index, desired, purge):
+    """Work out the create/update/delete operations from one account listing"""
+    operations = []
+    listed = set()
+    for entry in desired:
+        listed.add(entry['name'])
+        current = index.get(entry['name'])
+        if entry['state'] == 'absent':
+            if current:
+                operations.append(dict(name=entry['name'], action='delete', account=current))
+            else:
+                operations.append(dict(name=entry['name'], action='none', account={}))
+        elif current is None:
+            payload = account_payload(entry)
+            payload['name'] = entry['name']
+            operations.append(dict(name=entry['name'], action='create', payload=payload))
+        else:
+            payload = account_payload(entry, current=current)
+            if payload:
+                payload['name'] = entry['name']
+                operations.append(dict(name=entry['name'], action='update', payload=payload, account=current))
+            else:
+                operations.append(dict(name=entry['name'], action='none', account=current))
+
+    if purge:
+        for account in index.accounts:
+            if account['name'] not in listed:
+                operations.append(dict(name=account['name'], action='delete', account=account))
+
+    return operations
+
+
+def planned_account(operation):
+    """The account as it will be once the operation is applied, None if it will not exist"""
+    if operation['action'] == 'create':
+        return operation['payload']
+    if operation['action'] == 'update':
+        return dict(operation['account'], **operation['payload'])
+    if operation['action'] == 'delete':
+        return None
+    return operation['account']
+
+
+def apply_change(client, operation):
+    """Send the write for one operation, runs in a worker thread"""
+    action = operation['action']
+    outcome = dict(name=operation['name'], action=action, changed=False, account=operation.get('account', {}))
+    if action == 'none':
+        return outcome
+
+    try:
+        if action == 'create':
+            response = client.post(ACCOUNTS_PATH, data=json.dumps(operation['payload']))
+            ok = response.status_code in [200, 201]
+            if ok:
+                # The account exists now, whatever the body says
+                try:
+                    outcome['account'] = response.json()
+                except ValueError:
+                    outcome['account'] = operation['payload']
+        elif action == 'update':
+            response = client.put(ACCOUNTS_PATH + '/' + str(operation['account']['id']), data=json.dumps(operation['payload']))
+            ok = response.status_code == 204
+            if ok:
+                outcome['account'] = dict(operation['account'], **operation['payload'])
+        else:
+            response = client.delete(ACCOUNTS_PATH + '/' + str(operation['account']['id']))
+            ok = response.status_code == 204
+    except PowerDNSAdminError as e:
+        outcome['failed'] = True
+        outcome['msg'] = str(e)
+        return outcome
+
+    if ok:
+        outcome['changed'] = True
+    else:
+        outcome['failed'] = True
+        outcome['msg'] = 'Failed to {} account: {}'.format(action, response.text)
+    return outcome
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        pdns_admin_url=dict(type='str', required=True, aliases=['url']),
+        pdns_admin_username=dict(type='str', required=True, aliases=['username']),
+        pdns_admin_password=dict(type='str', required=True, aliases=['password'], no_log=True),
+        pdns_admin_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', required=False, default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', required=False, default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', required=False, default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        cache_dir=dict(type='path', required=False, default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        accounts=dict(type='list', elements='dict', required=True, options=dict(
+            name=dict(type='str', required=True),
+            description=dict(type='str', required=False),
+            contact=dict(type='str', required=False),
+            mail=dict(type='str', required=False, aliases=['email']),
+            state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        )),
+        purge=dict(type='bool', required=False, default=False),
+        workers=dict(type='int', required=False, default=10),
+    )
+
+    result = dict(
+        changed=False,
+        accounts=[],
+        created=[],
+        updated=[],
+        deleted=[],
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.params['workers'] < 1:
+        module.fail_json(msg='workers must be at least 1', **result)
+
+    names = [entry['name'] for entry in module.params['accounts']]
+    if len(names) != len(set(names)):
+        module.fail_json(msg='Each account may only be listed once', **result)
+
+    # Create the pooled API client, sized so every worker gets a connection.
+    # It raises instead of calling fail_json so worker failures can be collected.
+    client = client_from_module(module, auth='basic', pool_size=module.params['workers'], fail_on_error=False)
+
+    # List the accounts once and plan everything against that listing
+    try:
+        listResponse, index = list_accounts(client)
+    except PowerDNSAdminError as e:
+        module.fail_json(msg=str(e), **result)
+    if index is None:
+        module.fail_json(msg='Failed to list accounts: ' + listResponse.text, **result)
+
+    operations = plan_changes(index, module.params['accounts'], module.params['purge'])
+
+    if module._diff:
+        result['diff'] = dict(before={}, after={})
+        for operation in operations:
+            if operation['action'] != 'none':
+                result['diff']['before'][operation['name']] = account_view(operation.get('account'))
+                result['diff']['after'][operation['name']] = account_view(planned_account(operation))
+
+    if module.check_mode:
+        # Report the plan as if it had been applied, without writing anything
+        outcomes = []
+        for operation in operations:
+            account = operation['account'] if operation['action'] == 'delete' else planned_account(operation)
+            outcomes.append(dict(name=operation['name'], action=operation['action'], changed=operation['action'] != 'none', account=account))
+    else:
+        with ThreadPoolExecutor(max_workers=module.params['workers']) as executor:
+            outcomes = list(executor.map(lambda operation: apply_change(client, operation), operations))
+
+    failed = []
+    for outcome in outcomes:
+        result['accounts'].append(outcome)
+        if outcome.get('failed'):
+            failed.append(outcome['name'])
+        elif outcome['changed']:
+            result[{'create': 'created', 'update': 'updated', 'delete': 'deleted'}[outcome['action']]].append(outcome['name'])
+
+    if result['created'] or result['updated'] or result['deleted']:
+        if not module.check_mode:
+            client.invalidate(ACCOUNTS_TAG)
+        result['changed'] = True
+
+    if failed:
+        module.fail_json(msg='Failed to reconcile accounts: ' + ', '.join(failed), **result)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
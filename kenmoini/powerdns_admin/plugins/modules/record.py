@@ -15,6 +15,9 @@ short_description: Manage Records in PowerDNS Admin
 version_added: "2.11"
 description:
     - "This module allows you to manage Records in PowerDNS Admin"
+    - "The current rrset is read first and no change is sent when the content, TTL and disabled flags already match"
+    - "Supports check mode and diff mode, the change is worked out from the same single read and nothing is written in check mode"
+    - "With O(manage_ptr) the PTR records of A and AAAA records are kept in their reverse zones, with one PATCH per reverse zone"
 
 options:
   pdns_admin_url:
@@ -36,6 +39,55 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of anything this module changes are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  cache_ttl:
+    description:
+      - Seconds to cache responses in I(cache_dir), 0 disables the cache
+      - The rrsets this module changes are always read from the API, the zone listing I(manage_ptr) reads is cached for I(zone_names_cache_ttl) instead
+    required: false
+    default: 0
+    type: int
+  zone_names_cache_ttl:
+    description:
+      - Seconds to cache the zone listing that I(manage_ptr) finds the reverse zones in, so a loop of tasks lists the zones once
+      - Creating or deleting a zone with the zone module invalidates it, 0 lists the zones on every run
+    required: false
+    default: 300
+    type: int
   pdns_server_id:
     description:
       - The PowerDNS Server ID to use
@@ -81,6 +133,14 @@ options:
     default: present
     choices: ['present', 'absent']
     type: str
+  manage_ptr:
+    description:
+      - Keep the PTR records of an A or AAAA record in the reverse zones in step with its values
+      - Each address gets a PTR pointing at this name alone, addresses the record no longer has lose the PTR pointing at it
+      - Addresses without a reverse zone on the server are skipped with a warning
+    required: false
+    default: false
+    type: bool
 
 author:
     - Ken Moini (@kenmoini)
@@ -103,6 +163,18 @@ EXAMPLES = '''
     ttl: 3600
     state: present
 
+# Create a Record and its PTR in the reverse zone
+- name: Create a Record and its PTR in PowerDNS Admin
+  kenmoini.powerdns_admin.record:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    record_name: www.example.com.
+    record_type: A
+    values:
+      - 192.0.2.1
+    manage_ptr: true
+
 # Delete a Record in a Zone
 - name: Delete a Record in a Zone in PowerDNS Admin
   kenmoini.powerdns_admin.record:
@@ -120,12 +192,31 @@ record:
     returned: always
     type: dict
     sample: {"id": 1, "name": "www", "type": "A", "content": "192.0.2.1", "ttl": 3600}
+ptr_records:
+    description: The PTR records manage_ptr looked at and the change made to each, zone is null when no reverse zone holds it
+    returned: when manage_ptr is true
+    type: list
+    sample: [{"name": "1.2.0.192.in-addr.arpa.", "zone": "2.0.192.in-addr.arpa.", "changed": true, "changetype": "REPLACE"}]
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
-import base64
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_tag, zones_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module, PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_ptr import PtrPlan, plan_ptr_changes, ptr_results
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    diff_rrset,
+    lookup_rrsets,
+    normalize_records,
+    rrsets_diff,
+)
 
 
 def run_module():
@@ -134,6 +225,13 @@ def run_module():
         pdns_admin_url=dict(type='str', required=True, aliases=['url']),
         pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
         pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        cache_dir=dict(type='path', default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        cache_ttl=dict(type='int', default=0),
+        zone_names_cache_ttl=dict(type='int', default=300),
         pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
         zone=dict(type='str', required=True, aliases=['zone_id']),
         record_name=dict(type='str', required=True, aliases=['name', 'record']),
@@ -141,6 +239,7 @@ def run_module():
         record_values=dict(type='list', required=False, aliases=['values']),
         record_ttl=dict(type='int', required=False, default=3600, aliases=['ttl']),
         state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        manage_ptr=dict(type='bool', required=False, default=False),
     )
 
     result = dict(
@@ -149,53 +248,91 @@ def run_module():
     )
     module = AnsibleModule(
         argument_spec=module_args,
-        supports_check_mode=False
+        supports_check_mode=True
     )
 
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': module.params['pdns_admin_api_key']
-    }
+    # Create the pooled API client
+    client = client_from_module(module)
 
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/servers/' + str(module.params['pdns_server_id']) + '/zones/' + module.params['zone']
+    targetPath = '/servers/' + str(module.params['pdns_server_id']) + '/zones/' + module.params['zone']
 
     # Create the record content
-    record_contents = []
-    if module.params['record_values']:
-        for value in module.params['record_values']:
-            record_contents.append({
-                "content": value.get('content'),
-                "disabled": value.get('disabled', False)
-            })
-
-    # Create the payload for the API request
-    payload = {
-        "rrsets": [
-            {
-                "name": module.params['record_name'],
-                "type": module.params['record_type'],
-                "changetype": "REPLACE" if module.params['state'] in ['present', 'disabled'] else "DELETE",
-                "ttl": module.params['record_ttl'],
-                "records": record_contents
-            }
-        ]
-    }
-
-    # Get the current list of records
-    listResponse = requests.patch(targetURL, headers=headers, json=payload, verify=not module.params['pdns_admin_skip_tls_verify'])
-
-    if listResponse.status_code in [200, 201, 204]:
-        # Fetch the updated record details
-        getResponse = requests.get(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
-        for record in getResponse.json().get('rrsets', []):
-            if record['name'].rstrip('.') == module.params['record_name'].rstrip('.') and record['type'] == module.params['record_type']:
-                result['record'] = record
-                break
-        result['changed'] = True 
-
-    else:
-        module.fail_json(msg='Failed to manage record: ' + listResponse.text, **result)
+    record_contents = normalize_records(module.params['record_values'])
+
+    # Look up only the rrset being managed rather than the whole zone
+    lookupResponse, currentRRsets = lookup_rrsets(client, targetPath, module.params['record_name'], module.params['record_type'])
+    if currentRRsets is None:
+        module.fail_json(msg='Failed to read zone: ' + lookupResponse.text, **result)
+    currentRRset = currentRRsets[0] if currentRRsets else None
+
+    # Work out the change, if any, needed to converge the rrset
+    change = diff_rrset(
+        currentRRset,
+        module.params['record_name'],
+        module.params['record_type'],
+        module.params['record_ttl'],
+        record_contents,
+        state=module.params['state'],
+    )
+
+    # The PTRs are checked even when the record itself is unchanged
+    ptrChanges = {}
+    if module.params['manage_ptr']:
+        plan = PtrPlan()
+        plan.add(module.params['record_name'], module.params['record_type'], currentRRset, record_contents,
+                 module.params['record_ttl'], state=module.params['state'])
+        try:
+            ptrChanges, reverseZones = plan_ptr_changes(client, module.params['pdns_server_id'], plan, module.params['zone_names_cache_ttl'])
+        except PowerDNSAdminError as e:
+            module.fail_json(msg=str(e), **result)
+        for ptr, reverseZone in sorted(reverseZones.items()):
+            if reverseZone is None:
+                module.warn('No reverse zone holds {}, its PTR is not managed'.format(ptr))
+        result['ptr_records'] = ptr_results(reverseZones, ptrChanges)
+
+    if change is None and not ptrChanges:
+        # Nothing differs, skip the PATCH so the SOA serial is not bumped
+        if currentRRset:
+            result['record'] = currentRRset
+        module.exit_json(**result)
+
+    if module._diff:
+        result['diff'] = rrsets_diff([(currentRRset, change)] + [pair for pairs in ptrChanges.values() for pair in pairs])
+
+    if change is None:
+        if currentRRset:
+            result['record'] = currentRRset
+    elif change['changetype'] == 'REPLACE':
+        result['record'] = dict((k, v) for k, v in change.items() if k != 'changetype')
+
+    # The change is known from the one read, check mode stops before writing it
+    if module.check_mode:
+        result['changed'] = True
+        module.exit_json(**result)
+
+    if change is not None:
+        # Create the payload for the API request
+        payload = {
+            "rrsets": [change]
+        }
+
+        patchResponse = client.patch(targetPath, json=payload)
+
+        if patchResponse.status_code in [200, 201, 204]:
+            client.invalidate(zone_tag(module.params['pdns_server_id'], module.params['zone']), zones_tag(module.params['pdns_server_id']))
+            result['changed'] = True
+
+        else:
+            module.fail_json(msg='Failed to manage record: ' + patchResponse.text, **result)
+
+    # One PATCH per reverse zone
+    for reverseZone, pairs in sorted(ptrChanges.items()):
+        patchResponse = client.patch('/servers/' + module.params['pdns_server_id'] + '/zones/' + reverseZone,
+                                     json={"rrsets": [ptrChange for _, ptrChange in pairs]})
+        client.invalidate(zone_tag(module.params['pdns_server_id'], reverseZone), zones_tag(module.params['pdns_server_id']))
+        if patchResponse.status_code not in [200, 201, 204]:
+            module.fail_json(msg='Failed to manage PTR records in {}: {}'.format(reverseZone, patchResponse.text), **result)
+        result['changed'] = True
 
     module.exit_json(**result)
 
@@ -36,6 +36,60 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_ttl:
+    description:
+      - Cache responses on the controller for this many seconds, 0 disables the cache
+      - Cached reads are invalidated when the record, records, zone or account modules change the same Zone or Account
+    required: false
+    default: 0
+    type: int
+  cache_dir:
+    description:
+      - Directory to keep the response cache in
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  cache_max_entries:
+    description:
+      - The maximum number of cached responses, the least recently used ones are evicted first
+    required: false
+    default: 1000
+    type: int
+  cache_max_size:
+    description:
+      - The maximum total size of the cache in bytes, the least recently used responses are evicted first
+    required: false
+    default: 104857600
+    type: int
   pdns_server_id:
     description:
       - The PowerDNS Server ID to use
@@ -46,9 +100,44 @@ options:
   zone:
     description:
       - The Zone to find Records in
-    required: true
+      - One of I(zone) or I(zones) is required
+    required: false
     aliases: ['zone_id']
     type: str
+  zones:
+    description:
+      - A list of Zones to find Records in, fetched in parallel
+      - Results are returned in C(records_by_zone) and Zones that could not be read are reported in C(failed_zones) instead of failing the task
+    required: false
+    type: list
+    elements: str
+  workers:
+    description:
+      - The maximum number of Zones to fetch at the same time when I(zones) is used
+      - With I(async_mode) this is the number of requests in flight and can be set far higher than the number of threads would allow
+    required: false
+    default: 10
+    type: int
+  async_mode:
+    description:
+      - Fetch the Zones as coroutines on one asyncio event loop instead of in a thread pool, for fan-out over thousands of Zones
+      - Uses aiohttp when it is installed, otherwise requests are run through a thread pool of I(max_connections) threads
+      - Cannot be used together with I(stream) or I(revalidate)
+    required: false
+    default: false
+    type: bool
+  max_connections:
+    description:
+      - The maximum number of connections to PowerDNS Admin open at the same time in I(async_mode)
+    required: false
+    default: 10
+    type: int
+  rate_limit:
+    description:
+      - The maximum number of requests per second to send in I(async_mode), 0 for no limit
+    required: false
+    default: 0
+    type: float
   record:
     description:
       - The Record to find
@@ -61,6 +150,43 @@ options:
     required: false
     aliases: ['type']
     type: str
+  stream:
+    description:
+      - Parse the Zone incrementally as it is downloaded instead of loading the whole response at once
+      - Peak memory then only depends on the Records that are returned, not on the size of the Zone
+      - Uses the ijson library when it is installed and a pure Python parser otherwise
+    required: false
+    default: false
+    type: bool
+  revalidate:
+    description:
+      - Keep a copy of each Zone in I(cache_dir) together with the serial it was fetched at, whatever I(cache_ttl) is
+      - Each run then reads only the serial of the Zone and downloads the Records again only when the serial changed
+      - Relies on PowerDNS changing the serial on every edit, so Zones with soa_edit_api set to OFF can be served stale Records after edits made outside these modules
+      - Cannot be used together with I(stream)
+    required: false
+    default: false
+    type: bool
+  max_results:
+    description:
+      - The maximum number of Records to return. In stream mode the download stops once this many have been found
+    required: false
+    type: int
+  fields:
+    description:
+      - Only return these keys of each Record, eg name, type, ttl, records
+      - All keys are returned when not set
+    required: false
+    type: list
+    elements: str
+
+notes:
+  - When I(record) is set the lookup uses the PowerDNS C(rrset_name) and C(rrset_type) zone filters, so only the
+    matching rrsets are transferred instead of the whole zone. On a 200k record zone this takes a single-name lookup
+    from tens of MB down to well under 1 KB.
+  - Servers that do not support the filters (PowerDNS before 4.8) return the whole zone and the records are filtered
+    locally, as before.
+  - Filtering by I(record_type) alone cannot be done on the server and always transfers the whole zone.
 
 author:
     - Ken Moini (@kenmoini)
@@ -84,6 +210,53 @@ EXAMPLES = '''
     record: www
     record_type: A
   register: r_record
+
+# Stream a large Zone and only return the names of its first 100 A Records
+- name: Get some A Records from a large Zone in PowerDNS Admin
+  kenmoini.powerdns_admin.record_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    record_type: A
+    stream: true
+    max_results: 100
+    fields:
+      - name
+  register: r_a_records
+
+# Find the NS Records of many Zones at once
+- name: Audit the NS Records of several Zones in PowerDNS Admin
+  kenmoini.powerdns_admin.record_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    zones: "{{ r_zones.zones | map(attribute='name') | list }}"
+    record_type: NS
+    workers: 20
+  register: r_ns_records
+
+# Check every Zone of a large installation without overloading it
+- name: Audit the SOA Records of every Zone in PowerDNS Admin
+  kenmoini.powerdns_admin.record_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    zones: "{{ r_zones.zones | map(attribute='name') | list }}"
+    record_type: SOA
+    async_mode: true
+    workers: 500
+    max_connections: 20
+    rate_limit: 200
+  register: r_soa_records
+
+# Poll a Zone often without downloading it again unless it changed
+- name: Get the A Record of a host, revalidated by the Zone serial
+  kenmoini.powerdns_admin.record_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    record: host.example.com.
+    record_type: A
+    revalidate: true
+  register: r_host_record
 '''
 
 RETURN = '''
@@ -92,12 +265,107 @@ records:
     returned: always
     type: list
     sample: [{"id": 1, "name": "www", "type": "A", "content": "192.0.2.1", "ttl": 3600, "status": "Active"}]
+records_by_zone:
+    description: The Records found in each Zone, keyed by Zone
+    returned: when zones is used
+    type: dict
+failed_zones:
+    description: The error for each Zone that could not be read, keyed by Zone
+    returned: when zones is used
+    type: dict
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
-import base64
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_async import async_client_from_module, run
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module, PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    filter_rrsets,
+    lookup_rrsets,
+    revalidate_rrsets,
+    rrset_filter_params,
+    zone_rrsets,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import project, stream_rrsets
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import asyncio
+
+
+def fetch_records(client, params, zone):
+    """Return the matching records of one zone, raises PowerDNSAdminError on failure"""
+    targetPath = '/servers/' + str(params['pdns_server_id']) + '/zones/' + zone
+
+    # Get the matching records, filtered on the server when a name is given.
+    # A 200 with a body that is not a zone, a proxy error page say, fails only this zone
+    try:
+        if params['stream']:
+            listResponse, matchedRecords = stream_rrsets(client, targetPath, params['record'], params['record_type'])
+        elif params['revalidate']:
+            listResponse, matchedRecords = revalidate_rrsets(client, targetPath, params['record'], params['record_type'],
+                                                             cache_tags=[zone_tag(params['pdns_server_id'], zone)])
+        else:
+            listResponse, matchedRecords = lookup_rrsets(client, targetPath, params['record'], params['record_type'],
+                                                         cache_tags=[zone_tag(params['pdns_server_id'], zone)])
+    except ValueError as e:
+        raise PowerDNSAdminError('Failed to parse zone: {}'.format(e))
+    if matchedRecords is None:
+        raise PowerDNSAdminError('Failed to read zone: ' + listResponse.text)
+
+    if params['max_results'] is not None:
+        matchedRecords = islice(matchedRecords, params['max_results'])
+
+    try:
+        return [project(record, params['fields']) for record in matchedRecords]
+    except ValueError as e:
+        raise PowerDNSAdminError('Failed to parse zone: {}'.format(e))
+    finally:
+        # Stops a streamed download early when max_results was reached
+        listResponse.close()
+
+
+async def fetch_records_async(client, params, zone):
+    """Coroutine version of fetch_records for async_mode"""
+    targetPath = '/servers/' + str(params['pdns_server_id']) + '/zones/' + zone
+    listResponse = await client.get(targetPath, params=rrset_filter_params(params['record'], params['record_type']),
+                                    cache_tags=[zone_tag(params['pdns_server_id'], zone)])
+    if listResponse.status_code != 200:
+        raise PowerDNSAdminError('Failed to read zone: ' + listResponse.text)
+
+    try:
+        matchedRecords = filter_rrsets(zone_rrsets(listResponse), params['record'], params['record_type'])
+        if params['max_results'] is not None:
+            matchedRecords = islice(matchedRecords, params['max_results'])
+        return [project(record, params['fields']) for record in matchedRecords]
+    except ValueError as e:
+        raise PowerDNSAdminError('Failed to parse zone: {}'.format(e))
+
+
+async def fetch_zones_async(module, zones):
+    """Fetch every zone on one event loop, returning the records or a PowerDNSAdminError per zone"""
+    client = async_client_from_module(
+        module,
+        concurrency=module.params['workers'],
+        per_host=module.params['max_connections'],
+        rate_limit=module.params['rate_limit'],
+    )
+
+    async def fetch(zone):
+        try:
+            return await fetch_records_async(client, module.params, zone)
+        except PowerDNSAdminError as e:
+            return e
+
+    async with client:
+        return await asyncio.gather(*[fetch(zone) for zone in zones])
 
 
 def run_module():
@@ -106,10 +374,27 @@ def run_module():
         pdns_admin_url=dict(type='str', required=True, aliases=['url']),
         pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
         pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        cache_ttl=dict(type='int', default=0),
+        cache_dir=dict(type='path', default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        cache_max_entries=dict(type='int', default=1000),
+        cache_max_size=dict(type='int', default=104857600),
         pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
-        zone=dict(type='str', required=True, aliases=['zone_id']),
+        zone=dict(type='str', required=False, aliases=['zone_id']),
+        zones=dict(type='list', elements='str', required=False),
+        workers=dict(type='int', required=False, default=10),
         record=dict(type='str', required=False, aliases=['name']),
-        record_type=dict(type='str', required=False, aliases=['type'])
+        record_type=dict(type='str', required=False, aliases=['type']),
+        stream=dict(type='bool', required=False, default=False),
+        revalidate=dict(type='bool', required=False, default=False),
+        async_mode=dict(type='bool', required=False, default=False),
+        max_connections=dict(type='int', required=False, default=10),
+        rate_limit=dict(type='float', required=False, default=0),
+        max_results=dict(type='int', required=False),
+        fields=dict(type='list', elements='str', required=False),
     )
     result = dict(
         changed=False,
@@ -117,38 +402,61 @@ def run_module():
     )
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[('zone', 'zones')],
+        mutually_exclusive=[('zone', 'zones'), ('stream', 'revalidate'), ('async_mode', 'stream'), ('async_mode', 'revalidate')],
         supports_check_mode=True
     )
 
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': module.params['pdns_admin_api_key']
-    }
-
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/servers/' + str(module.params['pdns_server_id']) + '/zones/' + module.params['zone']
-
-    # Get the current list of records
-    listResponse = requests.get(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
-
-    discoveredRecords = []
-    if module.params['record'] or module.params['record_type']:
-        # Loop through the records and filter them out
-        for record in listResponse.json().get('rrsets', []):
-            if module.params['record'] and module.params['record_type']:
-                if record['name'].rstrip('.') == module.params['record'].rstrip('.') and record['type'] == module.params['record_type']:
-                    discoveredRecords.append(record)
-            elif module.params['record']:
-                if record['name'].rstrip('.') == module.params['record'].rstrip('.'):
-                    discoveredRecords.append(record)
-            elif module.params['record_type']:
-                if record['type'] == module.params['record_type']:
-                    discoveredRecords.append(record)
+    if module.params['max_results'] is not None and module.params['max_results'] < 0:
+        module.fail_json(msg='max_results must not be negative', **result)
+    if module.params['workers'] < 1:
+        module.fail_json(msg='workers must be at least 1', **result)
+    if module.params['max_connections'] < 1:
+        module.fail_json(msg='max_connections must be at least 1', **result)
+    if module.params['rate_limit'] < 0:
+        module.fail_json(msg='rate_limit must not be negative', **result)
 
+    if module.params['zone'] and module.params['async_mode']:
+        outcome = run(fetch_zones_async(module, [module.params['zone']]))[0]
+        if isinstance(outcome, PowerDNSAdminError):
+            module.fail_json(msg=str(outcome), **result)
+        result['records'] = outcome
+    elif module.params['zone']:
+        client = client_from_module(module, fail_on_error=False)
+        try:
+            result['records'] = fetch_records(client, module.params, module.params['zone'])
+        except PowerDNSAdminError as e:
+            module.fail_json(msg=str(e), **result)
     else:
-        discoveredRecords = listResponse.json().get('rrsets', [])
+        # Drop duplicates but keep the order the zones were given in
+        zones = []
+        seen = set()
+        for zone in module.params['zones']:
+            if zone not in seen:
+                seen.add(zone)
+                zones.append(zone)
+
+        result['records_by_zone'] = {}
+        result['failed_zones'] = {}
+        if module.params['async_mode']:
+            for zone, outcome in zip(zones, run(fetch_zones_async(module, zones))):
+                if isinstance(outcome, PowerDNSAdminError):
+                    result['failed_zones'][zone] = str(outcome)
+                else:
+                    result['records_by_zone'][zone] = outcome
+        else:
+            # The pooled API client, errors are raised so each zone can report its own
+            client = client_from_module(module, pool_size=module.params['workers'], fail_on_error=False)
+            with ThreadPoolExecutor(max_workers=min(module.params['workers'], max(len(zones), 1))) as executor:
+                futures = [(zone, executor.submit(fetch_records, client, module.params, zone)) for zone in zones]
+                for zone, future in futures:
+                    try:
+                        result['records_by_zone'][zone] = future.result()
+                    except PowerDNSAdminError as e:
+                        result['failed_zones'][zone] = str(e)
 
-    result['records'] = discoveredRecords
+        if zones and len(result['failed_zones']) == len(zones):
+            module.fail_json(msg='Failed to read every zone', **result)
 
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
@@ -0,0 +1,344 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+DOCUMENTATION = '''
+---
+module: records
+short_description: Manage many Records in a PowerDNS Admin Zone at once
+version_added: "2.11"
+description:
+    - "This module allows you to manage many Records in a Zone in PowerDNS Admin"
+    - "The Zone is read once, the desired Records are compared against it and only the rrsets that differ are sent, in as few PATCH requests as possible"
+    - "Supports check mode and diff mode, the change set is worked out from the same single read of the Zone and nothing is written in check mode"
+    - "With O(manage_ptr) the PTR records of the A and AAAA records are kept in their reverse zones, with one PATCH per reverse zone for all the Records"
+
+options:
+  pdns_admin_url:
+    description:
+      - This is the URL of your PowerDNS Admin instance
+    required: true
+    aliases: ['url']
+    type: str
+  pdns_admin_api_key:
+    description:
+      - This is the API Key for your PowerDNS Admin instance
+    required: true
+    aliases: ['api_key']
+    type: str
+  pdns_admin_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    aliases: ['skip_tls_verify']
+    type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of anything this module changes are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  cache_ttl:
+    description:
+      - Seconds to cache responses in I(cache_dir), 0 disables the cache
+      - The rrsets this module changes are always read from the API, the zone listing I(manage_ptr) reads is cached for I(zone_names_cache_ttl) instead
+    required: false
+    default: 0
+    type: int
+  zone_names_cache_ttl:
+    description:
+      - Seconds to cache the zone listing that I(manage_ptr) finds the reverse zones in, so a loop of tasks lists the zones once
+      - Creating or deleting a zone with the zone module invalidates it, 0 lists the zones on every run
+    required: false
+    default: 300
+    type: int
+  pdns_server_id:
+    description:
+      - The PowerDNS Server ID to use
+    required: false
+    default: localhost
+    aliases: ['server_id']
+    type: str
+  zone:
+    description:
+      - The Zone to manage Records in
+    required: true
+    aliases: ['zone_id']
+    type: str
+  records:
+    description:
+      - The list of Records to manage
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+          - The name of the Record
+        required: true
+        type: str
+      type:
+        description:
+          - The type of the Record
+        required: true
+        type: str
+      values:
+        description:
+          - A list of the values of the Record. Each value is a dict with 'content' and optional 'disabled' boolean, or a plain string.
+        required: false
+        type: list
+      ttl:
+        description:
+          - The TTL of the Record
+        required: false
+        default: 3600
+        type: int
+      state:
+        description:
+          - Whether the Record should exist or not
+        required: false
+        default: present
+        choices: ['present', 'absent']
+        type: str
+  chunk_size:
+    description:
+      - The maximum number of rrsets to send in a single PATCH request
+    required: false
+    default: 500
+    type: int
+  manage_ptr:
+    description:
+      - Keep the PTR records of the A and AAAA records in the reverse zones in step with their values
+      - Each address gets a PTR pointing at the name claiming it, addresses a record no longer has lose the PTR pointing at it
+      - The reverse zones are read once each and every one gets a single PATCH, chunked by O(chunk_size)
+      - Addresses without a reverse zone on the server are skipped with a warning
+    required: false
+    default: false
+    type: bool
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Create many Records in a Zone
+- name: Create the cluster Records in PowerDNS Admin
+  kenmoini.powerdns_admin.records:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    records:
+      - name: api.cluster.example.com.
+        type: A
+        values:
+          - 192.0.2.10
+      - name: node1.cluster.example.com.
+        type: A
+        ttl: 300
+        values:
+          - content: 192.0.2.11
+      - name: old.cluster.example.com.
+        type: A
+        state: absent
+    manage_ptr: true
+  register: r_records
+'''
+
+RETURN = '''
+records:
+    description: The result for each requested Record, in the order given
+    returned: always
+    type: list
+    sample: [{"name": "api.cluster.example.com.", "type": "A", "changed": true, "changetype": "REPLACE"}]
+ptr_records:
+    description: The PTR records manage_ptr looked at and the change made to each, zone is null when no reverse zone holds it
+    returned: when manage_ptr is true
+    type: list
+    sample: [{"name": "10.2.0.192.in-addr.arpa.", "zone": "2.0.192.in-addr.arpa.", "changed": true, "changetype": "REPLACE"}]
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
+'''
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_tag, zones_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module, PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_ptr import PtrPlan, plan_ptr_changes, ptr_results
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    chunked,
+    diff_rrset,
+    index_rrsets,
+    normalize_records,
+    rrset_key,
+    rrsets_diff,
+)
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        pdns_admin_url=dict(type='str', required=True, aliases=['url']),
+        pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
+        pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        cache_dir=dict(type='path', default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        cache_ttl=dict(type='int', default=0),
+        zone_names_cache_ttl=dict(type='int', default=300),
+        pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
+        zone=dict(type='str', required=True, aliases=['zone_id']),
+        records=dict(type='list', elements='dict', required=True, options=dict(
+            name=dict(type='str', required=True),
+            type=dict(type='str', required=True),
+            values=dict(type='list', required=False),
+            ttl=dict(type='int', required=False, default=3600),
+            state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        )),
+        chunk_size=dict(type='int', required=False, default=500),
+        manage_ptr=dict(type='bool', required=False, default=False),
+    )
+
+    result = dict(
+        changed=False,
+        records=[],
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.params['chunk_size'] < 1:
+        module.fail_json(msg='chunk_size must be at least 1', **result)
+
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    targetPath = '/servers/' + module.params['pdns_server_id'] + '/zones/' + module.params['zone']
+
+    # Read the zone once and index the rrsets by name and type
+    getResponse = client.get(targetPath)
+    if getResponse.status_code != 200:
+        module.fail_json(msg='Failed to read zone: ' + getResponse.text, **result)
+    currentRRsets = index_rrsets(getResponse.json().get('rrsets', []))
+
+    # Work out which rrsets actually need to change
+    changes = []
+    pairs = []
+    seen = set()
+    plan = PtrPlan()
+    for entry in module.params['records']:
+        key = rrset_key(entry['name'], entry['type'])
+        if key in seen:
+            module.fail_json(msg='Record {} {} is listed more than once'.format(entry['name'], entry['type']), **result)
+        seen.add(key)
+
+        change = diff_rrset(
+            currentRRsets.get(key),
+            entry['name'],
+            entry['type'],
+            entry['ttl'],
+            normalize_records(entry['values']),
+            state=entry['state'],
+        )
+        recordResult = {
+            "name": entry['name'],
+            "type": entry['type'].upper(),
+            "changed": change is not None,
+            "changetype": change['changetype'] if change else None,
+        }
+        result['records'].append(recordResult)
+        if change:
+            changes.append(change)
+            pairs.append((currentRRsets.get(key), change))
+        if module.params['manage_ptr']:
+            plan.add(entry['name'], entry['type'], currentRRsets.get(key), normalize_records(entry['values']),
+                     entry['ttl'], state=entry['state'])
+
+    # The PTRs of every record are grouped by reverse zone
+    ptrChanges = {}
+    if module.params['manage_ptr']:
+        try:
+            ptrChanges, reverseZones = plan_ptr_changes(client, module.params['pdns_server_id'], plan, module.params['zone_names_cache_ttl'])
+        except PowerDNSAdminError as e:
+            module.fail_json(msg=str(e), **result)
+        for ptr, reverseZone in sorted(reverseZones.items()):
+            if reverseZone is None:
+                module.warn('No reverse zone holds {}, its PTR is not managed'.format(ptr))
+        result['ptr_records'] = ptr_results(reverseZones, ptrChanges)
+
+    if module._diff:
+        result['diff'] = rrsets_diff(pairs + [pair for ptrPairs in ptrChanges.values() for pair in ptrPairs])
+
+    # The change set is known from the one read, check mode stops before writing it
+    if module.check_mode:
+        result['changed'] = bool(changes or ptrChanges)
+        module.exit_json(**result)
+
+    # Send only the changed rrsets, chunked to keep request bodies reasonable
+    for chunk in chunked(changes, module.params['chunk_size']):
+        patchResponse = client.patch(targetPath, json={"rrsets": chunk})
+        client.invalidate(zone_tag(module.params['pdns_server_id'], module.params['zone']), zones_tag(module.params['pdns_server_id']))
+        if patchResponse.status_code not in [200, 201, 204]:
+            module.fail_json(msg='Failed to manage records: ' + patchResponse.text, **result)
+        # Earlier chunks are already applied if a later one fails
+        result['changed'] = True
+
+    # One PATCH per reverse zone unless it has more than chunk_size changes
+    for reverseZone, ptrPairs in sorted(ptrChanges.items()):
+        for chunk in chunked([ptrChange for _, ptrChange in ptrPairs], module.params['chunk_size']):
+            patchResponse = client.patch('/servers/' + module.params['pdns_server_id'] + '/zones/' + reverseZone, json={"rrsets": chunk})
+            client.invalidate(zone_tag(module.params['pdns_server_id'], reverseZone), zones_tag(module.params['pdns_server_id']))
+            if patchResponse.status_code not in [200, 201, 204]:
+                module.fail_json(msg='Failed to manage PTR records in {}: {}'.format(reverseZone, patchResponse.text), **result)
+            result['changed'] = True
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
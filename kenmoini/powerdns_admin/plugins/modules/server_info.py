@@ -37,6 +37,60 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_ttl:
+    description:
+      - Cache responses on the controller for this many seconds, 0 disables the cache
+      - Cached reads are invalidated when the record, records, zone or account modules change the same Zone or Account
+    required: false
+    default: 0
+    type: int
+  cache_dir:
+    description:
+      - Directory to keep the response cache in
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  cache_max_entries:
+    description:
+      - The maximum number of cached responses, the least recently used ones are evicted first
+    required: false
+    default: 1000
+    type: int
+  cache_max_size:
+    description:
+      - The maximum total size of the cache in bytes, the least recently used responses are evicted first
+    required: false
+    default: 104857600
+    type: int
   server:
     description:
       - The Server to find, eg localhost, or empty for all Servers
@@ -70,12 +124,19 @@ servers:
     description: The data returned about the Server(s)
     type: object
     returned: always
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
-import base64
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, SERVERS_TAG
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
@@ -83,6 +144,14 @@ def run_module():
         pdns_admin_url=dict(type='str', required=True, aliases=['url']),
         pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
         pdns_admin_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', required=False, default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', required=False, default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', required=False, default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        cache_ttl=dict(type='int', required=False, default=0),
+        cache_dir=dict(type='path', required=False, default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        cache_max_entries=dict(type='int', required=False, default=1000),
+        cache_max_size=dict(type='int', required=False, default=104857600),
         server=dict(type='str', required=False, aliases=['server_id']),
     )
 
@@ -105,16 +174,13 @@ def run_module():
         supports_check_mode=False
     )
 
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': module.params['pdns_admin_api_key']
-    }
+    # Create the pooled API client
+    client = client_from_module(module)
 
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/servers'
+    targetPath = '/servers'
 
     # Get the current list of accounts
-    listResponse = requests.get(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
+    listResponse = client.get(targetPath, cache_tags=[SERVERS_TAG])
 
     discoveredServers = []
 
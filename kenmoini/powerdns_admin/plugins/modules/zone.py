@@ -15,6 +15,8 @@ short_description: Manage Zones in PowerDNS Admin
 version_added: "2.11"
 description:
     - "This module allows you to manage Zones in PowerDNS Admin"
+    - "A new Zone is created with its nameservers and initial rrsets in a single request"
+    - "Supports check mode and diff mode, the change is worked out from the same single read and nothing is written in check mode"
 
 options:
   pdns_admin_url:
@@ -36,6 +38,41 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of anything this module changes are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
   pdns_server_id:
     description:
       - The PowerDNS Server ID to use
@@ -67,6 +104,62 @@ options:
       - The Account to assign the Zone to
     required: false
     type: str
+  nameservers:
+    description:
+      - The nameservers of a new Zone, including the trailing dot
+      - Only used when the Zone is created, leave empty when I(rrsets) holds the NS rrset of the Zone apex
+    required: false
+    default: []
+    type: list
+    elements: str
+  rrsets:
+    description:
+      - rrsets to create the Zone with, sent together with the Zone so it is fully populated in one request
+      - Only used when the Zone is created, use M(kenmoini.powerdns_admin.records) to manage them afterwards
+    required: false
+    default: []
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description:
+          - The fully qualified name of the rrset
+        required: true
+        type: str
+      type:
+        description:
+          - The type of the rrset
+        required: true
+        type: str
+      values:
+        description:
+          - The records of the rrset, either a string or a dict with content and disabled
+        required: true
+        type: list
+      ttl:
+        description:
+          - The TTL of the rrset
+        required: false
+        default: 3600
+        type: int
+  masters:
+    description:
+      - The primary servers to transfer a Slave Zone from, as IP or IP:port
+    required: false
+    type: list
+    elements: str
+  dnssec:
+    description:
+      - Whether the Zone is signed with DNSSEC
+      - Left as it is when not set
+    required: false
+    type: bool
+  api_rectify:
+    description:
+      - Whether the Zone is rectified after every change made through the API
+      - Left as it is when not set
+    required: false
+    type: bool
   state:
     description:
       - Whether the zone should exist or not
@@ -91,6 +184,41 @@ EXAMPLES = '''
     account: someaccount
   register: r_zone
 
+# Create a fully populated Zone in one request
+- name: Create a Zone with nameservers and base Records
+  kenmoini.powerdns_admin.zone:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_api_key: 1234567890
+    zone_name: example.com.
+    nameservers:
+      - ns1.example.com.
+      - ns2.example.com.
+    rrsets:
+      - name: ns1.example.com.
+        type: A
+        values:
+          - 192.0.2.1
+      - name: ns2.example.com.
+        type: A
+        values:
+          - 192.0.2.2
+      - name: example.com.
+        type: MX
+        values:
+          - 10 mail.example.com.
+    dnssec: true
+    api_rectify: true
+
+# Create a secondary Zone
+- name: Create a Slave Zone in PowerDNS Admin
+  kenmoini.powerdns_admin.zone:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_api_key: 1234567890
+    zone_name: example.org.
+    zone_type: Slave
+    masters:
+      - 192.0.2.53
+
 # Delete a Zone
 - name: Delete a Zone in PowerDNS Admin
   kenmoini.powerdns_admin.zone:
@@ -105,12 +233,32 @@ zone:
     description: Details about the Zone
     returned: when state is 'present'
     type: object
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
-import base64
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_names_tag, zone_tag, zones_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import build_rrset, normalize_records, rrset_key, rrset_state
+
+# The zone settings shown in diff output
+ZONE_SETTINGS = ('kind', 'soa_edit_api', 'account', 'nameservers', 'masters', 'dnssec', 'api_rectify')
+
+
+def zone_view(zone, rrsets=False):
+    """The settings of a zone, and optionally its rrsets, as shown in diff output"""
+    view = dict((field, zone[field]) for field in ZONE_SETTINGS if field in zone)
+    if rrsets:
+        view['rrsets'] = dict(('{} {}'.format(rrset['name'], rrset['type']), rrset_state(rrset)) for rrset in zone.get('rrsets', []))
+    return view
+
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
@@ -118,11 +266,26 @@ def run_module():
         pdns_admin_url=dict(type='str', required=True, aliases=['url']),
         pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
         pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        cache_dir=dict(type='path', default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
         pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
         zone_name=dict(type='str', required=True, aliases=['name', 'zone', 'zone_id', 'id']),
         zone_type=dict(type='str', choices=['Native', 'Master', 'Slave'], default='Native'),
         soa_edit_api=dict(type='str', choices=['DEFAULT', 'INCREASE', 'EPOCH', 'OFF'], default='DEFAULT'),
         account=dict(type='str'),
+        nameservers=dict(type='list', elements='str', default=[]),
+        rrsets=dict(type='list', elements='dict', default=[], options=dict(
+            name=dict(type='str', required=True),
+            type=dict(type='str', required=True),
+            values=dict(type='list', required=True),
+            ttl=dict(type='int', required=False, default=3600),
+        )),
+        masters=dict(type='list', elements='str'),
+        dnssec=dict(type='bool'),
+        api_rectify=dict(type='bool'),
         state=dict(type='str', choices=['present', 'absent'], default='present')
     )
     result = dict(
@@ -131,26 +294,35 @@ def run_module():
     )
     module = AnsibleModule(
         argument_spec=module_args,
-        supports_check_mode=False
+        supports_check_mode=True
     )
 
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': module.params['pdns_admin_api_key']
-    }
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    targetPath = '/servers/' + module.params['pdns_server_id'] + '/zones'
 
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/servers/' + module.params['pdns_server_id'] + '/zones'
+    # Cached reads of this zone and of the zone listings go stale on any write
+    cacheTags = (
+        zone_tag(module.params['pdns_server_id'], module.params['zone_name']),
+        zones_tag(module.params['pdns_server_id']),
+        zone_names_tag(module.params['pdns_server_id']),
+    )
 
     # Check to see if the zone exists
-    apiResponse = requests.get(targetURL + '/' + module.params['zone_name'], headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
+    apiResponse = client.get(targetPath + '/' + module.params['zone_name'])
     zone_exists = apiResponse.status_code == 200
     if zone_exists:
       # Delete the Zone if state is absent
       if module.params['state'] == 'absent':
-          targetURL += '/' + module.params['zone_name']
-          apiResponse = requests.delete(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
+          if module._diff:
+              result['diff'] = dict(before=zone_view(apiResponse.json(), rrsets=True), after={})
+          if module.check_mode:
+              result['changed'] = True
+              module.exit_json(**result)
+          apiResponse = client.delete(targetPath + '/' + module.params['zone_name'])
           if apiResponse.status_code == 204:
+              client.invalidate(*cacheTags)
               result['changed'] = True
           else:
               module.fail_json(msg='Failed to delete zone: {}'.format(apiResponse.text), **result)
@@ -171,11 +343,25 @@ def run_module():
           if module.params['account'] and existing_zone.get('account') != module.params['account']:
               needs_update = True
               zone_payload['account'] = module.params['account']
+          if module.params['masters'] is not None and sorted(existing_zone.get('masters') or []) != sorted(module.params['masters']):
+              needs_update = True
+              zone_payload['masters'] = module.params['masters']
+          for field in ('dnssec', 'api_rectify'):
+              if module.params[field] is not None and existing_zone.get(field) != module.params[field]:
+                  needs_update = True
+                  zone_payload[field] = module.params[field]
 
-          if needs_update:
-              apiResponse = requests.put(targetURL + '/' + module.params['zone_name'], headers=headers, json=zone_payload, verify=not module.params['pdns_admin_skip_tls_verify'])
+          if needs_update and module._diff:
+              result['diff'] = dict(before=zone_view(existing_zone), after=dict(zone_view(existing_zone), **zone_payload))
+
+          if needs_update and module.check_mode:
+              result['changed'] = True
+              result['zone'] = existing_zone
+          elif needs_update:
+              apiResponse = client.put(targetPath + '/' + module.params['zone_name'], json=zone_payload)
 
               if apiResponse.status_code == 204:
+                  client.invalidate(*cacheTags)
                   result['changed'] = True
                   result['zone'] = existing_zone
               else:
@@ -203,10 +389,38 @@ def run_module():
             }
             if module.params['account']:
                 zone_payload['account'] = module.params['account']
+            if module.params['nameservers']:
+                zone_payload['nameservers'] = module.params['nameservers']
+            if module.params['masters']:
+                zone_payload['masters'] = module.params['masters']
+            for field in ('dnssec', 'api_rectify'):
+                if module.params[field] is not None:
+                    zone_payload[field] = module.params[field]
+
+            # The initial rrsets go in the same request, no changetype is used on creation
+            if module.params['rrsets']:
+                zone_payload['rrsets'] = []
+                seen = set()
+                for entry in module.params['rrsets']:
+                    key = rrset_key(entry['name'], entry['type'])
+                    if key in seen:
+                        module.fail_json(msg='rrset {} {} is listed more than once'.format(entry['name'], entry['type']), **result)
+                    seen.add(key)
+                    rrset = build_rrset(entry['name'], entry['type'], entry['ttl'], normalize_records(entry['values']))
+                    del rrset['changetype']
+                    zone_payload['rrsets'].append(rrset)
+
+            if module._diff:
+                result['diff'] = dict(before={}, after=zone_view(zone_payload, rrsets=True))
+            if module.check_mode:
+                result['changed'] = True
+                result['zone'] = zone_payload
+                module.exit_json(**result)
 
-            apiResponse = requests.post(targetURL, headers=headers, json=zone_payload, verify=not module.params['pdns_admin_skip_tls_verify'])
+            apiResponse = client.post(targetPath, json=zone_payload)
 
             if apiResponse.status_code == 201:
+                client.invalidate(*cacheTags)
                 result['changed'] = True
                 result['zone'] = apiResponse.json()
             else:
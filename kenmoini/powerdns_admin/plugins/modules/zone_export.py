@@ -0,0 +1,225 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+DOCUMENTATION = '''
+---
+module: zone_export
+short_description: Export a Zone from PowerDNS Admin to a zone file
+version_added: "2.11"
+description:
+    - "This module writes the Records of a Zone in PowerDNS Admin to an RFC 1035 zone file"
+    - "The Zone is streamed from the API straight into the file, so it is never held in memory as a whole"
+    - "Disabled Records are written as comments"
+
+options:
+  pdns_admin_url:
+    description:
+      - This is the URL of your PowerDNS Admin instance
+    required: true
+    aliases: ['url']
+    type: str
+  pdns_admin_api_key:
+    description:
+      - This is the API Key for your PowerDNS Admin instance
+    required: true
+    aliases: ['api_key']
+    type: str
+  pdns_admin_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    aliases: ['skip_tls_verify']
+    type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  pdns_server_id:
+    description:
+      - The PowerDNS Server ID to use
+    required: false
+    default: localhost
+    aliases: ['server_id']
+    type: str
+  zone:
+    description:
+      - The Zone to export
+    required: true
+    aliases: ['zone_id', 'name']
+    type: str
+  dest:
+    description:
+      - The path of the zone file to write
+      - The file is only replaced when its content changes
+    required: true
+    aliases: ['path']
+    type: path
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Back up a Zone to a file on the controller
+- name: Export a Zone from PowerDNS Admin
+  kenmoini.powerdns_admin.zone_export:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    dest: /backups/dns/example.com.zone
+  delegate_to: localhost
+'''
+
+RETURN = '''
+dest:
+    description: The path of the zone file
+    returned: always
+    type: str
+rrsets:
+    description: The number of rrsets written
+    returned: always
+    type: int
+records:
+    description: The number of records written, including disabled ones
+    returned: always
+    type: int
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import canonical_name
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import stream_rrsets
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zonefile import format_rrset
+import io
+import os
+import shutil
+import tempfile
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        pdns_admin_url=dict(type='str', required=True, aliases=['url']),
+        pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
+        pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
+        zone=dict(type='str', required=True, aliases=['zone_id', 'name']),
+        dest=dict(type='path', required=True, aliases=['path']),
+    )
+
+    result = dict(
+        changed=False,
+        dest=None,
+        rrsets=0,
+        records=0,
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    dest = module.params['dest']
+    result['dest'] = dest
+    destDir = os.path.dirname(os.path.abspath(dest))
+    if not os.path.isdir(destDir):
+        module.fail_json(msg='Destination directory {} does not exist'.format(destDir), **result)
+
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    targetPath = '/servers/' + module.params['pdns_server_id'] + '/zones/' + module.params['zone']
+    listResponse, rrsets = stream_rrsets(client, targetPath)
+    if rrsets is None:
+        module.fail_json(msg='Failed to read zone: ' + listResponse.text, **result)
+
+    # The SOA has to come first in a zone file but can be anywhere in the API
+    # response, so the other rrsets are spooled to a temporary file and copied
+    # in behind it
+    soa = ''
+    bodyFile = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    zoneFd, zonePath = tempfile.mkstemp(dir=destDir, prefix='.' + os.path.basename(dest) + '.')
+    try:
+        try:
+            for rrset in rrsets:
+                result['rrsets'] += 1
+                result['records'] += len(rrset.get('records', []))
+                if rrset['type'] == 'SOA':
+                    soa = format_rrset(rrset)
+                else:
+                    bodyFile.write(format_rrset(rrset))
+        except ValueError as e:
+            module.fail_json(msg='Failed to parse zone: {}'.format(e), **result)
+        finally:
+            listResponse.close()
+
+        with io.open(zoneFd, 'w', encoding='utf-8') as zoneFile:
+            zoneFile.write('$ORIGIN {}\n'.format(canonical_name(module.params['zone'])))
+            zoneFile.write(soa)
+            bodyFile.seek(0)
+            shutil.copyfileobj(bodyFile, zoneFile)
+
+        # Only replace the file when the export differs from it
+        if os.path.exists(dest) and module.sha256(dest) == module.sha256(zonePath):
+            os.unlink(zonePath)
+        elif module.check_mode:
+            os.unlink(zonePath)
+            result['changed'] = True
+        else:
+            module.atomic_move(zonePath, dest)
+            result['changed'] = True
+    finally:
+        bodyFile.close()
+        if os.path.exists(zonePath):
+            os.unlink(zonePath)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
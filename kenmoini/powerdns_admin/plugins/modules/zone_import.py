@@ -0,0 +1,321 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+DOCUMENTATION = '''
+---
+module: zone_import
+short_description: Load a zone file into a Zone in PowerDNS Admin
+version_added: "2.11"
+description:
+    - "This module reads an RFC 1035 zone file and makes the Records of an existing Zone in PowerDNS Admin match it"
+    - "Only the rrsets that differ from the Zone are sent, in chunked PATCH requests"
+    - "The whole zone file is parsed before the first request is sent, a zone file with an error leaves the Zone untouched"
+    - "The zone file and the current Zone are both read as streams, only a short fingerprint of each current rrset is kept in memory"
+    - "Records written as C(; disabled:) comments by M(kenmoini.powerdns_admin.zone_export) are imported as disabled Records"
+    - "Records of one name and type with different TTLs are imported with the first TTL and a warning"
+
+options:
+  pdns_admin_url:
+    description:
+      - This is the URL of your PowerDNS Admin instance
+    required: true
+    aliases: ['url']
+    type: str
+  pdns_admin_api_key:
+    description:
+      - This is the API Key for your PowerDNS Admin instance
+    required: true
+    aliases: ['api_key']
+    type: str
+  pdns_admin_skip_tls_verify:
+    description:
+      - Whether or not to skip TLS verification
+    required: false
+    default: false
+    aliases: ['skip_tls_verify']
+    type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_dir:
+    description:
+      - Directory of the response cache used by the info modules, cached reads of the Zone are invalidated there
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  pdns_server_id:
+    description:
+      - The PowerDNS Server ID to use
+    required: false
+    default: localhost
+    aliases: ['server_id']
+    type: str
+  zone:
+    description:
+      - The Zone to import into, it has to exist already
+      - Also the origin for relative names in the file until an C($ORIGIN) directive
+    required: true
+    aliases: ['zone_id', 'name']
+    type: str
+  src:
+    description:
+      - The path of the zone file to read
+    required: true
+    aliases: ['path']
+    type: path
+  default_ttl:
+    description:
+      - The TTL of Records that have none in the file and come before any C($TTL) directive
+    required: false
+    default: 3600
+    type: int
+  import_soa:
+    description:
+      - Whether the SOA Record of the file replaces the one of the Zone
+      - Left off by default since PowerDNS manages the serial itself
+    required: false
+    default: false
+    type: bool
+  purge:
+    description:
+      - Delete the rrsets of the Zone that are not in the file
+      - The SOA is never deleted
+    required: false
+    default: false
+    type: bool
+  chunk_size:
+    description:
+      - The maximum number of rrsets to send in one PATCH request
+    required: false
+    default: 1000
+    type: int
+  max_request_bytes:
+    description:
+      - The maximum size in bytes of one PATCH request body, a chunk is sent early once it would grow past this
+    required: false
+    default: 1048576
+    type: int
+
+author:
+    - Ken Moini (@kenmoini)
+'''
+
+EXAMPLES = '''
+# Restore a Zone from a backup made with zone_export
+- name: Import a zone file into PowerDNS Admin
+  kenmoini.powerdns_admin.zone_import:
+    pdns_admin_url: https://pdns.example.com
+    pdns_admin_api_key: 1234567890
+    zone: example.com.
+    src: /backups/dns/example.com.zone
+    purge: true
+  delegate_to: localhost
+'''
+
+RETURN = '''
+rrsets:
+    description: The number of rrsets read from the zone file
+    returned: always
+    type: int
+replaced:
+    description: The number of rrsets created or replaced
+    returned: always
+    type: int
+deleted:
+    description: The number of rrsets deleted by I(purge)
+    returned: always
+    type: int
+unchanged:
+    description: The number of rrsets that already matched the zone file
+    returned: always
+    type: int
+requests:
+    description: The number of PATCH requests sent
+    returned: always
+    type: int
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
+'''
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_tag, zones_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import (
+    build_rrset,
+    rrset_fingerprint,
+    rrset_key,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import stream_rrsets
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zonefile import parse_rrsets, ZoneFileError
+import io
+import json
+import os
+import tempfile
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        pdns_admin_url=dict(type='str', required=True, aliases=['url']),
+        pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
+        pdns_admin_skip_tls_verify=dict(type='bool', default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', default=False),
+        cache_dir=dict(type='path', default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        pdns_server_id=dict(type='str', default="localhost", aliases=['server_id']),
+        zone=dict(type='str', required=True, aliases=['zone_id', 'name']),
+        src=dict(type='path', required=True, aliases=['path']),
+        default_ttl=dict(type='int', required=False, default=3600),
+        import_soa=dict(type='bool', required=False, default=False),
+        purge=dict(type='bool', required=False, default=False),
+        chunk_size=dict(type='int', required=False, default=1000),
+        max_request_bytes=dict(type='int', required=False, default=1048576),
+    )
+
+    result = dict(
+        changed=False,
+        rrsets=0,
+        replaced=0,
+        deleted=0,
+        unchanged=0,
+        requests=0,
+    )
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    if module.params['chunk_size'] < 1:
+        module.fail_json(msg='chunk_size must be at least 1', **result)
+    if not os.path.isfile(module.params['src']):
+        module.fail_json(msg='Zone file {} does not exist'.format(module.params['src']), **result)
+
+    # Create the pooled API client
+    client = client_from_module(module)
+
+    serverId = module.params['pdns_server_id']
+    targetPath = '/servers/' + serverId + '/zones/' + module.params['zone']
+
+    # Stream the zone once, keeping only a fingerprint of each rrset
+    listResponse, rrsets = stream_rrsets(client, targetPath)
+    if rrsets is None:
+        module.fail_json(msg='Failed to read zone: ' + listResponse.text, **result)
+    current = {}
+    try:
+        for rrset in rrsets:
+            current[rrset_key(rrset['name'], rrset['type'])] = (rrset['name'], rrset['type'], rrset_fingerprint(rrset))
+    except ValueError as e:
+        module.fail_json(msg='Failed to parse zone: {}'.format(e), **result)
+    finally:
+        listResponse.close()
+
+    chunk = []
+    chunkBytes = [0]
+
+    def flush():
+        if not chunk:
+            return
+        result['changed'] = True
+        result['requests'] += 1
+        if not module.check_mode:
+            patchResponse = client.patch(targetPath, json={"rrsets": chunk})
+            client.invalidate(zone_tag(serverId, module.params['zone']), zones_tag(serverId))
+            if patchResponse.status_code not in [200, 201, 204]:
+                # The chunks sent before the refused one stay applied
+                module.fail_json(msg='Failed to import records: ' + patchResponse.text, **result)
+        del chunk[:]
+        chunkBytes[0] = 0
+
+    def send(change):
+        # Keep each request under both the rrset count and the body size limit
+        size = len(json.dumps(change)) + 2
+        if chunk and (len(chunk) >= module.params['chunk_size'] or chunkBytes[0] + size > module.params['max_request_bytes']):
+            flush()
+        chunk.append(change)
+        chunkBytes[0] += size
+
+    # The whole zone file is parsed before anything is sent, so an error late
+    # in it leaves the Zone untouched.  The changes are spooled to a temporary
+    # file, one JSON line each, rather than kept in memory
+    changeFile = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    try:
+        try:
+            with io.open(module.params['src'], 'r', encoding='utf-8') as zoneFile:
+                for rrset in parse_rrsets(zoneFile, module.params['zone'], module.params['default_ttl'], warn=module.warn):
+                    result['rrsets'] += 1
+                    key = rrset_key(rrset['name'], rrset['type'])
+                    existing = current.pop(key, None)
+                    if rrset['type'] == 'SOA' and not module.params['import_soa']:
+                        continue
+                    if existing is not None and existing[2] == rrset_fingerprint(rrset):
+                        result['unchanged'] += 1
+                        continue
+                    changeFile.write(json.dumps(build_rrset(rrset['name'], rrset['type'], rrset['ttl'], rrset['records'])) + '\n')
+                    result['replaced'] += 1
+        except (ZoneFileError, UnicodeDecodeError) as e:
+            module.fail_json(msg='Failed to read zone file: {}'.format(e), **result)
+
+        # Whatever is left in the zone was not in the file
+        if module.params['purge']:
+            for name, rtype, fingerprint in current.values():
+                if rtype == 'SOA':
+                    continue
+                changeFile.write(json.dumps(build_rrset(name, rtype, None, None, changetype='DELETE')) + '\n')
+                result['deleted'] += 1
+
+        # Send the rrsets that differ from the zone
+        changeFile.seek(0)
+        for line in changeFile:
+            send(json.loads(line))
+        flush()
+    finally:
+        changeFile.close()
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,8 @@ short_description: Returns Zones in PowerDNS Admin
 version_added: "2.11"
 description:
     - "This module allows you to list and find Zones in PowerDNS Admin"
+    - "When more than one of id, name, account and name_prefix are given a Zone has to match all of them"
+    - "The listing is parsed as it arrives and only the requested page of Zones, projected to I(fields), is kept, so large servers can be read a page at a time with a small result"
 
 options:
   pdns_admin_url:
@@ -37,6 +39,60 @@ options:
     default: false
     aliases: ['skip_tls_verify']
     type: bool
+  pdns_admin_timeout:
+    description:
+      - Timeout in seconds for each request to the PowerDNS Admin API
+    required: false
+    default: 30
+    aliases: ['timeout']
+    type: int
+  pdns_admin_retries:
+    description:
+      - How many times to retry a request that failed to connect or returned a 429 or 5xx status
+    required: false
+    default: 3
+    aliases: ['retries']
+    type: int
+  pdns_admin_retry_backoff:
+    description:
+      - Backoff factor in seconds between retries, doubled on every attempt
+    required: false
+    default: 0.5
+    aliases: ['retry_backoff']
+    type: float
+  collect_metrics:
+    description:
+      - Return the request count, bytes in and out, latency, retries and JSON decode time of this task as RV(metrics)
+      - They are also returned at verbosity 3 (-vvv) and above
+    required: false
+    default: false
+    type: bool
+  cache_ttl:
+    description:
+      - Cache responses on the controller for this many seconds, 0 disables the cache
+      - Cached reads are invalidated when the record, records, zone or account modules change the same Zone or Account
+    required: false
+    default: 0
+    type: int
+  cache_dir:
+    description:
+      - Directory to keep the response cache in
+      - Can also be set with the E(PDNS_ADMIN_CACHE_DIR) environment variable
+    required: false
+    default: ~/.ansible/tmp/powerdns_admin_cache
+    type: path
+  cache_max_entries:
+    description:
+      - The maximum number of cached responses, the least recently used ones are evicted first
+    required: false
+    default: 1000
+    type: int
+  cache_max_size:
+    description:
+      - The maximum total size of the cache in bytes, the least recently used responses are evicted first
+    required: false
+    default: 104857600
+    type: int
   server:
     description:
       - The Server to find the Zone in
@@ -52,15 +108,74 @@ options:
     type: str
   name:
     description:
-      - The Zone to find by Name
+      - The Zone, or list of Zones, to find by Name
     required: false
-    aliases: ['zone_name']
-    type: str
+    aliases: ['zone_name', 'names']
+    type: list
+    elements: str
   account:
     description:
       - The Zones to find by Account
     required: false
     type: str
+  async_mode:
+    description:
+      - Fetch each Zone in I(name) on its own, concurrently on one asyncio event loop, instead of downloading the listing of every Zone
+      - Worth it when a few thousand names are looked up on an installation with many more Zones
+      - The Zones are returned as the single Zone endpoint describes them, without their Records, in the order of I(name)
+      - Uses aiohttp when it is installed, otherwise requests are run through a thread pool of I(max_connections) threads
+      - Has no effect without I(name)
+    required: false
+    default: false
+    type: bool
+  workers:
+    description:
+      - The maximum number of requests in flight in I(async_mode)
+    required: false
+    default: 100
+    type: int
+  max_connections:
+    description:
+      - The maximum number of connections to PowerDNS Admin open at the same time in I(async_mode)
+    required: false
+    default: 10
+    type: int
+  rate_limit:
+    description:
+      - The maximum number of requests per second to send in I(async_mode), 0 for no limit
+    required: false
+    default: 0
+    type: float
+  name_prefix:
+    description:
+      - Only the Zones whose name starts with this, case insensitively
+    required: false
+    type: str
+  fields:
+    description:
+      - Only return these keys of each Zone, eg name, serial, account
+      - All keys are returned when not set
+    required: false
+    type: list
+    elements: str
+  offset:
+    description:
+      - Skip this many of the matching Zones, in the order the server lists them
+    required: false
+    default: 0
+    type: int
+  limit:
+    description:
+      - Return at most this many of the matching Zones, all of them when not set
+      - RV(count) has the number of matching Zones to page through them with I(offset)
+    required: false
+    type: int
+  count_only:
+    description:
+      - Only return RV(count), the number of matching Zones, and no Zones
+    required: false
+    default: false
+    type: bool
 
 author:
     - Ken Moini (@kenmoini)
@@ -81,19 +196,117 @@ EXAMPLES = '''
     pdns_admin_api_key: 1234567890
     id: test.example.com.
   register: r_zone
+
+# Find several Zones of an Account from one listing
+- name: Find Zones of an Account in PowerDNS Admin
+  kenmoini.powerdns_admin.zone_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    account: someaccount
+    name:
+      - one.example.com.
+      - two.example.com.
+  register: r_account_zones
+
+# Look up many Zones concurrently without listing every Zone
+- name: Find a long list of Zones in PowerDNS Admin
+  kenmoini.powerdns_admin.zone_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    name: "{{ customer_zones }}"
+    async_mode: true
+    max_connections: 20
+    rate_limit: 100
+  register: r_customer_zones
+
+# Read a large server a page at a time, with only the keys needed
+- name: Get the names and serials of the next 1000 customer Zones
+  kenmoini.powerdns_admin.zone_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    name_prefix: cust
+    fields:
+      - name
+      - serial
+      - account
+    offset: 1000
+    limit: 1000
+  register: r_zone_page
+
+# Count the Zones of an Account
+- name: Count the Zones of an Account in PowerDNS Admin
+  kenmoini.powerdns_admin.zone_info:
+    pdns_admin_url: https://phpipam.example.com
+    pdns_admin_api_key: 1234567890
+    account: someaccount
+    count_only: true
+  register: r_zone_count
 '''
 
 RETURN = '''
 zones:
-    description: The data returned about the Zone(s)
-    type: object
+    description: The data returned about the Zone(s), only the requested page and fields
+    type: list
     returned: always
+count:
+    description: The number of Zones matching the criteria, before I(offset) and I(limit)
+    type: int
+    returned: always
+    sample: 51234
+metrics:
+    description: Requests made, retries, bytes in and out, per-call latency and JSON decode time of this task
+    returned: when collect_metrics is true or at verbosity 3 and above
+    type: dict
+    sample: {"requests": 2, "retries": 0, "failures": 0, "cache_hits": 0, "bytes_in": 1841, "bytes_out": 164,
+             "http_seconds": 0.031, "json_decode_seconds": 0.0002, "elapsed_seconds": 0.034,
+             "latency": {"min": 0.012, "mean": 0.0155, "p50": 0.019, "p95": 0.019, "max": 0.019},
+             "calls": [{"method": "GET", "path": "/servers/localhost/zones/example.com.", "status": 200, "seconds": 0.012, "retries": 0}]}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import requests
-import json
-import base64
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_async import async_client_from_module, run
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import DEFAULT_CACHE_DIR, zone_tag, zones_tag
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import client_from_module, PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_rrsets import canonical_name
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import iter_response_items
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zones import match_zones, zone_page
+import asyncio
+
+
+async def fetch_zones_async(module, names):
+    """Fetch the named zones without their rrsets on one event loop.
+
+    Returns the zone, None when it does not exist or a PowerDNSAdminError for
+    each name.
+    """
+    client = async_client_from_module(
+        module,
+        concurrency=module.params['workers'],
+        per_host=module.params['max_connections'],
+        rate_limit=module.params['rate_limit'],
+    )
+    targetPath = '/servers/' + module.params['server'] + '/zones/'
+
+    async def fetch(name):
+        try:
+            response = await client.get(targetPath + canonical_name(name), params={'rrsets': 'false'},
+                                        cache_tags=[zone_tag(module.params['server'], name)])
+            # PowerDNS answers 422 for zones that do not exist, PowerDNS Admin 404
+            if response.status_code in [404, 422]:
+                return None
+            if response.status_code != 200:
+                raise PowerDNSAdminError('Failed to read zone {}: {}'.format(name, response.text))
+            zone = response.json()
+        except PowerDNSAdminError as e:
+            return e
+        except ValueError as e:
+            return PowerDNSAdminError('Failed to parse zone {}: {}'.format(name, e))
+        zone.pop('rrsets', None)
+        return zone
+
+    async with client:
+        return await asyncio.gather(*[fetch(name) for name in names])
+
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
@@ -101,10 +314,27 @@ def run_module():
         pdns_admin_url=dict(type='str', required=True, aliases=['url']),
         pdns_admin_api_key=dict(type='str', required=True, no_log=True, aliases=['api_key']),
         pdns_admin_skip_tls_verify=dict(type='bool', required=False, default=False, aliases=['skip_tls_verify']),
+        pdns_admin_timeout=dict(type='int', required=False, default=30, aliases=['timeout']),
+        pdns_admin_retries=dict(type='int', required=False, default=3, aliases=['retries']),
+        pdns_admin_retry_backoff=dict(type='float', required=False, default=0.5, aliases=['retry_backoff']),
+        collect_metrics=dict(type='bool', required=False, default=False),
+        cache_ttl=dict(type='int', required=False, default=0),
+        cache_dir=dict(type='path', required=False, default=DEFAULT_CACHE_DIR, fallback=(env_fallback, ['PDNS_ADMIN_CACHE_DIR'])),
+        cache_max_entries=dict(type='int', required=False, default=1000),
+        cache_max_size=dict(type='int', required=False, default=104857600),
         server=dict(type='str', required=False, default='localhost', aliases=['server_id']),
         id=dict(type='str', required=False, aliases=['zone_id']),
-        name=dict(type='str', required=False, aliases=['zone_name']),
-        account=dict(type='str', required=False)
+        name=dict(type='list', elements='str', required=False, aliases=['zone_name', 'names']),
+        account=dict(type='str', required=False),
+        async_mode=dict(type='bool', required=False, default=False),
+        workers=dict(type='int', required=False, default=100),
+        max_connections=dict(type='int', required=False, default=10),
+        rate_limit=dict(type='float', required=False, default=0),
+        name_prefix=dict(type='str', required=False),
+        fields=dict(type='list', elements='str', required=False),
+        offset=dict(type='int', required=False, default=0),
+        limit=dict(type='int', required=False),
+        count_only=dict(type='bool', required=False, default=False),
     )
 
     # seed the result dict in the object
@@ -114,7 +344,8 @@ def run_module():
     # for consumption, for example, in a subsequent task
     result = dict(
         changed=False,
-        zones={}
+        zones=[],
+        count=0,
     )
 
     # the AnsibleModule object will be our abstraction working with Ansible
@@ -126,32 +357,85 @@ def run_module():
         supports_check_mode=False
     )
 
-    # Create the headers for the API request
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': module.params['pdns_admin_api_key']
-    }
+    if module.params['workers'] < 1:
+        module.fail_json(msg='workers must be at least 1', **result)
+    if module.params['max_connections'] < 1:
+        module.fail_json(msg='max_connections must be at least 1', **result)
+    if module.params['rate_limit'] < 0:
+        module.fail_json(msg='rate_limit must not be negative', **result)
+    if module.params['offset'] < 0:
+        module.fail_json(msg='offset must not be negative', **result)
+    if module.params['limit'] is not None and module.params['limit'] < 0:
+        module.fail_json(msg='limit must not be negative', **result)
+
+    # count_only is a page of no zones
+    limit = 0 if module.params['count_only'] else module.params['limit']
+
+    if module.params['async_mode'] and module.params['name']:
+        # Drop duplicates but keep the order the names were given in
+        names = []
+        seen = set()
+        for name in module.params['name']:
+            if canonical_name(name) not in seen:
+                seen.add(canonical_name(name))
+                names.append(name)
+
+        zones = []
+        for outcome in run(fetch_zones_async(module, names)):
+            if isinstance(outcome, PowerDNSAdminError):
+                module.fail_json(msg=str(outcome), **result)
+            if outcome is not None:
+                zones.append(outcome)
+
+        # The id, account and prefix criteria still apply to the fetched zones
+        result['count'], result['zones'] = zone_page(
+            match_zones(
+                zones,
+                ids=[module.params['id']] if module.params['id'] else None,
+                accounts=[module.params['account']] if module.params['account'] else None,
+                name_prefix=module.params['name_prefix'],
+            ),
+            offset=module.params['offset'],
+            limit=limit,
+            fields=module.params['fields'],
+        )
+        module.exit_json(**result)
 
-    targetURL = module.params['pdns_admin_url'] + '/api/v1/servers/' + module.params['server'] + '/zones'
+    # Create the pooled API client
+    client = client_from_module(module)
 
-    # Get the current list of Zones
-    listResponse = requests.get(targetURL, headers=headers, verify=not module.params['pdns_admin_skip_tls_verify'])
+    targetPath = '/servers/' + module.params['server'] + '/zones'
 
-    discoveredZones = []
+    # A single name can be filtered on the server, it is still matched below in
+    # case the server ignores the zone parameter
+    params = {}
+    if module.params['name'] and len(module.params['name']) == 1:
+        params['zone'] = canonical_name(module.params['name'][0])
 
-    if module.params['id'] or module.params['name'] or module.params['account']:
-        # Loop through the Zones
-        for zone in listResponse.json():
-            if module.params['id'] and zone['id'] == module.params['id']:
-                discoveredZones.append(zone)
-            elif module.params['name'] and zone['name'] == module.params['name']:
-                discoveredZones.append(zone)
-            elif module.params['account'] and zone['account'] == module.params['account']:
-                discoveredZones.append(zone)
-    else:
-        discoveredZones = listResponse.json()
+    # Get the current list of Zones, streamed unless the cache keeps a copy of it
+    cached = module.params['cache_ttl'] > 0 and module.params['cache_dir'] is not None
+    listResponse = client.get(targetPath, params=params, cache_tags=[zones_tag(module.params['server'])], stream=not cached)
+    if listResponse.status_code != 200:
+        module.fail_json(msg='Failed to list zones: ' + listResponse.text, **result)
 
-    result['zones'] = discoveredZones
+    # Match every criterion in one pass, only the requested page is kept
+    try:
+        result['count'], result['zones'] = zone_page(
+            match_zones(
+                listResponse.json() if cached else iter_response_items(listResponse),
+                ids=[module.params['id']] if module.params['id'] else None,
+                names=module.params['name'],
+                accounts=[module.params['account']] if module.params['account'] else None,
+                name_prefix=module.params['name_prefix'],
+            ),
+            offset=module.params['offset'],
+            limit=limit,
+            fields=module.params['fields'],
+        )
+    except ValueError as e:
+        module.fail_json(msg='Failed to parse the zone listing: {}'.format(e), **result)
+    finally:
+        listResponse.close()
 
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Compare the ways record_info can fan out over many zones.
+
+Runs the same lookup over every zone of a local mock PowerDNS Admin with a
+fixed delay per request, one zone after the other, in the thread pool used
+by default and in async_mode with and without aiohttp.
+
+    python bench_async.py --zones 1000 --latency 0.02 --workers 10 --async-workers 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from collection import add_collection_to_path  # noqa: E402
+from mock_pdns import MockPowerDNSAdmin  # noqa: E402
+
+add_collection_to_path()
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils import pdns_async  # noqa: E402
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminClient  # noqa: E402
+from ansible_collections.kenmoini.powerdns_admin.plugins.modules import record_info  # noqa: E402
+
+
+def module_params(mock, args, workers):
+    return dict(
+        pdns_admin_url=mock.url,
+        pdns_admin_api_key=mock.api_key,
+        pdns_admin_skip_tls_verify=False,
+        pdns_admin_timeout=30,
+        pdns_admin_retries=3,
+        pdns_admin_retry_backoff=0.5,
+        cache_dir=None,
+        pdns_server_id='localhost',
+        record=None,
+        record_type='SOA',
+        stream=False,
+        revalidate=False,
+        max_results=None,
+        fields=None,
+        workers=workers,
+        max_connections=args.max_connections,
+        rate_limit=0,
+    )
+
+
+def sync_client(mock, pool_size):
+    return PowerDNSAdminClient(mock.url, headers={'X-API-Key': mock.api_key}, pool_size=pool_size)
+
+
+def bench_sequential(mock, args, zones):
+    params = module_params(mock, args, 1)
+    client = sync_client(mock, 1)
+    return [record_info.fetch_records(client, params, zone) for zone in zones]
+
+
+def bench_threads(mock, args, zones):
+    params = module_params(mock, args, args.workers)
+    client = sync_client(mock, args.workers)
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        return list(executor.map(lambda zone: record_info.fetch_records(client, params, zone), zones))
+
+
+def bench_async(mock, args, zones):
+    module = types.SimpleNamespace(params=module_params(mock, args, args.async_workers))
+    return pdns_async.run(record_info.fetch_zones_async(module, zones))
+
+
+def bench_async_fallback(mock, args, zones):
+    has_aiohttp = pdns_async.HAS_AIOHTTP
+    pdns_async.HAS_AIOHTTP = False
+    try:
+        return bench_async(mock, args, zones)
+    finally:
+        pdns_async.HAS_AIOHTTP = has_aiohttp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--zones', type=int, default=500)
+    parser.add_argument('--records', type=int, default=10, help='A records per zone')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every request')
+    parser.add_argument('--workers', type=int, default=10, help='threads of the default path')
+    parser.add_argument('--async-workers', type=int, default=200, help='requests in flight in async_mode')
+    parser.add_argument('--max-connections', type=int, default=50, help='connections to the host in async_mode')
+    parser.add_argument('--skip-sequential', action='store_true', help='leave out the slowest run')
+    args = parser.parse_args()
+
+    runs = [('threads ({})'.format(args.workers), bench_threads)]
+    if not args.skip_sequential:
+        runs.insert(0, ('sequential', bench_sequential))
+    if pdns_async.HAS_AIOHTTP:
+        runs.append(('async aiohttp ({}/{})'.format(args.async_workers, args.max_connections), bench_async))
+    runs.append(('async fallback ({})'.format(args.max_connections), bench_async_fallback))
+
+    with MockPowerDNSAdmin(zones=args.zones, records=args.records, latency=args.latency) as mock:
+        zones = mock.zone_names()
+        print('{} zones, {} records each, {:.0f} ms per request'.format(args.zones, args.records, args.latency * 1000))
+        print('{:<28} {:>9} {:>9} {:>10}'.format('path', 'seconds', 'requests', 'zones/s'))
+        for label, bench in runs:
+            mock.reset_counters()
+            started = time.time()
+            outcomes = bench(mock, args, zones)
+            elapsed = time.time() - started
+            failures = sum(1 for outcome in outcomes if isinstance(outcome, Exception))
+            print('{:<28} {:>9.2f} {:>9} {:>10.0f}{}'.format(
+                label, elapsed, mock.requests, len(zones) / elapsed, '  ({} failed)'.format(failures) if failures else ''))
+
+
+if __name__ == '__main__':
+    main()
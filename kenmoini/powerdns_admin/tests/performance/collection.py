@@ -0,0 +1,26 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The repository keeps the collections at <repo>/kenmoini/<name> rather than
+# under an ansible_collections directory, so the benchmarks link the namespace
+# into a temporary one to import the modules as Ansible would.
+
+import os
+import sys
+import tempfile
+
+NAMESPACE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+
+def add_collection_to_path():
+    """Make ansible_collections.kenmoini importable and return the directory holding ansible_collections"""
+    try:
+        import ansible_collections.kenmoini.powerdns_admin as collection
+        return os.path.dirname(os.path.dirname(os.path.dirname(list(collection.__path__)[0])))
+    except ImportError:
+        pass
+    root = tempfile.mkdtemp(prefix='pdns_collections_')
+    os.makedirs(os.path.join(root, 'ansible_collections'))
+    os.symlink(NAMESPACE_DIR, os.path.join(root, 'ansible_collections', 'kenmoini'))
+    sys.path.insert(0, root)
+    return root
@@ -0,0 +1,118 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from collection import add_collection_to_path  # noqa: E402
+from mock_pdns import MockPowerDNSAdmin  # noqa: E402
+from launch_module import PEAK_MARKER  # noqa: E402
+
+COLLECTIONS_ROOT = add_collection_to_path()
+MODULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'plugins', 'modules')
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'launch_module.py')
+
+# The size of the mock installation and the delay of every request, override
+# them from the environment to benchmark against larger zones or slower links
+ZONES = int(os.environ.get('PDNS_BENCH_ZONES', 50))
+RECORDS = int(os.environ.get('PDNS_BENCH_RECORDS', 1000))
+ACCOUNTS = int(os.environ.get('PDNS_BENCH_ACCOUNTS', 20))
+LATENCY = float(os.environ.get('PDNS_BENCH_LATENCY', 0.005))
+
+
+class ModuleRun(object):
+    """What one module run returned and cost"""
+
+    def __init__(self, result, requests, bytes_out, peak_rss_kb, elapsed):
+        self.result = result
+        self.requests = requests
+        self.bytes_out = bytes_out
+        self.peak_rss_kb = peak_rss_kb
+        self.elapsed = elapsed
+
+
+@pytest.fixture(scope='module')
+def mock_pdns():
+    with MockPowerDNSAdmin(zones=ZONES, records=RECORDS, accounts=ACCOUNTS, latency=LATENCY) as mock:
+        yield mock
+
+
+@pytest.fixture
+def run_module(mock_pdns, tmp_path):
+    """Run a module in its own process like Ansible does and measure it.
+
+    The peak RSS is reported by the process itself, see launch_module.py, and
+    the request count and bytes come from the mock server.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [COLLECTIONS_ROOT, os.environ.get('PYTHONPATH')])))
+
+    def run(name, args, auth='api_key', cache_dir=True):
+        # The response cache is kept off, pass cache_dir=False for the modules that have none
+        module_args = dict(pdns_admin_url=mock_pdns.url)
+        if cache_dir:
+            module_args['cache_dir'] = None
+        if auth == 'basic':
+            module_args.update(pdns_admin_username='admin', pdns_admin_password='admin')
+        else:
+            module_args.update(pdns_admin_api_key=mock_pdns.api_key)
+        module_args.update(args)
+        argsFile = tempfile.NamedTemporaryFile('w', suffix='.json', dir=str(tmp_path), delete=False)
+        with argsFile:
+            json.dump(dict(ANSIBLE_MODULE_ARGS=module_args), argsFile)
+
+        mock_pdns.reset_counters()
+        started = time.time()
+        with open(str(tmp_path / 'stdout'), 'w+b') as stdout, open(str(tmp_path / 'stderr'), 'w+b') as stderr:
+            process = subprocess.Popen([sys.executable, LAUNCHER, os.path.join(MODULES_DIR, name + '.py'), argsFile.name],
+                                       stdout=stdout, stderr=stderr, env=env)
+            pid, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = status
+            elapsed = time.time() - started
+            stdout.seek(0)
+            stderr.seek(0)
+            output = stdout.read().decode('utf-8')
+            errors = stderr.read().decode('utf-8')
+
+        # Without /proc the rusage is the best there is, inflated as it may be
+        peak_rss_kb = rusage.ru_maxrss
+        for line in errors.splitlines():
+            if line.startswith(PEAK_MARKER):
+                peak_rss_kb = int(line[len(PEAK_MARKER):])
+
+        try:
+            result = json.loads(output)
+        except ValueError:
+            raise AssertionError('{} did not return JSON: {}{}'.format(name, output, errors))
+        if result.get('failed'):
+            raise AssertionError('{} failed: {}'.format(name, result.get('msg')))
+        return ModuleRun(result, mock_pdns.requests, mock_pdns.bytes_out, peak_rss_kb, elapsed)
+
+    return run
+
+
+@pytest.fixture
+def measure(benchmark, run_module):
+    """Benchmark a module and record its request count, bytes and peak RSS with the timings.
+
+    ``args`` is the module arguments, or a callable returning them for each
+    round when every round has to change something.  Returns every run.
+    """
+
+    def measure(name, args, rounds=5, **kwargs):
+        runs = []
+        make_args = args if callable(args) else lambda: args
+        benchmark.pedantic(lambda: runs.append(run_module(name, make_args(), **kwargs)), rounds=rounds, iterations=1)
+        benchmark.extra_info['requests'] = max(run.requests for run in runs)
+        benchmark.extra_info['bytes_out'] = max(run.bytes_out for run in runs)
+        benchmark.extra_info['peak_rss_kb'] = max(run.peak_rss_kb for run in runs)
+        return runs
+
+    return measure
@@ -0,0 +1,32 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Runs a module like Ansible does and reports its peak memory on stderr.
+#
+# The ru_maxrss of a child keeps the high water mark of the process it was
+# forked from across exec, so the benchmarks would see the RSS of pytest and
+# the mock server.  VmHWM belongs to the memory of this process alone.
+#
+#     python launch_module.py <module.py> <args.json>
+
+import atexit
+import runpy
+import sys
+
+PEAK_MARKER = 'peak_rss_kb='
+
+
+def report_peak():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    sys.stderr.write(PEAK_MARKER + line.split()[1] + '\n')
+    except IOError:
+        pass
+
+
+if __name__ == '__main__':
+    atexit.register(report_peak)
+    sys.argv = sys.argv[1:]
+    runpy.run_path(sys.argv[0], run_name='__main__')
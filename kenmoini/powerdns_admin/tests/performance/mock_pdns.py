@@ -0,0 +1,317 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Mock of the PowerDNS Admin API for the benchmarks.
+#
+# Serves generated zones and accounts from memory with a configurable delay
+# per request so the cost of the modules can be measured without a lab host.
+# Implements the endpoints the modules use: /servers, the zone listing and
+# zone CRUD with rrset PATCH on the X-API-Key side, and /pdnsadmin/accounts
+# on the Basic auth side.  Every request is handled in its own thread, like a
+# real server with enough workers.
+#
+# Runs in process for the benchmarks or standalone for playbooks:
+#
+#     python mock_pdns.py --port 8081 --zones 100 --records 1000 --latency 0.01
+
+import argparse
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    # Python < 3.7
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def make_zone(name, records, account=''):
+    """A zone with an SOA, an NS and ``records`` A rrsets"""
+    rrsets = [
+        dict(name=name, type='SOA', ttl=3600, records=[dict(content='ns1.{} hostmaster.{} 1 10800 3600 604800 3600'.format(name, name), disabled=False)], comments=[]),
+        dict(name=name, type='NS', ttl=3600, records=[dict(content='ns1.' + name, disabled=False)], comments=[]),
+    ]
+    for i in range(records):
+        rrsets.append(dict(
+            name='host{}.{}'.format(i, name),
+            type='A',
+            ttl=3600,
+            records=[dict(content='10.{}.{}.{}'.format((i >> 16) & 255, (i >> 8) & 255, i & 255), disabled=False)],
+            comments=[],
+        ))
+    return dict(
+        id=name,
+        name=name,
+        kind='Native',
+        account=account,
+        serial=1,
+        edited_serial=1,
+        soa_edit_api='DEFAULT',
+        dnssec=False,
+        masters=[],
+        url='/api/v1/servers/localhost/zones/' + name,
+        rrsets=rrsets,
+    )
+
+
+class MockPowerDNSAdmin(object):
+    """Mock server holding ``zones`` zones of ``records`` A records each and ``accounts`` accounts.
+
+    ``latency`` is added to every request in seconds.  Use it as a context
+    manager, ``url`` is the base URL to point the modules at.  ``log`` holds
+    the method and path of every request since the last reset_counters().
+    """
+
+    def __init__(self, zones=100, records=10, accounts=10, latency=0.0, api_key='benchmark', host='127.0.0.1', port=0):
+        self.latency = latency
+        self.api_key = api_key
+        self.address = (host, port)
+        self.zones = {}
+        for i in range(zones):
+            name = 'zone{}.example.com.'.format(i)
+            self.zones[name] = make_zone(name, records, account='account{}'.format(i % accounts) if accounts else '')
+        self.accounts = {}
+        for i in range(accounts):
+            self.accounts[i + 1] = dict(id=i + 1, name='account{}'.format(i), description='Account {}'.format(i),
+                                        contact='', mail='', domains=[])
+        self.requests = 0
+        self.bytes_out = 0
+        self.log = []
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server.server_address[:2])
+
+    def zone_names(self):
+        return list(self.zones)
+
+    def add_zone(self, name, records):
+        """Add a zone of ``records`` A records, replacing any zone of that name"""
+        self.zones[name] = make_zone(name, records)
+        return self.zones[name]
+
+    def start(self):
+        self.server = ThreadingHTTPServer(self.address, self._handler())
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 1024
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_out = 0
+            self.log = []
+
+    def route(self, method, path, query, body, headers):
+        """Return the status and body for a request"""
+        parts = path.strip('/').split('/')[2:]
+        if parts[:1] == ['pdnsadmin']:
+            if not headers.get('Authorization', '').startswith('Basic '):
+                return 401, dict(error='Unauthorized')
+            if parts[1:2] == ['accounts']:
+                return self.route_accounts(method, parts[2:], body)
+            return 404, dict(error='Not Found')
+
+        if headers.get('X-API-Key') != self.api_key:
+            return 401, dict(error='Unauthorized')
+        if parts == ['servers']:
+            return 200, [dict(id='localhost', type='Server', daemon_type='authoritative')]
+        if parts[:1] != ['servers'] or len(parts) < 3 or parts[2] != 'zones':
+            return 404, dict(error='Not Found')
+        if len(parts) == 3:
+            return self.route_zones(method, query, body)
+        return self.route_zone(method, parts[3], query, body)
+
+    def route_zones(self, method, query, body):
+        if method == 'POST':
+            if body['name'] in self.zones:
+                return 409, dict(error='Conflict')
+            zone = make_zone(body['name'], 0, account=body.get('account', ''))
+            zone['rrsets'] = [rrset for rrset in zone['rrsets'] if rrset['type'] == 'SOA']
+            if body.get('nameservers'):
+                zone['rrsets'].append(dict(name=body['name'], type='NS', ttl=3600, comments=[],
+                                           records=[dict(content=ns, disabled=False) for ns in body['nameservers']]))
+            zone['rrsets'].extend(dict(rrset, comments=[]) for rrset in body.get('rrsets', []))
+            for field in ('kind', 'soa_edit_api', 'masters', 'dnssec', 'api_rectify'):
+                if field in body:
+                    zone[field] = body[field]
+            self.zones[body['name']] = zone
+            return 201, zone
+        if method != 'GET':
+            return 405, dict(error='Method Not Allowed')
+
+        zones = [dict((k, v) for k, v in zone.items() if k != 'rrsets') for zone in self.zones.values()]
+        if 'zone' in query:
+            zones = [zone for zone in zones if zone['name'] == query['zone'][0]]
+        return 200, zones
+
+    def route_zone(self, method, name, query, body):
+        zone = self.zones.get(name)
+        if zone is None:
+            return 422, dict(error='Could not find domain')
+
+        if method == 'GET':
+            if query.get('rrsets') == ['false']:
+                return 200, dict(zone, rrsets=[])
+            rrsets = zone['rrsets']
+            if 'rrset_name' in query:
+                rrsets = [rrset for rrset in rrsets if rrset['name'] == query['rrset_name'][0]]
+                if 'rrset_type' in query:
+                    rrsets = [rrset for rrset in rrsets if rrset['type'] == query['rrset_type'][0]]
+            return 200, dict(zone, rrsets=rrsets)
+
+        if method == 'PATCH':
+            # Apply every change in one pass over the zone, the last change of an rrset wins
+            changes = dict(((change['name'], change['type']), change) for change in body.get('rrsets', []))
+            zone['rrsets'] = [rrset for rrset in zone['rrsets'] if (rrset['name'], rrset['type']) not in changes]
+            for change in changes.values():
+                if change['changetype'] == 'REPLACE':
+                    zone['rrsets'].append(dict(name=change['name'], type=change['type'], ttl=change['ttl'],
+                                               records=change['records'], comments=[]))
+            zone['serial'] += 1
+            zone['edited_serial'] = zone['serial']
+            return 204, None
+        if method == 'PUT':
+            zone.update(body)
+            return 204, None
+        if method == 'DELETE':
+            del self.zones[name]
+            return 204, None
+        return 405, dict(error='Method Not Allowed')
+
+    def route_accounts(self, method, parts, body):
+        if not parts:
+            if method == 'GET':
+                return 200, list(self.accounts.values())
+            if method == 'POST':
+                if any(account['name'] == body['name'] for account in self.accounts.values()):
+                    return 409, dict(error='Account already exists')
+                account_id = max(self.accounts or [0]) + 1
+                self.accounts[account_id] = dict(dict(description='', contact='', mail='', domains=[]), id=account_id, **body)
+                return 201, self.accounts[account_id]
+            return 405, dict(error='Method Not Allowed')
+
+        if method == 'GET':
+            # Looked up by name
+            for account in self.accounts.values():
+                if account['name'] == parts[0]:
+                    return 200, account
+            return 404, dict(error='Account not found')
+
+        try:
+            account_id = int(parts[0])
+        except ValueError:
+            return 404, dict(error='Account not found')
+        if account_id not in self.accounts:
+            return 404, dict(error='Account not found')
+        if method == 'PUT':
+            self.accounts[account_id].update(body)
+            return 204, None
+        if method == 'DELETE':
+            del self.accounts[account_id]
+            return 204, None
+        return 405, dict(error='Method Not Allowed')
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes, without this every
+            # keep-alive request waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if mock.latency:
+                    time.sleep(mock.latency)
+                split = urlsplit(self.path)
+                try:
+                    body = json.loads(raw.decode('utf-8')) if raw else {}
+                except ValueError:
+                    status, response = 400, dict(error='Invalid JSON')
+                else:
+                    # One request at a time changes the data, like a database would.
+                    # The path is decoded before it is routed, as WSGI servers do
+                    with mock.lock:
+                        status, response = mock.route(method, unquote(split.path), parse_qs(split.query), body, self.headers)
+                data = json.dumps(response).encode('utf-8') if response is not None else b''
+                with mock.lock:
+                    mock.requests += 1
+                    mock.bytes_out += len(data)
+                    mock.log.append((method, self.path))
+                self.send_response(status)
+                if data:
+                    self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def do_PUT(self):
+                self._handle('PUT')
+
+            def do_PATCH(self):
+                self._handle('PATCH')
+
+            def do_DELETE(self):
+                self._handle('DELETE')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock PowerDNS Admin API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--zones', type=int, default=100)
+    parser.add_argument('--records', type=int, default=10, help='A records per zone')
+    parser.add_argument('--accounts', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--api-key', default='benchmark')
+    args = parser.parse_args()
+
+    mock = MockPowerDNSAdmin(zones=args.zones, records=args.records, accounts=args.accounts,
+                             latency=args.latency, api_key=args.api_key, host=args.host, port=args.port)
+    mock.start()
+    print('Serving {} zones on {} with API key {}'.format(len(mock.zones), mock.url, args.api_key))
+    try:
+        mock.thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Latency, request count and peak RSS of the modules against the mock API.
+
+Every module runs in its own process as Ansible would run it.  The timings
+are kept by pytest-benchmark, compare them between revisions with
+
+    pytest tests/performance --benchmark-autosave
+    pytest tests/performance --benchmark-compare --benchmark-compare-fail=median:25%
+
+The request counts are asserted, a change that makes a module send more
+requests than it needs fails straight away.
+"""
+
+import itertools
+import math
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+ZONE = 'zone0.example.com.'
+ZONES = ['zone{}.example.com.'.format(i) for i in range(10)]
+
+# The zone exported and imported back by the round trip benchmark
+BIG_ZONE = 'big.example.com.'
+BIG_ZONE_RECORDS = int(os.environ.get('PDNS_BENCH_BIG_ZONE_RECORDS', 100000))
+
+
+def test_record_unchanged(measure):
+    runs = measure('record', dict(zone=ZONE, name='host0.' + ZONE, type='A', values=['10.0.0.0']))
+    assert not any(run.result['changed'] for run in runs)
+    # The rrset lookup, no PATCH
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_record_changed(measure):
+    counter = itertools.count(1)
+    runs = measure('record', lambda: dict(zone=ZONE, name='host1.' + ZONE, type='A', values=['192.0.2.{}'.format(next(counter))]))
+    assert all(run.result['changed'] for run in runs)
+    # The rrset lookup and one PATCH
+    assert all(run.requests == 2 for run in runs)
+
+
+def test_record_info_name(measure):
+    runs = measure('record_info', dict(zone=ZONE, record='host5.' + ZONE, record_type='A'))
+    assert all(len(run.result['records']) == 1 for run in runs)
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_record_info_zone(measure):
+    runs = measure('record_info', dict(zone=ZONE))
+    assert all(run.result['records'] for run in runs)
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_record_info_zone_stream(measure):
+    runs = measure('record_info', dict(zone=ZONE, record_type='SOA', stream=True))
+    assert all(len(run.result['records']) == 1 for run in runs)
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_record_info_zones(measure):
+    runs = measure('record_info', dict(zones=ZONES, record_type='SOA'))
+    assert all(len(run.result['records_by_zone']) == len(ZONES) for run in runs)
+    assert all(run.requests == len(ZONES) for run in runs)
+
+
+def test_record_info_zones_async(measure):
+    runs = measure('record_info', dict(zones=ZONES, record_type='SOA', async_mode=True))
+    assert all(len(run.result['records_by_zone']) == len(ZONES) for run in runs)
+    assert all(run.requests == len(ZONES) for run in runs)
+
+
+def test_zone_info_all(measure):
+    runs = measure('zone_info', dict())
+    assert all(run.result['zones'] for run in runs)
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_zone_info_names_async(measure):
+    runs = measure('zone_info', dict(name=ZONES, async_mode=True))
+    assert all(len(run.result['zones']) == len(ZONES) for run in runs)
+    assert all(run.requests == len(ZONES) for run in runs)
+
+
+def test_account_unchanged(measure):
+    runs = measure('account', dict(name='account0', description='Account 0'), auth='basic')
+    assert not any(run.result['changed'] for run in runs)
+    # The lookup by name, no listing and no PUT
+    assert all(run.requests == 1 for run in runs)
+
+
+def test_account_changed(measure):
+    counter = itertools.count(1)
+    runs = measure('account', lambda: dict(name='account1', description='Description {}'.format(next(counter))), auth='basic')
+    assert all(run.result['changed'] for run in runs)
+    # The lookup by name and one PUT
+    assert all(run.requests == 2 for run in runs)
+
+
+def test_zone_round_trip(benchmark, mock_pdns, run_module, tmp_path):
+    zoneFile = str(tmp_path / 'big.zone')
+    runs = []
+
+    def setup():
+        mock_pdns.add_zone(BIG_ZONE, BIG_ZONE_RECORDS)
+        if os.path.exists(zoneFile):
+            os.unlink(zoneFile)
+
+    def round_trip():
+        exported = run_module('zone_export', dict(zone=BIG_ZONE, dest=zoneFile), cache_dir=False)
+        # Import into the zone emptied down to its SOA and NS
+        mock_pdns.add_zone(BIG_ZONE, 0)
+        imported = run_module('zone_import', dict(zone=BIG_ZONE, src=zoneFile))
+        runs.append((exported, imported))
+
+    benchmark.pedantic(round_trip, setup=setup, rounds=3, iterations=1)
+    benchmark.extra_info['records'] = BIG_ZONE_RECORDS
+    benchmark.extra_info['requests'] = max(exported.requests + imported.requests for exported, imported in runs)
+    benchmark.extra_info['bytes_out'] = max(exported.bytes_out + imported.bytes_out for exported, imported in runs)
+    benchmark.extra_info['peak_rss_kb'] = max(max(exported.peak_rss_kb, imported.peak_rss_kb) for exported, imported in runs)
+
+    assert all(exported.result['changed'] for exported, imported in runs)
+    assert all(imported.result['replaced'] == BIG_ZONE_RECORDS for exported, imported in runs)
+    # One streamed GET to export, one to read the zone and a PATCH per chunk of 1000 rrsets to import
+    assert all(exported.requests == 1 for exported, imported in runs)
+    assert all(imported.requests == 1 + math.ceil(BIG_ZONE_RECORDS / 1000.0) for exported, imported in runs)
+    assert len(mock_pdns.zones[BIG_ZONE]['rrsets']) == BIG_ZONE_RECORDS + 2
@@ -0,0 +1,41 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Finding PowerDNS Admin Accounts by name."""
+
+import pytest
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_accounts import find_account
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminClient
+from mock_pdns import MockPowerDNSAdmin
+
+NAMES = ['team', 'team a', 'team?a=1', 'team#1', 'team%20a', 'team/a', 'a/../b', '.', '..', 'équipe']
+
+
+@pytest.fixture(scope='module')
+def mock_pdns():
+    with MockPowerDNSAdmin(zones=0, accounts=0) as mock:
+        for name in NAMES:
+            mock.route_accounts('POST', [], dict(name=name))
+        yield mock
+
+
+@pytest.fixture
+def client(mock_pdns):
+    # The mock only checks that basic auth is used
+    return PowerDNSAdminClient(mock_pdns.url, headers={'Authorization': 'Basic YWRtaW46YWRtaW4='})
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_find_account(mock_pdns, client, name):
+    mock_pdns.reset_counters()
+    response, account = find_account(client, name)
+    assert account['name'] == name
+    # Only the names that cannot be put in the path are looked up in the listing
+    assert mock_pdns.requests == 1
+
+
+@pytest.mark.parametrize('name', ['missing', 'missing a?b', 'missing#1', 'missing/a'])
+def test_find_account_missing(client, name):
+    response, account = find_account(client, name)
+    assert account is None
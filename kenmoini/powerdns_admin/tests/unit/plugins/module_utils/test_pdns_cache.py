@@ -0,0 +1,38 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""The response cache shared by the module runs on the controller."""
+
+import time
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_cache import ResponseCache
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.set('key', 200, '[]', ['tag'], time.time())
+    assert cache.get('key') is None
+
+
+def test_ttl_per_read(tmp_path):
+    # A read given its own TTL is cached while the cache is otherwise off
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.set('key', 200, '[]', ['tag'], time.time(), ttl=300)
+    assert cache.get('key') is None
+    assert cache.get('key', 300).text == '[]'
+    assert cache.get('key', 0) is None
+
+
+def test_ttl_per_read_expires(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.set('key', 200, '[]', ['tag'], time.time() - 60, ttl=300)
+    assert cache.get('key', 30) is None
+    cache.set('key', 200, '[]', ['tag'], time.time() - 60, ttl=300)
+    assert cache.get('key', 300) is not None
+
+
+def test_ttl_per_read_invalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.set('key', 200, '[]', ['tag'], time.time() - 1, ttl=300)
+    cache.invalidate(['tag'])
+    assert cache.get('key', 300) is None
@@ -0,0 +1,156 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Keeping PTR records in step with A and AAAA records."""
+
+import pytest
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_ptr import (
+    find_reverse_zone,
+    plan_ptr_changes,
+    ptr_results,
+    PtrPlan,
+    reverse_name,
+)
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zones import ZoneIndex
+
+REVERSE_ZONES = ['2.0.192.in-addr.arpa.', '0.192.in-addr.arpa.', '51.198.in-addr.arpa.', '8.b.d.0.1.0.0.2.ip6.arpa.', 'example.com.']
+
+
+def rrset(name, *contents, **kwargs):
+    return dict(name=name, type='PTR', ttl=kwargs.get('ttl', 300),
+                records=[dict(content=content, disabled=False) for content in contents])
+
+
+def records(*contents):
+    return [dict(content=content, disabled=False) for content in contents]
+
+
+class FakeResponse(object):
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = str(data)
+
+    def json(self):
+        return self.data
+
+
+class FakeClient(object):
+    """Serves a zone listing and the PTR rrsets of each reverse zone, recording every GET"""
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.gets = []
+
+    def get(self, path, params=None, cache_tags=None, cache_ttl=None, **kwargs):
+        self.gets.append((path, params, cache_ttl))
+        if path == '/servers/localhost/zones':
+            return FakeResponse([dict(id=name, name=name) for name in self.zones])
+        zone = path.rsplit('/', 1)[1]
+        rrsets = self.zones.get(zone)
+        if rrsets is None:
+            return FakeResponse('Not Found', 404)
+        if params and 'rrset_name' in params:
+            rrsets = [item for item in rrsets if item['name'] == params['rrset_name']]
+        return FakeResponse(dict(name=zone, rrsets=rrsets))
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('192.0.2.10', '10.2.0.192.in-addr.arpa.'),
+    (' 192.0.2.10 ', '10.2.0.192.in-addr.arpa.'),
+    ('2001:db8::1', '1.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.8.b.d.0.1.0.0.2.ip6.arpa.'),
+    ('www.example.com.', None),
+    ('192.0.2.300', None),
+])
+def test_reverse_name(address, expected):
+    assert reverse_name(address) == expected
+
+
+@pytest.mark.parametrize('ptr, expected', [
+    # The most specific zone wins
+    ('10.2.0.192.in-addr.arpa.', '2.0.192.in-addr.arpa.'),
+    ('10.3.0.192.in-addr.arpa.', '0.192.in-addr.arpa.'),
+    ('10.100.51.198.in-addr.arpa.', '51.198.in-addr.arpa.'),
+    ('10.2.0.193.in-addr.arpa.', None),
+    (reverse_name('2001:db8::1'), '8.b.d.0.1.0.0.2.ip6.arpa.'),
+    (reverse_name('2001:db9::1'), None),
+    # Case and the trailing dot do not matter
+    ('10.2.0.192.IN-ADDR.ARPA', '2.0.192.in-addr.arpa.'),
+])
+def test_find_reverse_zone(ptr, expected):
+    index = ZoneIndex([dict(id=name, name=name) for name in REVERSE_ZONES])
+    assert find_reverse_zone(index, ptr) == expected
+
+
+def test_plan_grouping():
+    plan = PtrPlan()
+    plan.add('www.example.com.', 'A', None, records('192.0.2.10', '192.0.2.11'), 300)
+    plan.add('www.example.com', 'AAAA', None, records('2001:db8::1'), 600)
+    plan.add('mail.example.com.', 'MX', None, records('10 mx.example.com.'), 300)
+    plan.add('old.example.com.', 'A', dict(records=records('192.0.2.20', '192.0.2.21')), records('192.0.2.21'), 300)
+    plan.add('gone.example.com.', 'A', dict(records=records('192.0.2.30')), [], 300, state='absent')
+    assert plan.names() == sorted([
+        '10.2.0.192.in-addr.arpa.', '11.2.0.192.in-addr.arpa.', '21.2.0.192.in-addr.arpa.',
+        '20.2.0.192.in-addr.arpa.', '30.2.0.192.in-addr.arpa.', reverse_name('2001:db8::1'),
+    ])
+    assert plan.wanted['10.2.0.192.in-addr.arpa.'] == {'www.example.com.': False}
+    assert plan.ttls[reverse_name('2001:db8::1')] == 600
+    assert plan.stale == {'20.2.0.192.in-addr.arpa.': {'old.example.com.'}, '30.2.0.192.in-addr.arpa.': {'gone.example.com.'}}
+
+
+def test_plan_changes_one_group_per_reverse_zone():
+    client = FakeClient({
+        '2.0.192.in-addr.arpa.': [
+            rrset('10.2.0.192.in-addr.arpa.', 'www.example.com.'),
+            rrset('11.2.0.192.in-addr.arpa.', 'old-www.example.com.'),
+            rrset('20.2.0.192.in-addr.arpa.', 'old.example.com.', 'other.example.com.'),
+            rrset('30.2.0.192.in-addr.arpa.', 'gone.example.com.'),
+        ],
+        '0.192.in-addr.arpa.': [],
+        '8.b.d.0.1.0.0.2.ip6.arpa.': [],
+        'example.com.': [],
+    })
+    plan = PtrPlan()
+    plan.add('www.example.com.', 'A', None, records('192.0.2.10', '192.0.2.11', '192.0.3.5'), 300)
+    plan.add('www.example.com.', 'AAAA', None, records('2001:db8::1'), 300)
+    plan.add('old.example.com.', 'A', dict(records=records('192.0.2.20')), [], 300)
+    plan.add('gone.example.com.', 'A', dict(records=records('192.0.2.30')), [], 300, state='absent')
+    plan.add('lost.example.com.', 'A', None, records('203.0.113.1'), 300)
+
+    changes, zones = plan_ptr_changes(client, 'localhost', plan, cache_ttl=300)
+
+    # One listing, cached for the TTL given, and one read of each reverse zone
+    zone_reads = [path for path, params, ttl in client.gets if path != '/servers/localhost/zones']
+    assert client.gets[0] == ('/servers/localhost/zones', {'dnssec': 'false'}, 300)
+    assert sorted(zone_reads) == sorted(['/servers/localhost/zones/2.0.192.in-addr.arpa.', '/servers/localhost/zones/0.192.in-addr.arpa.',
+                                         '/servers/localhost/zones/8.b.d.0.1.0.0.2.ip6.arpa.'])
+
+    # Every change of a reverse zone is in its one group, which is sent as one PATCH
+    summary = dict((zone, sorted((change['name'], change['changetype'], [record['content'] for record in change.get('records') or []])
+                                 for current, change in pairs)) for zone, pairs in changes.items())
+    assert summary == {
+        '2.0.192.in-addr.arpa.': [
+            ('11.2.0.192.in-addr.arpa.', 'REPLACE', ['www.example.com.']),
+            ('20.2.0.192.in-addr.arpa.', 'REPLACE', ['other.example.com.']),
+            ('30.2.0.192.in-addr.arpa.', 'DELETE', []),
+        ],
+        '0.192.in-addr.arpa.': [('5.3.0.192.in-addr.arpa.', 'REPLACE', ['www.example.com.'])],
+        '8.b.d.0.1.0.0.2.ip6.arpa.': [(reverse_name('2001:db8::1'), 'REPLACE', ['www.example.com.'])],
+    }
+    assert zones['10.2.0.192.in-addr.arpa.'] == '2.0.192.in-addr.arpa.'
+    assert zones['1.113.0.203.in-addr.arpa.'] is None
+
+    results = dict((item['name'], item) for item in ptr_results(zones, changes))
+    assert results['10.2.0.192.in-addr.arpa.'] == dict(name='10.2.0.192.in-addr.arpa.', zone='2.0.192.in-addr.arpa.', changed=False, changetype=None)
+    assert results['30.2.0.192.in-addr.arpa.']['changetype'] == 'DELETE'
+    assert results['1.113.0.203.in-addr.arpa.']['zone'] is None
+
+
+def test_plan_changes_nothing_to_do():
+    client = FakeClient({})
+    plan = PtrPlan()
+    plan.add('mail.example.com.', 'MX', None, records('10 mx.example.com.'), 300)
+    assert plan_ptr_changes(client, 'localhost', plan) == ({}, {})
+    assert client.gets == []
@@ -0,0 +1,158 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""The streaming JSON parsers, ijson and the pure Python one used without it."""
+
+import json
+
+import pytest
+import requests
+from urllib3.exceptions import ProtocolError
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils import pdns_stream
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_stream import iter_json_array, iter_response_items
+
+ZONE = json.dumps(dict(
+    name='example.com.',
+    serial=1.5,
+    edited_serial=-20240101e-3,
+    dnssec=False,
+    masters=[],
+    rrsets=[
+        dict(name='example.com.', type='SOA', ttl=3600, records=[dict(content='ns1.example.com. hostmaster.example.com. 1 10800 3600 604800 3600', disabled=False)]),
+        dict(name='www.example.com.', type='TXT', ttl=300, records=[dict(content='"v=spf1 \\"quoted\\" é"', disabled=True)]),
+        dict(name='host.example.com.', type='A', ttl=1.25, records=[]),
+    ],
+    account=None,
+), indent=1)
+
+LISTING = json.dumps([1.5, -2, 3e10, 1.25E-3, 0, True, None, 'text', dict(id=12.5), [7.75]])
+
+
+def split(text, *offsets):
+    bounds = (0,) + offsets + (len(text),)
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('offset', range(1, len(ZONE)))
+def test_object_split_at_every_offset(offset):
+    assert list(iter_json_array(split(ZONE, offset), 'rrsets')) == json.loads(ZONE)['rrsets']
+
+
+@pytest.mark.parametrize('offset', range(1, len(LISTING)))
+def test_array_split_at_every_offset(offset):
+    assert list(iter_json_array(split(LISTING, offset))) == json.loads(LISTING)
+
+
+def test_single_character_chunks():
+    assert list(iter_json_array(list(ZONE), 'rrsets')) == json.loads(ZONE)['rrsets']
+    assert list(iter_json_array(list(LISTING))) == json.loads(LISTING)
+
+
+def test_number_split_after_the_dot():
+    assert list(iter_json_array(['{"serial": 1.', '5, "rrsets": []}'], 'rrsets')) == []
+    assert list(iter_json_array(['[1.', '25]'])) == [1.25]
+
+
+@pytest.mark.parametrize('offset', range(1, ZONE.index('"rrsets"')))
+def test_truncated_before_the_array(offset):
+    with pytest.raises(ValueError):
+        list(iter_json_array([ZONE[:offset]], 'rrsets'))
+
+
+@pytest.mark.parametrize('offset', range(ZONE.index('"rrsets"'), ZONE.index(']', ZONE.rindex('records'))))
+def test_truncated_inside_the_array(offset):
+    with pytest.raises(ValueError):
+        list(iter_json_array([ZONE[:offset]], 'rrsets'))
+
+
+def test_missing_key():
+    with pytest.raises(ValueError):
+        list(iter_json_array(['{"name": "example.com."'], 'rrsets'))
+    assert list(iter_json_array(['{"name": "example.com."}'], 'rrsets')) == []
+
+
+class FakeResponse(object):
+    """A streamed response whose body breaks off with ``error`` once read"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, body, error=None):
+        self.body = body.encode('utf-8')
+        self.error = error
+        self.raw = self
+
+    def read(self, size=-1):
+        if not self.body and self.error is not None:
+            raise self.error
+        data, self.body = (self.body, b'') if size < 0 else (self.body[:size], self.body[size:])
+        return data
+
+    def iter_content(self, chunk_size):
+        while self.body:
+            yield self.read(chunk_size)
+        if self.error is not None:
+            raise self.error
+
+
+class FakeIjson(object):
+    """Stands in for ijson, failing the way it does on a truncated body"""
+
+    class JSONError(Exception):
+        pass
+
+    class IncompleteJSONError(JSONError):
+        pass
+
+    @classmethod
+    def items(cls, raw, prefix, use_float=False):
+        raw.read()
+        raise cls.IncompleteJSONError('Incomplete JSON content')
+        yield
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    monkeypatch.setattr(pdns_stream, 'HAS_IJSON', False)
+
+
+@pytest.fixture
+def fake_ijson(monkeypatch):
+    monkeypatch.setattr(pdns_stream, 'HAS_IJSON', True)
+    monkeypatch.setattr(pdns_stream, 'ijson', FakeIjson, raising=False)
+
+
+TRUNCATED = ZONE[:ZONE.index('"rrsets"') + 20]
+
+
+@pytest.mark.parametrize('body, error', [
+    (TRUNCATED, None),
+    (TRUNCATED, requests.exceptions.ChunkedEncodingError('Connection broken')),
+], ids=['truncated', 'connection'])
+def test_response_errors_fallback(fallback, body, error):
+    with pytest.raises(ValueError):
+        list(iter_response_items(FakeResponse(body, error), 'rrsets', chunk_size=16))
+
+
+@pytest.mark.parametrize('body, error', [
+    (TRUNCATED, None),
+    ('', ProtocolError('Connection broken')),
+], ids=['truncated', 'connection'])
+def test_response_errors_ijson(fake_ijson, body, error):
+    with pytest.raises(ValueError, match='Failed to read the response'):
+        list(iter_response_items(FakeResponse(body, error), 'rrsets'))
+
+
+@pytest.mark.parametrize('body, error', [
+    (TRUNCATED, None),
+    (TRUNCATED, ProtocolError('Connection broken')),
+], ids=['truncated', 'connection'])
+def test_response_errors_real_ijson(monkeypatch, body, error):
+    monkeypatch.setattr(pdns_stream, 'ijson', pytest.importorskip('ijson'), raising=False)
+    monkeypatch.setattr(pdns_stream, 'HAS_IJSON', True)
+    with pytest.raises(ValueError, match='Failed to read the response'):
+        list(iter_response_items(FakeResponse(body, error), 'rrsets'))
+
+
+def test_response_items(fallback):
+    assert list(iter_response_items(FakeResponse(ZONE), 'rrsets', chunk_size=7)) == json.loads(ZONE)['rrsets']
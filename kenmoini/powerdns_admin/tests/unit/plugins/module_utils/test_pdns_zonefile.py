@@ -0,0 +1,144 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Reading RFC 1035 zone files."""
+
+import re
+
+import pytest
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_zonefile import (
+    format_rrset,
+    parse_records,
+    parse_rrsets,
+    ZoneFileError,
+)
+
+ORIGIN = 'example.com.'
+
+
+def records(text, default_ttl=3600):
+    return list(parse_records(text.splitlines(True), ORIGIN, default_ttl))
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Owner names
+    ('www 300 IN A 192.0.2.1\n', [('www.example.com.', 'A', 300, '192.0.2.1', False)]),
+    ('@ 300 IN A 192.0.2.1\n', [('example.com.', 'A', 300, '192.0.2.1', False)]),
+    ('www.other.org. 300 IN A 192.0.2.1\n', [('www.other.org.', 'A', 300, '192.0.2.1', False)]),
+    ('www 300 IN A 192.0.2.1\n 300 IN A 192.0.2.2\n', [
+        ('www.example.com.', 'A', 300, '192.0.2.1', False),
+        ('www.example.com.', 'A', 300, '192.0.2.2', False),
+    ]),
+    # TTL and class in either order, TTL units, lower case type
+    ('www IN 300 a 192.0.2.1\n', [('www.example.com.', 'A', 300, '192.0.2.1', False)]),
+    ('www 1h30m A 192.0.2.1\n', [('www.example.com.', 'A', 5400, '192.0.2.1', False)]),
+    # Without a TTL: $TTL, then the last TTL given, then the default
+    ('$TTL 600\nwww IN A 192.0.2.1\n', [('www.example.com.', 'A', 600, '192.0.2.1', False)]),
+    ('$ttl 1d\nwww IN A 192.0.2.1\n', [('www.example.com.', 'A', 86400, '192.0.2.1', False)]),
+    ('a 120 A 192.0.2.1\nb A 192.0.2.2\n', [
+        ('a.example.com.', 'A', 120, '192.0.2.1', False),
+        ('b.example.com.', 'A', 120, '192.0.2.2', False),
+    ]),
+    ('www A 192.0.2.1\n', [('www.example.com.', 'A', 3600, '192.0.2.1', False)]),
+    # $ORIGIN, relative and absolute
+    ('$ORIGIN sub.example.com.\nwww 300 A 192.0.2.1\n', [('www.sub.example.com.', 'A', 300, '192.0.2.1', False)]),
+    ('$ORIGIN sub\nwww 300 A 192.0.2.1\n', [('www.sub.example.com.', 'A', 300, '192.0.2.1', False)]),
+    ('$ORIGIN sub.example.com.\n@ 300 NS ns1\n', [('sub.example.com.', 'NS', 300, 'ns1.sub.example.com.', False)]),
+    # Relative names in the rdata
+    ('www 300 CNAME web\n', [('www.example.com.', 'CNAME', 300, 'web.example.com.', False)]),
+    ('@ 300 MX 10 mail\n', [('example.com.', 'MX', 300, '10 mail.example.com.', False)]),
+    ('_sip._tcp 300 SRV 10 60 5060 sip.other.org.\n', [('_sip._tcp.example.com.', 'SRV', 300, '10 60 5060 sip.other.org.', False)]),
+    ('@ 300 NS @\n', [('example.com.', 'NS', 300, 'example.com.', False)]),
+    # Parentheses and comments
+    ('@ 3600 IN SOA ns1 hostmaster (\n  1 ; serial\n  10800 3600\n  604800 3600 )\n', [
+        ('example.com.', 'SOA', 3600, 'ns1.example.com. hostmaster.example.com. 1 10800 3600 604800 3600', False),
+    ]),
+    ('www 300 A 192.0.2.1 ; the web server\n; a comment line\n\n', [('www.example.com.', 'A', 300, '192.0.2.1', False)]),
+    # Quoted TXT, with spaces, semicolons, parentheses and escaped quotes
+    ('@ 300 TXT "v=spf1 -all"\n', [('example.com.', 'TXT', 300, '"v=spf1 -all"', False)]),
+    ('@ 300 TXT "a;b (c)" "d"\n', [('example.com.', 'TXT', 300, '"a;b (c)" "d"', False)]),
+    ('@ 300 TXT "say \\"hi\\"" ; comment\n', [('example.com.', 'TXT', 300, '"say \\"hi\\""', False)]),
+    ('@ 300 TXT ( "one"\n "two" )\n', [('example.com.', 'TXT', 300, '"one" "two"', False)]),
+    # Records exported as disabled
+    ('; disabled: www.example.com.\t300\tIN\tA\t192.0.2.1\n', [('www.example.com.', 'A', 300, '192.0.2.1', True)]),
+])
+def test_parse_records(text, expected):
+    assert records(text) == expected
+
+
+@pytest.mark.parametrize('text, message', [
+    ('@ 300 TXT "open\n', 'Unterminated quoted string on line 1'),
+    ('@ 300 SOA ns1 hostmaster ( 1 2\n', 'Unbalanced "(" starting on line 1'),
+    ('@ 300 A 192.0.2.1 )\n', 'Unbalanced ")" on line 1'),
+    ('$TTL soon\n', 'Invalid $TTL on line 1'),
+    ('$INCLUDE other.zone\n', 'Unsupported directive $INCLUDE on line 1'),
+    (' 300 A 192.0.2.1\n', 'No owner name for the record on line 1'),
+    ('www 300 IN\n', 'Missing record type on line 1'),
+    ('www 300 IN A\n', 'Missing record data on line 1'),
+])
+def test_parse_records_errors(text, message):
+    with pytest.raises(ZoneFileError, match=re.escape(message)):
+        records(text)
+
+
+def rrsets(text, warn=None):
+    return [(rrset['name'], rrset['type'], rrset['ttl'], [record['content'] for record in rrset['records']])
+            for rrset in parse_rrsets(text.splitlines(True), ORIGIN, warn=warn)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('www 300 A 192.0.2.1\nwww 300 A 192.0.2.2\nwww 300 AAAA 2001:db8::1\n', [
+        ('www.example.com.', 'A', 300, ['192.0.2.1', '192.0.2.2']),
+        ('www.example.com.', 'AAAA', 300, ['2001:db8::1']),
+    ]),
+    # Owner names differing in case are one rrset
+    ('WWW 300 A 192.0.2.1\nwww 300 A 192.0.2.2\n', [
+        ('WWW.example.com.', 'A', 300, ['192.0.2.1', '192.0.2.2']),
+    ]),
+    ('$ORIGIN a.example.com.\nwww 300 A 192.0.2.1\n$ORIGIN b.example.com.\nwww 300 A 192.0.2.2\n', [
+        ('www.a.example.com.', 'A', 300, ['192.0.2.1']),
+        ('www.b.example.com.', 'A', 300, ['192.0.2.2']),
+    ]),
+    ('', []),
+])
+def test_parse_rrsets(text, expected):
+    assert rrsets(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'www 300 A 192.0.2.1\nmail 300 A 192.0.2.2\nwww 300 A 192.0.2.3\n',
+    'www 300 A 192.0.2.1\nwww 300 AAAA 2001:db8::1\nwww 300 A 192.0.2.3\n',
+    '$ORIGIN a.example.com.\nwww 300 A 192.0.2.1\n$ORIGIN example.com.\nmail 300 A 192.0.2.2\nwww.a 300 A 192.0.2.3\n',
+])
+def test_parse_rrsets_not_contiguous(text):
+    with pytest.raises(ZoneFileError, match='are not next to each other'):
+        rrsets(text)
+
+
+def test_parse_rrsets_mixed_ttls_warn():
+    warnings = []
+    text = 'www 300 A 192.0.2.1\nwww 600 A 192.0.2.2\nwww 900 A 192.0.2.3\nmail 300 A 192.0.2.4\nmail 60 A 192.0.2.5\n'
+    assert rrsets(text, warn=warnings.append) == [
+        ('www.example.com.', 'A', 300, ['192.0.2.1', '192.0.2.2', '192.0.2.3']),
+        ('mail.example.com.', 'A', 300, ['192.0.2.4', '192.0.2.5']),
+    ]
+    # One warning per rrset
+    assert warnings == [
+        'The records of www.example.com. A have different TTLs, 300 is used rather than 600',
+        'The records of mail.example.com. A have different TTLs, 300 is used rather than 60',
+    ]
+
+
+def test_parse_rrsets_mixed_ttls_raise():
+    with pytest.raises(ZoneFileError, match='have different TTLs'):
+        rrsets('www 300 A 192.0.2.1\nwww 600 A 192.0.2.2\n')
+
+
+def test_format_rrset_round_trip():
+    rrset = dict(name='www.example.com.', type='TXT', ttl=300, records=[
+        dict(content='"v=spf1 -all"', disabled=False),
+        dict(content='"a;b (c)"', disabled=True),
+    ])
+    assert rrsets(format_rrset(rrset)) == [('www.example.com.', 'TXT', 300, ['"v=spf1 -all"', '"a;b (c)"'])]
+    assert [record['disabled'] for rrset in parse_rrsets(format_rrset(rrset).splitlines(True), ORIGIN) for record in rrset['records']] == [False, True]
@@ -0,0 +1,73 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Sending the write of each planned account, as the worker threads do."""
+
+import json
+
+import pytest
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.modules.accounts import apply_change
+
+PAYLOAD = dict(name='team', description='The team', contact='', mail='')
+ACCOUNT = dict(PAYLOAD, id=7)
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeClient(object):
+    """Answers every write with the same response, or raises ``error``"""
+
+    def __init__(self, status_code=200, text='', error=None):
+        self.response = FakeResponse(status_code, text)
+        self.error = error
+
+    def _send(self, path, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    post = put = delete = _send
+
+
+@pytest.mark.parametrize('status, body, account', [
+    (201, json.dumps(ACCOUNT), ACCOUNT),
+    (200, json.dumps(ACCOUNT), ACCOUNT),
+    # Created, but a proxy replaced the body
+    (201, '<html>Created</html>', PAYLOAD),
+    (201, '', PAYLOAD),
+], ids=['created', 'ok', 'html', 'empty'])
+def test_create(status, body, account):
+    outcome = apply_change(FakeClient(status, body), dict(name='team', action='create', payload=PAYLOAD))
+    assert outcome == dict(name='team', action='create', changed=True, account=account)
+
+
+def test_create_refused():
+    outcome = apply_change(FakeClient(409, 'Account already exists'), dict(name='team', action='create', payload=PAYLOAD))
+    assert outcome['failed'] and not outcome['changed']
+    assert outcome['msg'] == 'Failed to create account: Account already exists'
+
+
+def test_update():
+    operation = dict(name='team', action='update', account=ACCOUNT, payload=dict(description='Renamed'))
+    outcome = apply_change(FakeClient(204), operation)
+    assert outcome == dict(name='team', action='update', changed=True, account=dict(ACCOUNT, description='Renamed'))
+
+
+def test_delete():
+    outcome = apply_change(FakeClient(204), dict(name='team', action='delete', account=ACCOUNT))
+    assert outcome['changed'] and not outcome.get('failed')
+
+
+def test_request_error():
+    outcome = apply_change(FakeClient(error=PowerDNSAdminError('Request failed')), dict(name='team', action='create', payload=PAYLOAD))
+    assert outcome['failed'] and outcome['msg'] == 'Request failed'
@@ -0,0 +1,85 @@
+# Copyright: (c) 2024, Ken Moini <ken@kenmoini.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Reading the records of one zone, which fails that zone alone."""
+
+import asyncio
+import io
+import json
+
+import pytest
+import requests
+
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_async import AsyncResponse
+from ansible_collections.kenmoini.powerdns_admin.plugins.module_utils.pdns_client import PowerDNSAdminError
+from ansible_collections.kenmoini.powerdns_admin.plugins.modules.record_info import fetch_records, fetch_records_async
+
+ZONE = dict(name='example.com.', serial=1, edited_serial=1, rrsets=[
+    dict(name='www.example.com.', type='A', ttl=300, records=[dict(content='192.0.2.1', disabled=False)]),
+])
+
+PROXY_ERROR = '<html><body><h1>502 Bad Gateway</h1></body></html>'
+
+
+def response(status, body):
+    res = requests.Response()
+    res.status_code = status
+    res.encoding = 'utf-8'
+    res.raw = io.BytesIO(body.encode('utf-8'))
+    return res
+
+
+class FakeClient(object):
+    """Answers every GET with the same status and body"""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def get(self, path, params=None, cache_tags=None, **kwargs):
+        return response(self.status, self.body)
+
+    def get_versioned(self, path, version, cache_tags=None, **kwargs):
+        return response(self.status, self.body)
+
+
+class FakeAsyncClient(FakeClient):
+
+    async def get(self, path, params=None, cache_tags=None):
+        return AsyncResponse(self.status, self.body)
+
+
+def params(**kwargs):
+    return dict(dict(pdns_server_id='localhost', record=None, record_type=None, stream=False, revalidate=False,
+                     max_results=None, fields=[]), **kwargs)
+
+
+MODES = [dict(), dict(revalidate=True), dict(stream=True)]
+
+
+@pytest.mark.parametrize('mode', MODES, ids=['lookup', 'revalidate', 'stream'])
+def test_fetch_records(mode):
+    assert fetch_records(FakeClient(200, json.dumps(ZONE)), params(**mode), 'example.com.') == ZONE['rrsets']
+
+
+@pytest.mark.parametrize('mode', MODES, ids=['lookup', 'revalidate', 'stream'])
+@pytest.mark.parametrize('body', [PROXY_ERROR, '"maintenance"', json.dumps(ZONE)[:40]], ids=['html', 'not_an_object', 'truncated'])
+def test_fetch_records_bad_body(mode, body):
+    with pytest.raises(PowerDNSAdminError, match='Failed to parse zone'):
+        fetch_records(FakeClient(200, body), params(**mode), 'example.com.')
+
+
+def test_fetch_records_failed_request():
+    with pytest.raises(PowerDNSAdminError, match='Failed to read zone: Not Found'):
+        fetch_records(FakeClient(404, 'Not Found'), params(), 'example.com.')
+
+
+def test_fetch_records_async():
+    records = asyncio.run(fetch_records_async(FakeAsyncClient(200, json.dumps(ZONE)), params(), 'example.com.'))
+    assert records == ZONE['rrsets']
+
+
+@pytest.mark.parametrize('body', [PROXY_ERROR, '"maintenance"'], ids=['html', 'not_an_object'])
+def test_fetch_records_async_bad_body(body):
+    with pytest.raises(PowerDNSAdminError, match='Failed to parse zone'):
+        asyncio.run(fetch_records_async(FakeAsyncClient(200, body), params(), 'example.com.'))